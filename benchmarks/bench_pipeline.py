@@ -0,0 +1,288 @@
+"""End-to-end throughput and latency benchmark for the TradeEngine pipeline.
+
+Runs TradeEngine against an in-process SyntheticPriceSource for several
+universe sizes and writes the results to JSON:
+
+    python -m benchmarks.bench_pipeline --symbols 10 1000 10000 --out bench.json
+    python -m benchmarks.bench_pipeline --out new.json --compare bench.json
+"""
+import argparse
+import functools
+import json
+import platform
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from src.price_sources import SyntheticPriceSource
+from src.trade_engine import TradeEngine
+from src.workers import PortfolioConsumer, AlertConsumer
+
+
+class TimedLock:
+    """threading.Lock wrapper that records how long acquirers had to wait"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_times = []
+        self.hold_started = 0.0
+        self.hold_time = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(False):
+            acquired = True
+        elif not blocking:
+            return False
+        else:
+            started = time.perf_counter()
+            acquired = self._lock.acquire(True, timeout)
+            if acquired:
+                self.contended += 1
+                self.wait_times.append(time.perf_counter() - started)
+        if acquired:
+            self.acquisitions += 1
+            self.hold_started = time.perf_counter()
+        return acquired
+
+    def release(self):
+        self.hold_time += time.perf_counter() - self.hold_started
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class TimedSource(SyntheticPriceSource):
+    """Synthetic feed that remembers when the last history ticks of each
+    symbol were emitted, so memory stays bounded by the universe size"""
+
+    def __init__(self, history=16, **kwargs):
+        super().__init__(**kwargs)
+        self.history = history
+        self.emitted = {}
+        self.ticks = 0
+
+    def fetch(self, symbols):
+        prices = super().fetch(symbols)
+        now = time.perf_counter()
+        emitted = self.emitted
+        for symbol, price in prices.items():
+            recent = emitted.get(symbol)
+            if recent is None:
+                recent = emitted[symbol] = deque(maxlen=self.history)
+            recent.append((price, now))
+        self.ticks += len(prices)
+        return prices
+
+    def emitted_at(self, symbol, price):
+        """perf_counter time the symbol's latest tick at price was emitted, or None"""
+        # A copy, as the producer keeps appending while consumers look up.
+        for emitted_price, emitted in reversed(tuple(self.emitted.get(symbol, ()))):
+            if emitted_price == price:
+                return emitted
+        return None
+
+
+class TimedPortfolioConsumer(PortfolioConsumer):
+    def __init__(self, source, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.source = source
+        self.latencies = []
+        self.ticks = 0
+
+    def apply_batch(self, batch, volumes=None):
+        value = super().apply_batch(batch, volumes)
+        now = time.perf_counter()
+        emitted_at = self.source.emitted_at
+        for symbol, price in batch:
+            started = emitted_at(symbol, price)
+            if started is not None:
+                self.latencies.append(now - started)
+        self.ticks += len(batch)
+        return value
+
+
+class TimedAlertConsumer(AlertConsumer):
+    def __init__(self, source, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.source = source
+        self.latencies = []
+
+    def emit_alert(self, symbol, limit, price):
+        started = self.source.emitted_at(symbol, price)
+        if started is not None:
+            self.latencies.append(time.perf_counter() - started)
+        super().emit_alert(symbol, limit, price)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_summary(values):
+    return {
+        "count": len(values),
+        "p50_ms": _ms(percentile(values, 0.50)),
+        "p99_ms": _ms(percentile(values, 0.99)),
+        "max_ms": _ms(max(values) if values else None),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def run_pipeline(n_symbols, duration, tick_rate, seed=0, columnar=False):
+    source = TimedSource(
+        n_symbols=n_symbols, tick_rate=tick_rate, seed=seed, volatility=0.005
+    )
+    portfolio = {symbol: 10 for symbol in source.symbols}
+    alerts = dict(source.prices)
+    # The timed lock and consumers are passed in rather than swapped in
+    # afterwards, so the condition and every thread use the timed lock.
+    lock = TimedLock()
+    engine = TradeEngine(
+        portfolio, alerts, source.symbols, price_source=source, columnar=columnar,
+        lock=lock,
+        portfolio_consumer_class=functools.partial(TimedPortfolioConsumer, source),
+        alert_consumer_class=functools.partial(TimedAlertConsumer, source),
+    )
+
+    log_lines = [0]
+
+    def drain_logs():
+        # Stands in for MonitorWindow so log_queue does not grow unbounded.
+        while True:
+            try:
+                engine.log_queue.get()
+            except queue.Empty:
+                break
+            log_lines[0] += 1
+
+    threading.Thread(target=drain_logs, daemon=True).start()
+
+    engine.start()
+    time.sleep(duration)
+    engine.stop_event.set()
+    backlog = engine.price_queue.qsize()
+    engine.log_queue.put("Benchmark finished")
+    engine.stop(timeout=5)
+
+    consumer = engine.portfolio_consumer
+    return {
+        "symbols": n_symbols,
+        "duration_s": duration,
+        "target_tick_rate": tick_rate,
+        "columnar": columnar,
+        "produced_ticks_per_s": round(source.ticks / duration, 1),
+        "consumed_ticks_per_s": round(consumer.ticks / duration, 1),
+        "queue_backlog": backlog,
+        "queue_conflated": engine.price_queue.conflated,
+        "queue_dropped": engine.price_queue.dropped,
+        "log_lines": log_lines[0],
+        "tick_to_portfolio": latency_summary(consumer.latencies),
+        "tick_to_alert": latency_summary(engine.alert_consumer.latencies),
+        "lock": {
+            "acquisitions": lock.acquisitions,
+            "contended": lock.contended,
+            "contended_ratio": round(lock.contended / lock.acquisitions, 4)
+            if lock.acquisitions else 0.0,
+            "wait_p99_ms": _ms(percentile(lock.wait_times, 0.99)),
+            "held_fraction": round(lock.hold_time / duration, 4),
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """Print relative change of the headline metrics against a previous run"""
+    previous = {run["symbols"]: run for run in baseline["runs"]}
+    metrics = [
+        ("consumed_ticks_per_s", lambda run: run["consumed_ticks_per_s"]),
+        ("tick_to_portfolio p99", lambda run: run["tick_to_portfolio"]["p99_ms"]),
+        ("tick_to_alert p99", lambda run: run["tick_to_alert"]["p99_ms"]),
+        ("lock contended_ratio", lambda run: run["lock"]["contended_ratio"]),
+    ]
+    print(f"Compared with {baseline['meta'].get('commit')}:")
+    for run in current["runs"]:
+        old = previous.get(run["symbols"])
+        if old is None:
+            continue
+        for name, metric in metrics:
+            new_value, old_value = metric(run), metric(old)
+            if new_value is None or not old_value:
+                continue
+            change = (new_value - old_value) / old_value * 100
+            print(f"  {run['symbols']:>6} symbols  {name:<24} "
+                  f"{old_value:>12} -> {new_value:<12} ({change:+.1f} %)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--tick-rate", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--columnar", action="store_true",
+                        help="use the array-backed SharedState store")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="previous JSON result to compare against")
+    args = parser.parse_args()
+
+    runs = []
+    for n_symbols in args.symbols:
+        run = run_pipeline(
+            n_symbols, args.duration, args.tick_rate, args.seed, args.columnar
+        )
+        runs.append(run)
+        print(f"{n_symbols:>6} symbols: {run['consumed_ticks_per_s']:>10} ticks/s  "
+              f"portfolio p50/p99 {run['tick_to_portfolio']['p50_ms']}/"
+              f"{run['tick_to_portfolio']['p99_ms']} ms  "
+              f"alert p50/p99 {run['tick_to_alert']['p50_ms']}/"
+              f"{run['tick_to_alert']['p99_ms']} ms  "
+              f"lock contended {run['lock']['contended_ratio']:.2%}")
+
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration_s": args.duration,
+            "tick_rate": args.tick_rate,
+            "seed": args.seed,
+            "columnar": args.columnar,
+        },
+        "runs": runs,
+    }
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
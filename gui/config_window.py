@@ -1,9 +1,8 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import yfinance as yf
-import warnings
-import sys
-import os
+from tkinter import ttk, messagebox, filedialog
+import queue
+from src.portfolio_io import load_portfolio
+from src.ticker_validation import TickerValidator
 
 
 class ConfigWindow:
@@ -24,6 +23,12 @@ class ConfigWindow:
         self.portfolio = {}
         self.alerts = {}
         
+        # Tickers are validated on worker threads; results come back through
+        # this queue and are picked up by poll_validation on the Tk thread.
+        self.validator = TickerValidator()
+        self.validation_results = queue.Queue()
+        self.pending = {}
+        
         self.setup_ui()
         self.window.protocol("WM_DELETE_WINDOW", self.on_cancel)
         
@@ -72,7 +77,17 @@ class ConfigWindow:
             text="Add",
             command=self.add_stock
         )
-        add_button.grid(row=2, column=0, columnspan=4, pady=(15, 0))
+        add_button.grid(row=2, column=0, columnspan=2, pady=(15, 0))
+        
+        self.import_button = ttk.Button(
+            input_frame,
+            text="Import from file...",
+            command=self.import_file
+        )
+        self.import_button.grid(row=2, column=2, columnspan=2, pady=(15, 0))
+        
+        self.status_label = ttk.Label(input_frame, text="")
+        self.status_label.grid(row=3, column=0, columnspan=4, pady=(5, 0))
         
         display_frame = ttk.LabelFrame(main_frame, text="Your Portfolio", padding="10")
         display_frame.grid(row=2, column=0, pady=(0, 15), sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -141,20 +156,6 @@ class ConfigWindow:
         else:
             self.alert_entry.config(state="disabled")
             
-    def ticker_exists(self, ticker):
-        warnings.filterwarnings("ignore")
-        stderr_backup = sys.stderr
-        sys.stderr = open(os.devnull, "w")
-        
-        try:
-            data = yf.download(ticker, period="1d", interval="1d", progress=False)
-            return not data.empty
-        except:
-            return False
-        finally:
-            sys.stderr.close()
-            sys.stderr = stderr_backup
-    
     def add_stock(self):
         ticker = self.ticker_entry.get().strip().upper()
         shares_str = self.shares_entry.get().strip()
@@ -167,10 +168,6 @@ class ConfigWindow:
             messagebox.showwarning("Error", "Please enter number of shares!")
             return
         
-        if not self.ticker_exists(ticker):
-            messagebox.showerror("Error", f"Ticker '{ticker}' does not exist!")
-            return
-        
         try:
             shares = int(shares_str)
             if shares <= 0:
@@ -179,8 +176,6 @@ class ConfigWindow:
             messagebox.showwarning("Error", "Number of shares must be a positive integer!")
             return
         
-        self.portfolio[ticker] = shares
-        
         alert_price = None
         if self.alert_var.get():
             alert_str = self.alert_entry.get().strip()
@@ -189,19 +184,115 @@ class ConfigWindow:
                     alert_price = float(alert_str)
                     if alert_price <= 0:
                         raise ValueError()
-                    self.alerts[ticker] = alert_price
                 except ValueError:
                     messagebox.showwarning("Error", "Invalid alert price!")
                     return
         
-        self.update_tree()
+        # The inputs stay as typed until the ticker is accepted, so a
+        # rejected ticker or a failed check loses nothing.
+        exists = self.validator.cached(ticker)
+        if exists is not None:
+            self.on_validated(ticker, exists, shares, alert_price)
+            return
+        
+        if not self.pending:
+            self.window.after(100, self.poll_validation)
+        self.pending[ticker] = (shares, alert_price)
+        self.update_status()
+        self.validator.validate_async(
+            ticker, lambda ticker, exists: self.validation_results.put((ticker, exists))
+        )
+    
+    def poll_validation(self):
+        if not self.window.winfo_exists():
+            return
+        
+        while True:
+            try:
+                ticker, exists = self.validation_results.get_nowait()
+            except queue.Empty:
+                break
+            if ticker in self.pending:
+                shares, alert_price = self.pending.pop(ticker)
+                self.on_validated(ticker, exists, shares, alert_price)
+        
+        self.update_status()
+        if self.pending:
+            self.window.after(100, self.poll_validation)
+    
+    def on_validated(self, ticker, exists, shares, alert_price):
+        if exists is None:
+            messagebox.showerror("Error", f"Could not validate ticker '{ticker}', check your connection!")
+            return
+        if not exists:
+            messagebox.showerror("Error", f"Ticker '{ticker}' does not exist!")
+            return
         
+        self.portfolio[ticker] = shares
+        if alert_price is not None:
+            self.alerts[ticker] = alert_price
+        self.update_tree()
+        self.clear_inputs(ticker)
+    
+    def clear_inputs(self, ticker):
+        """Empty the input fields unless the user has moved on to another ticker"""
+        if self.ticker_entry.get().strip().upper() != ticker:
+            return
         self.ticker_entry.delete(0, tk.END)
         self.shares_entry.delete(0, tk.END)
         self.alert_entry.delete(0, tk.END)
         self.alert_var.set(False)
         self.toggle_alert_entry()
         self.ticker_entry.focus()
+    
+    def import_file(self):
+        path = filedialog.askopenfilename(
+            parent=self.window,
+            title="Import portfolio",
+            filetypes=[("Portfolio files", "*.csv *.json"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        self.import_button.config(state="disabled")
+        self.status_label.config(text="Importing and validating tickers...")
+        future = self.validator.pool.submit(load_portfolio, path, self.validator)
+        self.window.after(100, self.poll_import, future)
+    
+    def poll_import(self, future):
+        if not self.window.winfo_exists():
+            return
+        if not future.done():
+            self.window.after(100, self.poll_import, future)
+            return
+        
+        self.import_button.config(state="normal")
+        self.update_status()
+        try:
+            result = future.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not import file: {e}")
+            return
+        
+        self.portfolio.update(result.portfolio)
+        self.alerts.update(result.alerts)
+        self.update_tree()
+        
+        imported = len(result.symbols)
+        if result.errors:
+            messagebox.showwarning(
+                "Import",
+                f"Imported {imported} stocks, {len(result.errors)} rows skipped:\n\n"
+                f"{result.error_report()}"
+            )
+        else:
+            messagebox.showinfo("Import", f"Imported {imported} stocks.")
+    
+    def update_status(self):
+        if self.pending:
+            self.status_label.config(text=f"Validating {', '.join(self.pending)}...")
+        else:
+            self.status_label.config(text="")
         
     def remove_stock(self):
         selection = self.tree.selection()
@@ -234,9 +325,11 @@ class ConfigWindow:
             return
         
         symbols = list(set(self.portfolio.keys()) | set(self.alerts.keys()))
+        self.validator.close()
         self.callback(self.portfolio, self.alerts, symbols)
         self.window.destroy()
         
     def on_cancel(self):
+        self.validator.close()
         self.callback({}, {}, [])
         self.window.destroy()
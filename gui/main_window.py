@@ -3,10 +3,11 @@ from tkinter import ttk
 from gui.config_window import ConfigWindow
 from gui.monitor_window import MonitorWindow
 from src.trade_engine import TradeEngine
+from src.checkpoint import DEFAULT_CHECKPOINT_PATH
 
 
 class MainWindow:
-    def __init__(self):
+    def __init__(self, metrics_port=None, engine_process=False):
         self.root = tk.Tk()
         self.root.title("Stock Trading Monitor")
         self.root.geometry("800x600")
@@ -21,6 +22,8 @@ class MainWindow:
         
         self.engine = None
         self.monitor_window = None
+        self.metrics_port = metrics_port
+        self.engine_process = engine_process
         
         self.setup_ui()
         
@@ -87,8 +90,22 @@ class MainWindow:
             self.status_label.config(text="Configuration complete, starting engine...")
             self.root.update()
             
-            self.engine = TradeEngine(portfolio, alerts, symbols)
-            self.engine.start()
+            engine_class = TradeEngine
+            if self.engine_process:
+                # Keeps fetching and valuation off this process's GIL.
+                from src.process_engine import ProcessTradeEngine
+                engine_class = ProcessTradeEngine
+            self.engine = engine_class(
+                portfolio, alerts, symbols, checkpoint_path=DEFAULT_CHECKPOINT_PATH,
+                metrics_port=self.metrics_port
+            )
+            try:
+                self.engine.start()
+            except RuntimeError as e:
+                self.engine = None
+                self.status_label.config(text=str(e))
+                self.start_button.config(state="normal")
+                return
             
             self.monitor_window = MonitorWindow(self.root, self.engine)
             self.status_label.config(text="Engine running - monitoring active")
@@ -98,10 +115,11 @@ class MainWindow:
             self.start_button.config(state="normal")
     
     def on_closing(self):
-        if self.engine:
-            self.engine.stop_event.set()
         if self.monitor_window:
+            # Closing the monitor window stops the engine.
             self.monitor_window.destroy()
+        elif self.engine:
+            self.engine.stop()
         self.root.quit()
         self.root.destroy()
         
@@ -110,8 +128,8 @@ class MainWindow:
         self.root.mainloop()
 
 
-def start_gui():
-    app = MainWindow()
+def start_gui(metrics_port=None, engine_process=False):
+    app = MainWindow(metrics_port, engine_process)
     app.run()
 
 
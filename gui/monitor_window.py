@@ -2,6 +2,34 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext
 import threading
 import time
+from src.log_buffer import LogRecord
+
+
+# Above this many symbols the price table only keeps the rows that fit on
+# screen and maps its scrollbar onto the full symbol list itself.
+VIRTUAL_TABLE_THRESHOLD = 500
+
+# Log panel limits: lines kept in the text widget and records inserted per
+# refresh, the rest stay in the engine's log buffer for the next frame.
+LOG_MAX_LINES = 1000
+LOG_RECORDS_PER_FRAME = 500
+
+# Redraws are triggered by new snapshots and log records, at most one per
+# MIN_FRAME_INTERVAL seconds however fast they arrive.
+MIN_FRAME_INTERVAL = 0.1
+
+# Seconds the window waits for the engine threads when it is closed.
+STOP_TIMEOUT = 2.0
+
+
+def format_ms(histogram, q):
+    """q quantile of a latency histogram for display"""
+    seconds = histogram.quantile(q) if histogram is not None else None
+    if seconds is None:
+        return "-"
+    if seconds >= 1:
+        return f"{seconds:.1f} s"
+    return f"{seconds * 1000:.1f} ms"
 
 
 class MonitorWindow:
@@ -20,8 +48,32 @@ class MonitorWindow:
         self.window.geometry(f'{width}x{height}+{x}+{y}')
         
         self.running = True
+        self.rendered_version = -1
+        self.rendered_value = None
+        self.rendered_books = None
+        # Row id -> (symbol, price, stale, indicators) currently displayed,
+        # used to update only the rows whose content changed.
+        self.rendered_rows = {}
+        self.virtual = len(engine.shared_state.symbols) > VIRTUAL_TABLE_THRESHOLD
+        self.view_offset = 0
+        self.visible_rows = 8
+        self.log_lines = 0
+        self.reported_drops = 0
+        
+        metrics = engine.metrics
+        self.render_seconds = metrics.histogram(
+            "stock_monitor_render_seconds", "Time to redraw the monitor window")
+        self.tick_to_display = metrics.histogram(
+            "stock_monitor_tick_to_display_seconds",
+            "Time from a price entering price_queue to its display")
         self.setup_ui()
         
+        # Set by the engine on every published snapshot and log record.
+        self.changed = threading.Event()
+        self.changed.set()
+        engine.shared_state.subscribe(self.changed.set)
+        engine.log_queue.subscribe(self.changed.set)
+        
         self.add_log("Monitor started")
         self.add_log(f"Portfolio: {list(engine.shared_state.portfolio.keys())}")
         self.add_log(f"Alerts set for: {list(engine.shared_state.alerts.keys())}")
@@ -39,7 +91,7 @@ class MonitorWindow:
         self.window.rowconfigure(0, weight=1)
         main_frame.columnconfigure(0, weight=1)
         main_frame.rowconfigure(2, weight=1)
-        main_frame.rowconfigure(3, weight=1)
+        main_frame.rowconfigure(4, weight=1)
         
         title_label = ttk.Label(
             main_frame,
@@ -60,6 +112,12 @@ class MonitorWindow:
         )
         self.portfolio_value_label.grid(row=0, column=0)
         
+        self.books_label = None
+        if self.engine.shared_state.books is not None:
+            self.books_label = ttk.Label(value_frame, text="", font=("Arial", 10),
+                                         wraplength=820)
+            self.books_label.grid(row=1, column=0)
+        
         prices_frame = ttk.LabelFrame(main_frame, text="Current Prices", padding="10")
         prices_frame.grid(row=2, column=0, pady=(0, 15), sticky=(tk.W, tk.E, tk.N, tk.S))
         prices_frame.columnconfigure(0, weight=1)
@@ -75,29 +133,53 @@ class MonitorWindow:
         
         self.prices_tree = ttk.Treeview(
             tree_frame,
-            columns=("ticker", "price", "shares", "value", "alert"),
+            columns=("ticker", "price", "shares", "value", "alert", "ema", "vwap", "range",
+                     "volatility"),
             show="headings",
-            yscrollcommand=scrollbar.set,
             height=8
         )
-        scrollbar.config(command=self.prices_tree.yview)
+        self.prices_scrollbar = scrollbar
+        if self.virtual:
+            scrollbar.config(command=self.on_virtual_scroll)
+            self.prices_tree.bind("<Configure>", self.on_tree_resize)
+            self.prices_tree.bind("<MouseWheel>", self.on_mouse_wheel)
+            self.prices_tree.bind("<Button-4>", lambda e: self.scroll_view(-3))
+            self.prices_tree.bind("<Button-5>", lambda e: self.scroll_view(3))
+        else:
+            self.prices_tree.config(yscrollcommand=scrollbar.set)
+            scrollbar.config(command=self.prices_tree.yview)
         
         self.prices_tree.heading("ticker", text="Ticker")
         self.prices_tree.heading("price", text="Price")
         self.prices_tree.heading("shares", text="Shares")
         self.prices_tree.heading("value", text="Value")
         self.prices_tree.heading("alert", text="Alert limit")
+        self.prices_tree.heading("ema", text="EMA")
+        self.prices_tree.heading("vwap", text="VWAP")
+        self.prices_tree.heading("range", text="Day range")
+        self.prices_tree.heading("volatility", text="Volatility")
         
-        self.prices_tree.column("ticker", width=120)
-        self.prices_tree.column("price", width=120)
-        self.prices_tree.column("shares", width=120)
-        self.prices_tree.column("value", width=120)
-        self.prices_tree.column("alert", width=120)
+        self.prices_tree.column("ticker", width=90)
+        self.prices_tree.column("price", width=110)
+        self.prices_tree.column("shares", width=70)
+        self.prices_tree.column("value", width=100)
+        self.prices_tree.column("alert", width=90)
+        self.prices_tree.column("ema", width=80)
+        self.prices_tree.column("vwap", width=80)
+        self.prices_tree.column("range", width=130)
+        self.prices_tree.column("volatility", width=80)
         
+        self.prices_tree.tag_configure("alert", background="#FFCDD2")
         self.prices_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        stats_frame = ttk.LabelFrame(main_frame, text="Engine Stats", padding="5")
+        stats_frame.grid(row=3, column=0, pady=(0, 15), sticky=(tk.W, tk.E))
+        
+        self.stats_label = ttk.Label(stats_frame, text="-", font=("Consolas", 9))
+        self.stats_label.grid(row=0, column=0, sticky=tk.W)
+        
         log_frame = ttk.LabelFrame(main_frame, text="Logs and Alerts", padding="10")
-        log_frame.grid(row=3, column=0, pady=(0, 15), sticky=(tk.W, tk.E, tk.N, tk.S))
+        log_frame.grid(row=4, column=0, pady=(0, 15), sticky=(tk.W, tk.E, tk.N, tk.S))
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
         
@@ -107,10 +189,11 @@ class MonitorWindow:
             height=10,
             font=("Consolas", 9)
         )
+        self.log_text.tag_config("alert", foreground="#D32F2F", font=("Consolas", 9, "bold"))
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=4, column=0)
+        button_frame.grid(row=5, column=0)
         
         self.stop_button = ttk.Button(
             button_frame,
@@ -121,13 +204,17 @@ class MonitorWindow:
         self.stop_button.pack(side=tk.LEFT, padx=5)
         
     def update_loop(self):
-        """Background thread that updates the GUI"""
+        """Background thread that schedules a redraw whenever the engine signals a change"""
         while self.running:
+            self.changed.wait()
+            if not self.running:
+                break
+            self.changed.clear()
             try:
                 self.window.after(0, self.update_display)
-                time.sleep(2)
             except:
                 break
+            self.engine.stop_event.wait(MIN_FRAME_INTERVAL)
     
     def update_display(self):
         """Update GUI with current data from engine"""
@@ -135,77 +222,214 @@ class MonitorWindow:
             return
         
         try:
-            with self.engine.shared_state.lock:
-                value = self.engine.shared_state.portfolio_value
-                self.portfolio_value_label.config(text=f"${value:,.2f}")
-                
-                for item in self.prices_tree.get_children():
-                    self.prices_tree.delete(item)
-                
-                prices = self.engine.shared_state.prices
-                portfolio = self.engine.shared_state.portfolio
-                alerts = self.engine.shared_state.alerts
-                
-                for symbol in self.engine.shared_state.symbols:
-                    price = prices.get(symbol, 0.0)
-                    shares = portfolio.get(symbol, 0)
-                    stock_value = price * shares if shares > 0 else 0
-                    alert_limit = alerts.get(symbol, None)
-                    
-                    alert_str = f"${alert_limit:.2f}" if alert_limit else "-"
-                    
-                    tag = ""
-                    if alert_limit and price > alert_limit:
-                        tag = "alert"
-                    
-                    self.prices_tree.insert(
-                        "", 
-                        tk.END, 
-                        values=(
-                            symbol, 
-                            f"${price:.2f}", 
-                            shares if shares > 0 else "-",
-                            f"${stock_value:.2f}" if stock_value > 0 else "-",
-                            alert_str
-                        ),
-                        tags=(tag,)
-                    )
-                
-                self.prices_tree.tag_configure("alert", background="#FFCDD2")
+            # Snapshots are immutable, so the redraw below never holds
+            # SharedState.lock and never blocks the worker threads.
+            snapshot = self.engine.shared_state.snapshot
+            if snapshot.version != self.rendered_version:
+                started = time.perf_counter()
+                self.render_snapshot(snapshot)
+                self.render_seconds.observe(time.perf_counter() - started)
+                if snapshot.received_at is not None:
+                    self.tick_to_display.observe(max(0.0, time.time() - snapshot.received_at))
+                self.rendered_version = snapshot.version
+            self.update_stats()
             
-            while not self.engine.log_queue.empty():
-                try:
-                    msg = self.engine.log_queue.get_nowait()
-                    self.add_log(msg)
-                except:
-                    break
+            log_buffer = self.engine.log_queue
+            records = log_buffer.drain(LOG_RECORDS_PER_FRAME)
+            if log_buffer.dropped != self.reported_drops:
+                records.append(LogRecord(
+                    "WARNING", "message", "{count} log records dropped (log buffer full)",
+                    count=log_buffer.dropped - self.reported_drops
+                ))
+                self.reported_drops = log_buffer.dropped
+            if records:
+                self.add_records(records)
+            if not log_buffer.empty():
+                # More records than fit in one frame; come back for the rest.
+                self.changed.set()
                     
         except Exception as e:
             self.add_log(f"Error updating display: {e}")
     
+    def update_stats(self):
+        """Show the main engine metrics in the stats panel"""
+        metrics = self.engine.metrics
+        fetch = metrics.get("stock_monitor_fetch_seconds")
+        lock_hold = metrics.get("stock_monitor_lock_hold_seconds", stage="portfolio")
+        price_queue = self.engine.price_queue
+        self.stats_label.config(text=(
+            f"Fetch p50 {format_ms(fetch, 0.5)}, p99 {format_ms(fetch, 0.99)}"
+            f"  |  Queue {price_queue.qsize()} ({price_queue.conflated} conflated)"
+            f"  |  Lock hold p99 {format_ms(lock_hold, 0.99)}"
+            f"  |  Tick to display p50 {format_ms(self.tick_to_display, 0.5)}"
+            f"  |  Render p99 {format_ms(self.render_seconds, 0.99)}"
+        ))
+    
+    def render_snapshot(self, snapshot):
+        """Bring portfolio value and price table in line with a state snapshot"""
+        value = (snapshot.portfolio_value, bool(snapshot.stale))
+        if value != self.rendered_value:
+            text = f"${snapshot.portfolio_value:,.2f}"
+            if snapshot.stale:
+                text += " (stale)"
+            self.portfolio_value_label.config(text=text)
+            self.rendered_value = value
+        
+        # The mapping is only replaced when a book's value changed.
+        if self.books_label is not None and snapshot.book_values is not self.rendered_books:
+            self.books_label.config(text="   ".join(
+                f"{name}: ${value:,.2f}" for name, value in snapshot.book_values.items()
+            ))
+            self.rendered_books = snapshot.book_values
+        
+        symbols = snapshot.symbols
+        if self.virtual:
+            first = min(self.view_offset, max(0, len(symbols) - self.visible_rows))
+            self.view_offset = first
+            window = symbols[first:first + self.visible_rows]
+            rows = [(f"row{i}", symbol) for i, symbol in enumerate(window)]
+            self.update_virtual_scrollbar(len(symbols))
+        else:
+            # Stable item ids per symbol, so unchanged rows are never touched.
+            rows = [(symbol, symbol) for symbol in symbols]
+        
+        self.sync_rows(rows, snapshot)
+    
+    def sync_rows(self, rows, snapshot):
+        """Update, insert and delete only the Treeview rows that differ"""
+        prices = snapshot.prices
+        shown = set()
+        
+        for iid, symbol in rows:
+            shown.add(iid)
+            key = (symbol, prices.get(symbol, 0.0), symbol in snapshot.stale,
+                   snapshot.indicators.get(symbol))
+            if self.rendered_rows.get(iid) == key:
+                continue
+            
+            values, tag = self.format_row(snapshot, symbol)
+            if iid in self.rendered_rows:
+                self.prices_tree.item(iid, values=values, tags=(tag,))
+            else:
+                self.prices_tree.insert("", tk.END, iid=iid, values=values, tags=(tag,))
+            self.rendered_rows[iid] = key
+        
+        for iid in [iid for iid in self.rendered_rows if iid not in shown]:
+            self.prices_tree.delete(iid)
+            del self.rendered_rows[iid]
+    
+    def format_row(self, snapshot, symbol):
+        price = snapshot.prices.get(symbol, 0.0)
+        shares = snapshot.portfolio.get(symbol, 0)
+        stock_value = price * shares if shares > 0 else 0
+        alert_limit = snapshot.alerts.get(symbol, None)
+        
+        alert_str = f"${alert_limit:.2f}" if alert_limit else "-"
+        
+        tag = ""
+        if alert_limit and price > alert_limit:
+            tag = "alert"
+        
+        price_str = f"${price:.2f}"
+        if symbol in snapshot.stale:
+            price_str += " (stale)"
+        
+        values = (
+            symbol, 
+            price_str, 
+            shares if shares > 0 else "-",
+            f"${stock_value:.2f}" if stock_value > 0 else "-",
+            alert_str
+        ) + self.format_indicators(snapshot.indicators.get(symbol))
+        return values, tag
+    
+    @staticmethod
+    def format_indicators(indicators):
+        if indicators is None:
+            return ("-", "-", "-", "-")
+        ema, vwap, volatility, high, low = indicators
+        return (
+            f"${ema:.2f}",
+            f"${vwap:.2f}",
+            f"${low:.2f} - ${high:.2f}",
+            f"{volatility:.2f}%" if volatility is not None else "-",
+        )
+    
+    def update_virtual_scrollbar(self, total):
+        if not total:
+            self.prices_scrollbar.set(0.0, 1.0)
+            return
+        first = self.view_offset / total
+        last = min(1.0, (self.view_offset + self.visible_rows) / total)
+        self.prices_scrollbar.set(first, last)
+    
+    def scroll_view(self, offset_change):
+        self.set_view_offset(self.view_offset + offset_change)
+    
+    def set_view_offset(self, offset):
+        snapshot = self.engine.shared_state.snapshot
+        offset = max(0, min(offset, len(snapshot.symbols) - self.visible_rows))
+        if offset != self.view_offset:
+            self.view_offset = offset
+            self.render_snapshot(snapshot)
+    
+    def on_virtual_scroll(self, *args):
+        """Scrollbar command in virtual mode ("moveto" or "scroll" requests)"""
+        total = len(self.engine.shared_state.snapshot.symbols)
+        if args[0] == "moveto":
+            self.set_view_offset(int(float(args[1]) * total))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.scroll_view(int(args[1]) * step)
+    
+    def on_mouse_wheel(self, event):
+        self.scroll_view(-3 if event.delta > 0 else 3)
+    
+    def on_tree_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible_rows = max(1, (event.height - row_height) // row_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.render_snapshot(self.engine.shared_state.snapshot)
+    
     def add_log(self, message):
         """Add a log message to the log text widget"""
-        timestamp = time.strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {message}\n"
+        if not isinstance(message, LogRecord):
+            level = "ALERT" if "ALERT" in message.upper() else "INFO"
+            message = LogRecord(level, "message", message)
+        self.add_records([message])
+    
+    def add_records(self, records):
+        """Insert a batch of log records into the text widget in one call"""
+        chunks = []
+        lines = 0
+        last_second = None
+        for record in records:
+            second = int(record.created)
+            if second != last_second:
+                timestamp = time.strftime("%H:%M:%S", time.localtime(second))
+                last_second = second
+            text = f"[{timestamp}] {record}\n"
+            chunks.append(text)
+            chunks.append("alert" if record.level == "ALERT" else "")
+            lines += text.count("\n")
         
-        self.log_text.insert(tk.END, log_entry)
+        self.log_text.insert(tk.END, *chunks)
+        self.log_lines += lines
         
-        if "ALERT" in message.upper():
-            last_line = self.log_text.index("end-1c linestart")
-            self.log_text.tag_add("alert", last_line, "end-1c")
-            self.log_text.tag_config("alert", foreground="#D32F2F", font=("Consolas", 9, "bold"))
+        if self.log_lines > LOG_MAX_LINES:
+            excess = self.log_lines - LOG_MAX_LINES
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_lines = LOG_MAX_LINES
         
         self.log_text.see(tk.END)
-        
-        lines = int(self.log_text.index('end-1c').split('.')[0])
-        if lines > 1000:
-            self.log_text.delete('1.0', '2.0')
     
     def on_closing(self):
+        if not self.running:
+            return
         self.running = False
-        self.engine.stop_event.set()
-        
-        time.sleep(0.5)
+        self.changed.set()
+        self.engine.stop(timeout=STOP_TIMEOUT)
         
         self.window.destroy()
         
@@ -1,4 +1,36 @@
-from gui.main_window import start_gui
+import argparse
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stock Trading Monitor")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the engine without GUI")
+    parser.add_argument("--config", help="portfolio/alerts file for headless mode")
+    parser.add_argument("--log-file", help="write logs to this file instead of stdout")
+    parser.add_argument("--status-interval", type=float, default=10.0,
+                        help="seconds between status lines, 0 disables them")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--engine-process", action="store_true",
+                        help="run the engine in a child process (GUI mode)")
+    args = parser.parse_args(argv)
+
+    # GUI and engine modules are imported only for the mode that is used.
+    if args.headless:
+        if not args.config:
+            parser.error("--headless requires --config")
+        from src.service import run_service
+        return run_service(args.config, args.log_file, args.status_interval, STARTED,
+                           args.metrics_port)
+
+    from gui.main_window import start_gui
+    start_gui(metrics_port=args.metrics_port, engine_process=args.engine_process)
+    return 0
+
 
 if __name__ == "__main__":
-    start_gui()
+    sys.exit(main())
@@ -0,0 +1,403 @@
+import re
+import time
+import numpy as np
+from src.indicators import INDICATOR_FIELDS, IndicatorTable
+from src.poll_scheduler import MarketCalendar
+
+
+class Rule:
+    """Base class of alert rules. str(rule) is its text form, see parse_rule()."""
+
+    symbol = None
+
+    def __eq__(self, other):
+        return type(self) is type(other) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str(self)!r})"
+
+
+class PriceRule(Rule):
+    """Price above (op ">") or below (op "<") a limit"""
+
+    def __init__(self, symbol, op, limit):
+        if op not in (">", "<"):
+            raise ValueError(f"unknown operator {op!r}")
+        self.symbol = symbol
+        self.op = op
+        self.limit = float(limit)
+
+    def __str__(self):
+        return f"{self.symbol} {self.op} {self.limit:g}"
+
+
+class MoveRule(Rule):
+    """Price moved percent (signed) from the session open"""
+
+    def __init__(self, symbol, percent):
+        if not percent:
+            raise ValueError("move percent must not be zero")
+        self.symbol = symbol
+        self.percent = float(percent)
+
+    def __str__(self):
+        direction = "up" if self.percent > 0 else "down"
+        return f"{self.symbol} {direction} {abs(self.percent):g}%"
+
+
+class CrossRule(Rule):
+    """Fast moving average crosses above or below the slow one.
+
+    The averages are exponential over the last fast and slow ticks, so
+    they are updated in O(1) per tick.
+    """
+
+    def __init__(self, symbol, fast, slow, direction="above"):
+        if direction not in ("above", "below"):
+            raise ValueError(f"unknown direction {direction!r}")
+        if not 0 < fast < slow:
+            raise ValueError("moving averages need 0 < fast < slow")
+        self.symbol = symbol
+        self.fast = int(fast)
+        self.slow = int(slow)
+        self.direction = direction
+
+    def __str__(self):
+        return f"{self.symbol} ma({self.fast}) crosses {self.direction} ma({self.slow})"
+
+
+class DrawdownRule(Rule):
+    """Portfolio (or book) value fell percent below its peak"""
+
+    def __init__(self, percent, book=None):
+        if not 0 < percent < 100:
+            raise ValueError("drawdown percent must be between 0 and 100")
+        self.percent = float(percent)
+        self.book = book
+
+    def __str__(self):
+        text = f"drawdown {self.percent:g}%"
+        return f"{text} in {self.book}" if self.book else text
+
+
+class IndicatorRule(Rule):
+    """Price above or below its EMA or VWAP, or volatility above a percent.
+
+    field is one of the IndicatorValues fields computed by
+    src.indicators.Indicators: "ema" or "vwap" compare the price to the
+    indicator, "volatility" compares the indicator to limit.
+    """
+
+    FIELDS = ("ema", "vwap", "volatility")
+
+    def __init__(self, symbol, field, op=">", limit=None):
+        if field not in self.FIELDS:
+            raise ValueError(f"unknown indicator {field!r}")
+        if op not in (">", "<"):
+            raise ValueError(f"unknown operator {op!r}")
+        if (field == "volatility") != (limit is not None):
+            raise ValueError("only volatility rules take a limit")
+        if limit is not None and float(limit) <= 0:
+            raise ValueError("volatility limit must be positive")
+        self.symbol = symbol
+        self.field = field
+        self.op = op
+        self.limit = None if limit is None else float(limit)
+
+    def __str__(self):
+        if self.limit is None:
+            return f"{self.symbol} {self.op} {self.field}"
+        return f"{self.symbol} {self.field} {self.op} {self.limit:g}%"
+
+
+NUMBER = r"([-+]?\d+(?:\.\d+)?)"
+SYMBOL = r"([A-Za-z0-9^][A-Za-z0-9.=^-]*)"
+RULE_PATTERNS = [
+    (re.compile(rf"^{SYMBOL}\s*([<>])\s*{NUMBER}$"),
+     lambda m: PriceRule(m[1].upper(), m[2], m[3])),
+    (re.compile(rf"^{SYMBOL}\s+(up|down)\s+{NUMBER}\s*%$", re.I),
+     lambda m: MoveRule(m[1].upper(), float(m[3]) * (1 if m[2].lower() == "up" else -1))),
+    (re.compile(rf"^{SYMBOL}\s+ma\((\d+)\)\s+crosses\s+(above|below)\s+ma\((\d+)\)$", re.I),
+     lambda m: CrossRule(m[1].upper(), int(m[2]), int(m[4]), m[3].lower())),
+    (re.compile(rf"^{SYMBOL}\s*([<>])\s*(ema|vwap)$", re.I),
+     lambda m: IndicatorRule(m[1].upper(), m[3].lower(), m[2])),
+    (re.compile(rf"^{SYMBOL}\s+volatility\s*([<>])\s*{NUMBER}\s*%$", re.I),
+     lambda m: IndicatorRule(m[1].upper(), "volatility", m[2], m[3])),
+    (re.compile(rf"^drawdown\s+{NUMBER}\s*%(?:\s+in\s+(\S+))?$", re.I),
+     lambda m: DrawdownRule(float(m[1]), m[2])),
+]
+
+
+def parse_rule(text):
+    """Parse one rule. Raises ValueError for anything else.
+
+        AAPL > 200                   price above a limit
+        AAPL < 150                   price below a limit
+        TSLA up 5%                   moved 5% up from the session open
+        TSLA down 3%                 moved 3% down from the session open
+        MSFT ma(5) crosses above ma(20)
+        AAPL > ema                   price above its EMA (also < and vwap)
+        AAPL volatility > 2%         rolling volatility above 2%
+        drawdown 10%                 portfolio 10% below its peak value
+        drawdown 10% in alice        the same for one book
+    """
+    text = " ".join(str(text).split())
+    for pattern, build in RULE_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            return build(match)
+    raise ValueError(f"cannot parse alert rule {text!r}")
+
+
+class ThresholdGroup:
+    """Edge-triggered "direction * (value - threshold) > 0" checks over arrays.
+
+    A rule fires once when the condition becomes true and is re-armed when
+    the value is back by more than hysteresis * scale on the other side.
+    """
+
+    def __init__(self, rules, threshold, direction, scale, hysteresis, inclusive=False):
+        self.rules = rules
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.direction = np.asarray(direction, dtype=np.float64)
+        self.rearm_margin = hysteresis * np.abs(np.asarray(scale, dtype=np.float64))
+        self.inclusive = inclusive
+        self.fired = np.zeros(len(rules), dtype=bool)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def evaluate(self, values):
+        """Return indexes of the rules that fire for the current values"""
+        with np.errstate(invalid="ignore"):
+            signed = self.direction * (values - self.threshold)
+            active = signed >= 0 if self.inclusive else signed > 0
+            self.fired &= ~(signed < -self.rearm_margin)
+        new = active & ~self.fired
+        self.fired |= active
+        return np.flatnonzero(new)
+
+
+class RuleEngine:
+    """Alert rules compiled into vectorized checks over price arrays.
+
+    Rules are grouped by type. Each group keeps its parameters in NumPy
+    arrays indexed like its rule list, and evaluate() checks a whole group
+    with a few array operations instead of a Python loop per rule:
+
+        engine = RuleEngine(["AAPL > 200", "TSLA down 3%"])
+        fired = engine.evaluate([("AAPL", 201.0)])   # [(rule, value), ...]
+
+    The session open used by move rules is the first price seen for a
+    symbol in its current trading session. calendar, a MarketCalendar,
+    tells when the next session of a symbol opens; the first price after
+    that becomes the new open. Symbols trading around the clock keep their
+    open until reset_session().
+    """
+
+    def __init__(self, rules, hysteresis=0.005, calendar=None):
+        self.rules = [rule if isinstance(rule, Rule) else parse_rule(rule) for rule in rules]
+        self.hysteresis = hysteresis
+        self.calendar = MarketCalendar() if calendar is None else calendar
+
+        symbols = {}
+        for rule in self.rules:
+            if rule.symbol is not None:
+                symbols.setdefault(rule.symbol, len(symbols))
+        self.ids = symbols
+        self.prices = np.full(len(symbols), np.nan)
+        self.opens = np.full(len(symbols), np.nan)
+        # Wall time the next session opens, per symbol with an open.
+        self.reopens = np.full(len(symbols), np.inf)
+        self.changed = np.zeros(len(symbols), dtype=bool)
+        # Latest indicator values, one row per IndicatorValues field.
+        self.indicators = np.full((len(INDICATOR_FIELDS), len(symbols)), np.nan)
+        self.compile()
+
+    def compile(self):
+        by_type = {}
+        for rule in self.rules:
+            by_type.setdefault(type(rule), []).append(rule)
+        h = self.hysteresis
+
+        rules = by_type.get(PriceRule, [])
+        self.price_ids = self.symbol_ids(rules)
+        limits = [rule.limit for rule in rules]
+        self.price_group = ThresholdGroup(
+            rules, limits, [1 if rule.op == ">" else -1 for rule in rules], limits, h
+        )
+
+        rules = by_type.get(MoveRule, [])
+        self.move_ids = self.symbol_ids(rules)
+        moves = [rule.percent / 100 for rule in rules]
+        self.move_group = ThresholdGroup(
+            rules, moves, np.sign(moves), moves, h, inclusive=True
+        )
+
+        rules = by_type.get(CrossRule, [])
+        self.cross_ids = self.symbol_ids(rules)
+        self.fast_alpha = np.array([2 / (rule.fast + 1) for rule in rules])
+        self.slow_alpha = np.array([2 / (rule.slow + 1) for rule in rules])
+        self.warmup = np.array([rule.slow for rule in rules], dtype=np.int64)
+        self.fast_ma = np.full(len(rules), np.nan)
+        self.slow_ma = np.full(len(rules), np.nan)
+        self.ticks = np.zeros(len(rules), dtype=np.int64)
+        # The cross threshold is 0, so its hysteresis is scaled by the price.
+        self.cross_group = ThresholdGroup(
+            rules, np.zeros(len(rules)),
+            [1 if rule.direction == "above" else -1 for rule in rules], np.zeros(len(rules)), h
+        )
+
+        rules = by_type.get(DrawdownRule, [])
+        self.drawdown_books = [rule.book for rule in rules]
+        self.peaks = np.full(len(rules), np.nan)
+        drawdowns = [rule.percent / 100 for rule in rules]
+        self.drawdown_group = ThresholdGroup(
+            rules, drawdowns, np.ones(len(rules)), drawdowns, h, inclusive=True
+        )
+
+        rules = by_type.get(IndicatorRule, [])
+        self.indicator_ids = self.symbol_ids(rules)
+        self.indicator_fields = np.array(
+            [INDICATOR_FIELDS.index(rule.field) for rule in rules], dtype=np.int64
+        )
+        # Price-vs-indicator rules compare price - indicator with 0 and
+        # scale their hysteresis by the price, like cross rules.
+        self.indicator_relative = np.array([rule.limit is None for rule in rules], dtype=bool)
+        limits = [rule.limit or 0.0 for rule in rules]
+        self.indicator_group = ThresholdGroup(
+            rules, limits, [1 if rule.op == ">" else -1 for rule in rules], limits, h
+        )
+
+    def symbol_ids(self, rules):
+        return np.array([self.ids[rule.symbol] for rule in rules], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.rules)
+
+    @property
+    def symbols(self):
+        return list(self.ids)
+
+    def reset_session(self):
+        """Forget the session open prices; the next price of each symbol is the new open"""
+        self.opens[:] = np.nan
+
+    def update(self, items, wall=None):
+        """Store (symbol, price) updates and mark their symbols changed"""
+        ids = self.ids
+        pairs = [(ids[symbol], price) for symbol, price in items if symbol in ids]
+        if not pairs:
+            return
+        wall = time.time() if wall is None else wall
+        index = np.fromiter((i for i, _ in pairs), dtype=np.int64, count=len(pairs))
+        values = np.fromiter((p for _, p in pairs), dtype=np.float64, count=len(pairs))
+        self.prices[index] = values
+        unopened = np.isnan(self.opens[index]) | (self.reopens[index] <= wall)
+        if unopened.any():
+            self.opens[index[unopened]] = values[unopened]
+            symbols = self.symbols
+            for i in np.unique(index[unopened]).tolist():
+                reopens = self.calendar.next_open(symbols[i], wall)
+                self.reopens[i] = np.inf if reopens is None else reopens
+        self.changed[index] = True
+
+    def update_indicators(self, symbols, indicators):
+        """Copy the IndicatorValues of symbols from the indicators mapping"""
+        ids = self.ids
+        table = self.indicators
+        if isinstance(indicators, IndicatorTable):
+            # Copy whole columns instead of building IndicatorValues.
+            width = indicators.size
+            pairs = [(ids[symbol], indicators.ids.get(symbol, width)) for symbol in symbols
+                     if symbol in ids]
+            pairs = [(i, j) for i, j in pairs if j < width]
+            if pairs:
+                rows, columns = zip(*pairs)
+                table[:, list(rows)] = indicators.take(columns)
+            return
+        for symbol in symbols:
+            i = ids.get(symbol)
+            row = indicators.get(symbol) if i is not None else None
+            if row is not None:
+                table[:, i] = [np.nan if value is None else value for value in row]
+
+    def evaluate(self, items=(), values=None, indicators=None, wall=None):
+        """Apply (symbol, price) updates and return the rules that fired.
+
+        values maps None (the whole portfolio) or a book name to its current
+        value for drawdown rules, indicators a symbol to its IndicatorValues
+        for indicator rules. wall is the time.time() of the updates. Returns
+        a list of (rule, value) where value is the price, the move, drawdown
+        or volatility in percent, or the fast average.
+        """
+        items = list(items)
+        self.update(items, wall)
+        if indicators is not None and len(self.indicator_group):
+            self.update_indicators((symbol for symbol, _ in items), indicators)
+        fired = []
+        prices = self.prices
+
+        if len(self.price_group):
+            current = prices[self.price_ids]
+            for i in self.price_group.evaluate(current).tolist():
+                fired.append((self.price_group.rules[i], float(current[i])))
+
+        if len(self.move_group):
+            move = prices[self.move_ids] / self.opens[self.move_ids] - 1
+            for i in self.move_group.evaluate(move).tolist():
+                fired.append((self.move_group.rules[i], round(float(move[i]) * 100, 4)))
+
+        if len(self.cross_group) and self.changed.any():
+            difference = self.update_averages()
+            for i in self.cross_group.evaluate(difference).tolist():
+                fired.append((self.cross_group.rules[i], float(self.fast_ma[i])))
+
+        if len(self.drawdown_group) and values is not None:
+            current = np.array([values.get(book, np.nan) for book in self.drawdown_books])
+            self.peaks = np.fmax(self.peaks, current)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                drawdown = np.where(self.peaks > 0, 1 - current / self.peaks, np.nan)
+            for i in self.drawdown_group.evaluate(drawdown).tolist():
+                fired.append((self.drawdown_group.rules[i], round(float(drawdown[i]) * 100, 4)))
+
+        if len(self.indicator_group):
+            group = self.indicator_group
+            price = prices[self.indicator_ids]
+            current = self.indicators[self.indicator_fields, self.indicator_ids]
+            relative = self.indicator_relative
+            difference = np.where(relative, price - current, current)
+            group.rearm_margin = self.hysteresis * np.abs(np.where(relative, price, group.threshold))
+            for i in group.evaluate(difference).tolist():
+                value = float(price[i]) if relative[i] else round(float(current[i]), 4)
+                fired.append((group.rules[i], value))
+
+        self.changed[:] = False
+        return fired
+
+    def update_averages(self):
+        """Advance the moving averages of rules whose symbol changed"""
+        ids = self.cross_ids
+        step = self.changed[ids]
+        price = self.prices[ids]
+        first = step & np.isnan(self.slow_ma)
+        self.fast_ma[first] = price[first]
+        self.slow_ma[first] = price[first]
+        step &= ~first
+        self.fast_ma[step] += self.fast_alpha[step] * (price[step] - self.fast_ma[step])
+        self.slow_ma[step] += self.slow_alpha[step] * (price[step] - self.slow_ma[step])
+        changed = self.changed[ids]
+        self.ticks[changed] += 1
+
+        difference = self.fast_ma - self.slow_ma
+        # No signal until the slow average has seen a full window. A rule
+        # that starts out on the alert side needs an actual cross to fire.
+        difference[self.ticks < self.warmup] = np.nan
+        group = self.cross_group
+        warmed = changed & (self.ticks == self.warmup)
+        group.fired[warmed] = group.direction[warmed] * difference[warmed] > 0
+        group.rearm_margin = self.hysteresis * np.abs(self.slow_ma)
+        return difference
@@ -0,0 +1,60 @@
+from bisect import bisect_left, bisect_right
+
+
+class AlertIndex:
+    """Per-symbol sorted alert thresholds with edge-triggered evaluation.
+
+    A threshold fires once when the price rises above it and is re-armed only
+    after the price falls back below limit * (1 - hysteresis). Because a price
+    above some limit is also above every lower one, the fired thresholds of a
+    symbol are always a prefix of its sorted list, so only their count is kept.
+    """
+
+    def __init__(self, hysteresis=0.005):
+        self.hysteresis = hysteresis
+        self.thresholds = {}
+        self.triggered = {}
+
+    def __contains__(self, symbol):
+        return symbol in self.thresholds
+
+    def __len__(self):
+        return sum(len(limits) for limits in self.thresholds.values())
+
+    def add(self, symbol, limit):
+        limits = self.thresholds.setdefault(symbol, [])
+        position = bisect_left(limits, limit)
+        limits.insert(position, limit)
+        # Thresholds above the new one are re-evaluated on the next tick.
+        self.triggered[symbol] = min(self.triggered.get(symbol, 0), position)
+
+    def remove(self, symbol, limit):
+        limits = self.thresholds.get(symbol)
+        if not limits or limit not in limits:
+            return
+        position = limits.index(limit)
+        del limits[position]
+        if position < self.triggered[symbol]:
+            self.triggered[symbol] -= 1
+        if not limits:
+            del self.thresholds[symbol]
+            del self.triggered[symbol]
+
+    def update(self, symbol, price):
+        """Return the limits that the new price has just crossed upwards"""
+        limits = self.thresholds.get(symbol)
+        if not limits:
+            return []
+
+        fired = self.triggered[symbol]
+        above = bisect_left(limits, price)
+        if above > fired:
+            self.triggered[symbol] = above
+            return limits[fired:above]
+
+        if fired:
+            # Limits with price < limit * (1 - hysteresis) are armed again.
+            still_fired = bisect_right(limits, price / (1 - self.hysteresis))
+            if still_fired < fired:
+                self.triggered[symbol] = still_fired
+        return []
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from src.log_buffer import LogRecord
+from src.price_sources import AsyncPriceSource, YahooChartSource
+from src.trade_engine import TradeEngine
+
+
+class EventLoopThread(threading.Thread):
+    """Thread that runs an AsyncTradeEngine's event loop until it stops"""
+
+    def __init__(self, engine):
+        super().__init__(daemon=True)
+        self.engine = engine
+
+    def run(self):
+        asyncio.run(self.engine.main())
+
+
+class AsyncTradeEngine(TradeEngine):
+    """TradeEngine whose pipeline runs as coroutines on one event loop.
+
+    Fetching, valuation and alert checks are three tasks on a single
+    thread instead of three threads. An AsyncPriceSource such as the
+    default YahooChartSource keeps many requests in flight at once and
+    hands over prices as they arrive; other sources are fetched on a worker
+    thread. The stages reuse the producer's publishing, PortfolioConsumer's
+    batching and AlertConsumer's checks, so shared_state, log_queue,
+    metrics, checkpoints and start()/stop() behave as in TradeEngine.
+    """
+
+    def __init__(self, portfolio, alerts, symbols, price_source=None, **kwargs):
+        if price_source is None:
+            price_source = YahooChartSource()
+        super().__init__(portfolio, alerts, symbols, price_source=price_source, **kwargs)
+        self.source = price_source
+        self.loop_thread = EventLoopThread(self)
+        self.loop = None
+
+    def start(self):
+        self.log_queue.put("Starting event loop...")
+        self.start_services()
+        self.loop_thread.start()
+
+    def threads(self):
+        threads = super().threads()
+        if self.loop_thread.ident is not None:
+            threads.insert(0, self.loop_thread)
+        return threads
+
+    async def main(self):
+        self.stopping = asyncio.Event()
+        self.prices_ready = asyncio.Event()
+        self.alerts_ready = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        # Runs right away when stop() came before the loop was up.
+        self.stop_event.on_set(self.wake)
+        tasks = [asyncio.create_task(stage) for stage in (
+            self.produce(), self.value(), self.check_alerts()
+        )]
+        await self.stopping.wait()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+        except RuntimeError:
+            # The loop has already finished.
+            pass
+
+    async def produce(self):
+        producer = self.producer
+        scheduler = producer.scheduler
+        shared = self.shared_state
+        client = self.source.connect() if isinstance(self.source, AsyncPriceSource) else None
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    symbols = shared.symbols
+                    if not symbols:
+                        self.log_queue.put(LogRecord(
+                            "ERROR", "producer", "Producer ERROR: No symbols defined."
+                        ))
+                        await asyncio.sleep(5)
+                        continue
+
+                    if scheduler is not None:
+                        scheduler.sync(symbols, shared.portfolio, shared.alerts)
+                        symbols = scheduler.due()
+                        if not symbols:
+                            next_due = scheduler.next_due()
+                            delay = 1.0 if next_due is None else next_due - time.monotonic()
+                            await asyncio.sleep(min(max(delay, 0.01), 1.0))
+                            continue
+
+                    if client is None:
+                        # Blocking sources keep the producer's retries.
+                        try:
+                            prices = await asyncio.to_thread(producer.fetch_shard, symbols)
+                        except Exception:
+                            producer.reschedule(failed=symbols)
+                            raise
+                        self.deliver(prices, symbols)
+                    else:
+                        await self.fetch(symbols, client)
+
+                except Exception as e:
+                    self.log_queue.put(LogRecord(
+                        "ERROR", "producer", "{source} ERROR: {error}",
+                        source=self.source.name, error=e
+                    ))
+
+                if scheduler is not None:
+                    continue
+                remaining = self.source.poll_interval - (time.monotonic() - started)
+                await asyncio.sleep(max(remaining, 0))
+        finally:
+            if client is not None:
+                await client.close()
+
+    async def fetch(self, symbols, client):
+        """Request symbols concurrently and publish prices as they arrive"""
+        producer = self.producer
+        started = time.perf_counter()
+        errors = {}
+        async for prices in self.source.stream(symbols, client):
+            self.deliver(prices, list(prices) + prices.missing + list(prices.errors))
+            errors.update(prices.errors)
+        producer.fetch_seconds.observe(time.perf_counter() - started)
+        if errors:
+            # One line per cycle, not one per failed symbol.
+            producer.fetch_errors.inc(len(errors))
+            symbol, error = next(iter(errors.items()))
+            self.log_queue.put(LogRecord(
+                "ERROR", "producer",
+                "{source} ERROR: {count} of {total} requests failed, {symbol}: {error}",
+                source=self.source.name, count=len(errors), total=len(symbols),
+                symbol=symbol, error=error
+            ))
+
+    def deliver(self, prices, requested):
+        self.producer.publish(prices, requested)
+        if prices:
+            self.prices_ready.set()
+
+    async def value(self):
+        consumer = self.portfolio_consumer
+        shared = self.shared_state
+        while True:
+            await self.prices_ready.wait()
+            self.prices_ready.clear()
+            # Everything queued since the last round is applied in as few
+            # batches as possible; fetches continue between batches.
+            while True:
+                batch = self.price_queue.drain(consumer.max_batch)
+                if not batch:
+                    break
+                shared.received_at = self.price_queue.taken_since
+                consumer.process(batch)
+                self.alerts_ready.set()
+                await asyncio.sleep(0)
+
+    async def check_alerts(self):
+        consumer = self.alert_consumer
+        crossings, rule_hits = consumer.check_initial()
+        while True:
+            consumer.emit(crossings, rule_hits)
+            await self.alerts_ready.wait()
+            self.alerts_ready.clear()
+            crossings, rule_hits = consumer.check_changed()
@@ -0,0 +1,139 @@
+"""Minimal non-blocking HTTP/1.1 client on asyncio streams.
+
+Only what the price sources need: GET requests to one host, keep-alive
+connections, Content-Length and chunked bodies, JSON decoding. No third
+party package is required.
+"""
+import asyncio
+import json
+import ssl
+from urllib.parse import urlsplit
+
+USER_AGENT = "Mozilla/5.0 (compatible; stock-monitor)"
+
+
+class HttpError(Exception):
+    """Response with a status other than 200"""
+
+    def __init__(self, status, body=b""):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.body = body
+
+
+class AsyncHttpClient:
+    """GET client for one base URL with up to max_connections open at a time.
+
+    Connections are kept alive and reused. A request that finds its reused
+    connection closed by the server is retried once on a new one. timeout
+    bounds each request, not counting the wait for a free connection.
+    """
+
+    def __init__(self, base_url, max_connections=64, timeout=10.0, headers=None):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"unsupported URL {base_url!r}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.headers = {
+            "Host": parts.netloc,
+            "User-Agent": USER_AGENT,
+            "Accept": "application/json",
+            "Accept-Encoding": "identity",
+            "Connection": "keep-alive",
+            **(headers or {}),
+        }
+        self.slots = asyncio.Semaphore(max_connections)
+        self.idle = []
+        self.opened = 0
+
+    async def get(self, path):
+        """Return (status, headers, body) of GET path"""
+        async with self.slots:
+            return await asyncio.wait_for(self._get(path), self.timeout)
+
+    async def get_json(self, path):
+        status, headers, body = await self.get(path)
+        if status != 200:
+            raise HttpError(status, body)
+        return json.loads(body)
+
+    async def _get(self, path):
+        request = "".join(
+            [f"GET {self.prefix}{path} HTTP/1.1\r\n"]
+            + [f"{name}: {value}\r\n" for name, value in self.headers.items()]
+            + ["\r\n"]
+        ).encode("latin-1")
+        for attempt in range(2):
+            reused = bool(self.idle)
+            if reused:
+                reader, writer = self.idle.pop()
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+                self.opened += 1
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, headers, body, keep_alive = await self.read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                # Includes cancellation by the timeout: the connection is
+                # in an unknown state and cannot be reused.
+                writer.close()
+                raise
+            if keep_alive:
+                self.idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, headers, body
+
+    @staticmethod
+    async def read_response(reader):
+        line = await reader.readline()
+        if not line:
+            raise ConnectionResetError("connection closed by server")
+        version, status = line.decode("latin-1").split()[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    # Skip trailers up to the blank line.
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return int(status), headers, body, keep_alive
+
+    async def close(self):
+        idle, self.idle = self.idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
@@ -0,0 +1,121 @@
+import math
+
+
+class Book:
+    """One named portfolio with its own alerts and incrementally kept value"""
+
+    __slots__ = ("name", "portfolio", "alerts", "position_values", "total", "value")
+
+    def __init__(self, name, portfolio, alerts):
+        self.name = name
+        self.portfolio = dict(portfolio)
+        self.alerts = dict(alerts)
+        self.position_values = {}
+        self.total = 0.0
+        self.value = 0.0
+
+
+class BookSet:
+    """Several named portfolios and alert sets over one symbol universe.
+
+    books maps a name to {"portfolio": {symbol: shares}, "alerts": {symbol:
+    limit}}. holders is the inverted index symbol -> ((book, shares), ...),
+    so a price update only touches the books that hold the symbol. Like the
+    single portfolio, book values are kept incrementally and recomputed from
+    scratch every reconcile_every applied prices.
+    """
+
+    def __init__(self, books, reconcile_every=1000):
+        self.books = {
+            name: Book(name, spec.get("portfolio", {}), spec.get("alerts", {}))
+            for name, spec in books.items()
+        }
+        self.reconcile_every = reconcile_every
+        self.ticks_since_reconcile = 0
+
+        holders = {}
+        alert_owners = {}
+        symbols = {}
+        for book in self.books.values():
+            for symbol, shares in book.portfolio.items():
+                symbols[symbol] = None
+                if shares:
+                    holders.setdefault(symbol, []).append((book, shares))
+            for symbol, limit in book.alerts.items():
+                symbols[symbol] = None
+                alert_owners.setdefault((symbol, limit), []).append(book.name)
+        self.holders = {symbol: tuple(entries) for symbol, entries in holders.items()}
+        self.alert_owners = {key: tuple(names) for key, names in alert_owners.items()}
+        # Deduplicated universe in order of first appearance.
+        self.symbols = list(symbols)
+
+    def __len__(self):
+        return len(self.books)
+
+    def __iter__(self):
+        return iter(self.books.values())
+
+    def portfolio(self):
+        """Shares per symbol summed over all books"""
+        combined = {}
+        for symbol, entries in self.holders.items():
+            combined[symbol] = sum(shares for _, shares in entries)
+        return combined
+
+    def alerts(self):
+        """Lowest alert limit per symbol over all books"""
+        combined = {}
+        for symbol, limit in self.alert_owners:
+            if symbol not in combined or limit < combined[symbol]:
+                combined[symbol] = limit
+        return combined
+
+    def alert_limits(self):
+        """Every distinct (symbol, limit) pair of all books"""
+        return list(self.alert_owners)
+
+    def owners(self, symbol, limit):
+        return self.alert_owners.get((symbol, limit), ())
+
+    def apply(self, batch, prices):
+        """Apply (symbol, price) updates and return the names of the books that changed"""
+        holders = self.holders
+        changed = set()
+        for symbol, price in batch:
+            entries = holders.get(symbol)
+            if entries is None:
+                continue
+            for book, shares in entries:
+                new_value = price * shares
+                book.total += new_value - book.position_values.get(symbol, 0.0)
+                book.position_values[symbol] = new_value
+                changed.add(book)
+
+        self.ticks_since_reconcile += len(batch)
+        if self.ticks_since_reconcile >= self.reconcile_every:
+            self.revalue_all(prices)
+            return set(self.books)
+        for book in changed:
+            book.value = round(book.total, 2)
+        return {book.name for book in changed}
+
+    def revalue_all(self, prices):
+        """Recompute every book from prices, a mapping of symbol -> price"""
+        for book in self.books.values():
+            book.position_values = {
+                symbol: prices[symbol] * shares
+                for symbol, shares in book.portfolio.items()
+                if symbol in prices
+            }
+            book.total = math.fsum(book.position_values.values())
+            book.value = round(book.total, 2)
+        self.ticks_since_reconcile = 0
+
+    def values(self):
+        return {name: book.value for name, book in self.books.items()}
+
+    def to_dict(self):
+        return {
+            name: {"portfolio": dict(book.portfolio), "alerts": dict(book.alerts)}
+            for name, book in self.books.items()
+        }
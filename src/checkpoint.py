@@ -0,0 +1,56 @@
+import json
+import os
+import threading
+import time
+
+CHECKPOINT_VERSION = 1
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.expanduser("~"), ".stock_monitor", "checkpoint.json")
+
+
+def save_checkpoint(path, state):
+    """Atomically write a state dict from SharedState.checkpoint_state()"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = dict(state, version=CHECKPOINT_VERSION, saved_at=time.time())
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path):
+    """Return the saved state dict, or None if there is no usable checkpoint"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != CHECKPOINT_VERSION:
+        return None
+    return data
+
+
+class Checkpointer(threading.Thread):
+    """Saves the engine state every interval seconds and once more on shutdown"""
+
+    def __init__(self, shared_state, path, log_queue, stop_event, interval=30.0):
+        super().__init__(daemon=True)
+        self.shared = shared_state
+        self.path = path
+        self.log_queue = log_queue
+        self.stop_event = stop_event
+        self.interval = interval
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.save()
+        self.save()
+
+    def save(self):
+        with self.shared.lock:
+            state = self.shared.checkpoint_state()
+        try:
+            save_checkpoint(self.path, state)
+        except OSError as e:
+            self.log_queue.put(f"Checkpoint ERROR: {e}")
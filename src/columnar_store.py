@@ -0,0 +1,133 @@
+from collections.abc import MutableMapping
+import time
+import numpy as np
+
+
+class ColumnarStore:
+    """Prices, positions and alert limits held in contiguous NumPy arrays.
+
+    Every symbol gets a dense integer id on first use, which is its row in
+    all arrays. A row whose updated_at is 0 has not received a price yet.
+    Alert limits are NaN for symbols without an alert.
+    """
+
+    def __init__(self, symbols=(), portfolio=None, alerts=None, capacity=1024):
+        self.ids = {}
+        self.symbols = []
+        self.prices = np.zeros(capacity)
+        self.shares = np.zeros(capacity)
+        self.alert_limits = np.full(capacity, np.nan)
+        self.alert_fired = np.zeros(capacity, dtype=bool)
+        self.updated_at = np.zeros(capacity)
+
+        for symbol in symbols:
+            self.id_for(symbol)
+        for symbol, shares in (portfolio or {}).items():
+            self.shares[self.id_for(symbol)] = shares
+        for symbol, limit in (alerts or {}).items():
+            self.alert_limits[self.id_for(symbol)] = limit
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def id_for(self, symbol):
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            if symbol_id == len(self.prices):
+                self._grow()
+            self.ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+        return symbol_id
+
+    def _grow(self):
+        capacity = 2 * len(self.prices)
+        for name, fill in (("prices", 0.0), ("shares", 0.0), ("alert_limits", np.nan),
+                           ("alert_fired", False), ("updated_at", 0.0)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def update(self, batch, now=None):
+        """Store (symbol, price) ticks and return their symbol ids"""
+        count = len(batch)
+        id_for = self.id_for
+        ids = np.fromiter((id_for(symbol) for symbol, _ in batch), dtype=np.int64, count=count)
+        prices = np.fromiter((price for _, price in batch), dtype=np.float64, count=count)
+        # With repeated ids the last assignment wins, i.e. the newest tick.
+        self.prices[ids] = prices
+        self.updated_at[ids] = time.time() if now is None else now
+        return ids
+
+    def has_price(self, symbol_id):
+        return self.updated_at[symbol_id] != 0.0
+
+    def portfolio_value(self):
+        n = len(self.symbols)
+        return float(self.prices[:n] @ self.shares[:n])
+
+    def check_alerts(self, hysteresis):
+        """Ids of alerts that have just been crossed upwards.
+
+        Same edge semantics as AlertIndex: a fired alert is re-armed once the
+        price falls below limit * (1 - hysteresis).
+        """
+        n = len(self.symbols)
+        prices = self.prices[:n]
+        limits = self.alert_limits[:n]
+        fired = self.alert_fired[:n]
+        with np.errstate(invalid="ignore"):
+            crossed = (self.updated_at[:n] != 0.0) & (prices > limits) & ~fired
+            rearmed = fired & (prices < limits * (1 - hysteresis))
+        fired[crossed] = True
+        fired[rearmed] = False
+        return np.flatnonzero(crossed)
+
+    def price_dict(self):
+        """Plain dict copy of all known prices"""
+        n = len(self.symbols)
+        ids = np.flatnonzero(self.updated_at[:n] != 0.0)
+        symbols = self.symbols
+        return {symbols[i]: price for i, price in zip(ids.tolist(), self.prices[ids].tolist())}
+
+    def price_view(self):
+        return PriceView(self)
+
+
+class PriceView(MutableMapping):
+    """dict-like symbol -> price view over a ColumnarStore.
+
+    Lets code written against SharedState.prices work unchanged when the
+    columnar store is enabled.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, symbol):
+        symbol_id = self.store.ids.get(symbol)
+        if symbol_id is None or not self.store.has_price(symbol_id):
+            raise KeyError(symbol)
+        return float(self.store.prices[symbol_id])
+
+    def __setitem__(self, symbol, price):
+        symbol_id = self.store.id_for(symbol)
+        self.store.prices[symbol_id] = price
+        self.store.updated_at[symbol_id] = time.time()
+
+    def __delitem__(self, symbol):
+        symbol_id = self.store.ids.get(symbol)
+        if symbol_id is None or not self.store.has_price(symbol_id):
+            raise KeyError(symbol)
+        self.store.updated_at[symbol_id] = 0.0
+
+    def __iter__(self):
+        store = self.store
+        n = len(store.symbols)
+        for symbol_id in np.flatnonzero(store.updated_at[:n] != 0.0).tolist():
+            yield store.symbols[symbol_id]
+
+    def __len__(self):
+        n = len(self.store.symbols)
+        return int(np.count_nonzero(self.store.updated_at[:n]))
@@ -0,0 +1,147 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+
+class ConflatingQueue:
+    """Bounded queue of (symbol, price) updates used as TradeEngine.price_queue.
+
+    Only the latest price per symbol is kept: a put() for a symbol that is
+    still pending replaces its price in place and is counted in conflated, so
+    a consumer that falls behind skips straight to current prices. Symbols
+    are handed out in the order they first became pending. At most capacity
+    symbols are pending; beyond that the oldest pending update is discarded
+    and counted in dropped.
+
+    The interface follows queue.Queue (put, get, get_nowait, task_done,
+    qsize, empty) plus drain() to take all pending updates at once. After a
+    get() or drain(), taken_since is the wall time the oldest update taken
+    became pending. close() wakes blocked getters; afterwards get() raises
+    queue.Empty instead of waiting once nothing is pending.
+
+    put() optionally takes the volume traded with an update. Volumes of
+    conflated updates add up, and take_volumes() returns those of the
+    updates taken since its last call.
+    """
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.pending = OrderedDict()
+        # symbol -> wall time it became pending
+        self.since = {}
+        self.taken_since = None
+        # symbol -> volume of its pending update, and of taken updates
+        # not yet claimed by take_volumes().
+        self.volumes = {}
+        self.taken_volumes = {}
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.closed = False
+        self.put_count = 0
+        self.conflated = 0
+        self.dropped = 0
+
+    def put(self, item, block=True, timeout=None, volume=None):
+        symbol, price = item
+        with self.lock:
+            self.put_count += 1
+            if volume is not None:
+                self.volumes[symbol] = self.volumes.get(symbol, 0.0) + volume
+            pending = self.pending
+            if symbol in pending:
+                pending[symbol] = price
+                self.conflated += 1
+                return
+            if len(pending) >= self.capacity:
+                dropped = pending.popitem(last=False)[0]
+                del self.since[dropped]
+                self.volumes.pop(dropped, None)
+                self.dropped += 1
+            pending[symbol] = price
+            self.since[symbol] = time.time()
+            self.not_empty.notify()
+
+    put_nowait = put
+
+    def get(self, block=True, timeout=None):
+        with self.not_empty:
+            if block:
+                self.not_empty.wait_for(lambda: self.pending or self.closed, timeout)
+            if not self.pending:
+                raise queue.Empty
+            item = self.pending.popitem(last=False)
+            self.taken_since = self.since.pop(item[0])
+            if self.volumes:
+                self.take((item,))
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def drain(self, max_items=None):
+        """Remove and return up to max_items pending (symbol, price) updates"""
+        with self.lock:
+            pending = self.pending
+            if not pending or max_items == 0:
+                return []
+            since = self.since
+            if max_items is None or max_items >= len(pending):
+                items = list(pending.items())
+                pending.clear()
+                self.taken_since = since[items[0][0]]
+                since.clear()
+            else:
+                items = [pending.popitem(last=False) for _ in range(max_items)]
+                self.taken_since = since[items[0][0]]
+                for symbol, _ in items:
+                    del since[symbol]
+            if self.volumes:
+                self.take(items)
+            return items
+
+    def take(self, items):
+        """Move the volumes of taken items to taken_volumes. Caller must hold the lock."""
+        volumes = self.volumes
+        taken = self.taken_volumes
+        for symbol, _ in items:
+            volume = volumes.pop(symbol, None)
+            if volume is not None:
+                taken[symbol] = taken.get(symbol, 0.0) + volume
+
+    def take_volumes(self):
+        """symbol -> volume of the updates taken since the last call"""
+        with self.lock:
+            volumes, self.taken_volumes = self.taken_volumes, {}
+            return volumes
+
+    def task_done(self):
+        pass
+
+    def close(self):
+        """Wake every blocked get(); later gets no longer wait for updates"""
+        with self.lock:
+            self.closed = True
+            self.not_empty.notify_all()
+
+    def lag(self):
+        """Seconds the oldest pending update has been waiting, 0.0 when empty"""
+        with self.lock:
+            if not self.pending:
+                return 0.0
+            return time.time() - self.since[next(iter(self.pending))]
+
+    def qsize(self):
+        return len(self.pending)
+
+    def empty(self):
+        return not self.pending
+
+    def stats(self):
+        with self.lock:
+            return {
+                "put": self.put_count,
+                "conflated": self.conflated,
+                "dropped": self.dropped,
+                "pending": len(self.pending),
+            }
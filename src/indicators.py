@@ -0,0 +1,318 @@
+from collections import namedtuple
+from collections.abc import Mapping
+import time
+import numpy as np
+
+# Latest indicator values of one symbol. volatility is the standard
+# deviation of tick-to-tick log returns over the window, in percent, and
+# None until two returns have been seen.
+IndicatorValues = namedtuple("IndicatorValues", "ema vwap volatility high low")
+
+INDICATOR_FIELDS = IndicatorValues._fields
+
+
+def column_values(column):
+    """IndicatorValues of one array column, None before the symbol's first tick"""
+    ema, vwap, volatility, high, low = column.tolist()
+    if ema != ema:
+        return None
+    if volatility != volatility:
+        volatility = None
+    return IndicatorValues(ema, vwap, volatility, high, low)
+
+
+class IndicatorTable(Mapping):
+    """Immutable symbol -> IndicatorValues view returned by Indicators.table().
+
+    The values of symbol id i are column i % chunk_size of chunks[i //
+    chunk_size], one row per IndicatorValues field. Tables published one
+    after another share the chunks none of their symbols changed in. The
+    id mapping is shared with Indicators, which only ever appends to it,
+    so ids from size on count as missing.
+    """
+
+    def __init__(self, ids, symbols, chunks, size, chunk_size):
+        self.ids = ids
+        self.symbols = symbols
+        self.chunks = chunks
+        self.size = size
+        self.chunk_size = max(chunk_size, 1)
+
+    @classmethod
+    def from_values(cls, ids, symbols, values):
+        """Table over one array with a column per symbol id"""
+        return cls(ids, symbols, (values,), values.shape[1], values.shape[1])
+
+    @property
+    def values(self):
+        """Array with the values of every symbol id, one column per id"""
+        if len(self.chunks) == 1:
+            return self.chunks[0][:, :self.size]
+        return np.concatenate(self.chunks, axis=1)[:, :self.size]
+
+    def take(self, columns):
+        """Array with the values of symbol ids columns, one column per id"""
+        columns = np.asarray(columns, dtype=np.int64)
+        values = np.empty((len(INDICATOR_FIELDS), len(columns)))
+        chunk_of, offsets = np.divmod(columns, self.chunk_size)
+        for chunk in np.unique(chunk_of).tolist():
+            selected = chunk_of == chunk
+            values[:, selected] = self.chunks[chunk][:, offsets[selected]]
+        return values
+
+    def __getitem__(self, symbol):
+        i = self.ids.get(symbol)
+        if i is None or i >= self.size:
+            raise KeyError(symbol)
+        chunk, offset = divmod(i, self.chunk_size)
+        values = column_values(self.chunks[chunk][:, offset])
+        if values is None:
+            raise KeyError(symbol)
+        return values
+
+    def __iter__(self):
+        present = (~np.isnan(self.values[0])).tolist()
+        return (symbol for symbol, seen in zip(self.symbols, present) if seen)
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.values[0])))
+
+
+class Indicators:
+    """EMA, rolling VWAP, rolling volatility and intraday high/low per symbol.
+
+    Like ColumnarStore, every symbol gets a dense id that is its row in all
+    arrays, so a batch of ticks is applied with a few array operations and
+    O(1) work per tick. Ring buffers of window columns hold the last
+    (price * volume, volume) pairs and log returns. VWAP keeps running sums,
+    volatility a rolling Welford mean and M2 that add the new return and
+    remove the one leaving the window. A symbol's sums are recomputed from
+    its buffers every refresh_every ticks so rounding errors cannot build up.
+
+    The EMA uses alpha = 2 / (ema_span + 1). The VWAP weights ticks by the
+    volume traded with them, e.g. YahooPriceSource's bar volumes. Ticks
+    without a volume count with volume 1, which makes the VWAP of sources
+    without volumes a rolling average price. High and
+    low restart with the first tick of each local calendar day.
+    """
+
+    # Per-symbol arrays and their initial value.
+    ARRAYS = {
+        "ema": np.nan, "last": np.nan, "high": np.nan, "low": np.nan, "day": -1,
+        "pv": 0.0, "volumes": 0.0, "position": 0, "sum_pv": 0.0, "sum_v": 0.0,
+        "returns": 0.0, "return_position": 0, "n_returns": 0, "mean": 0.0, "m2": 0.0,
+        "ticks": 0,
+    }
+    RING_BUFFERS = ("pv", "volumes", "returns")
+
+    # Symbol ids per chunk of a published IndicatorTable.
+    TABLE_CHUNK = 64
+
+    def __init__(self, window=20, ema_span=20, refresh_every=1000, capacity=1024):
+        if window < 2:
+            raise ValueError("indicator window must be at least 2")
+        self.window = window
+        self.ema_span = ema_span
+        self.alpha = 2.0 / (ema_span + 1)
+        self.refresh_every = refresh_every
+        self.ids = {}
+        self.symbols = []
+        for name, fill in self.ARRAYS.items():
+            shape = (capacity, window) if name in self.RING_BUFFERS else capacity
+            dtype = np.int64 if isinstance(fill, int) else np.float64
+            setattr(self, name, np.full(shape, fill, dtype=dtype))
+        # Chunks of the last table(), shared by the next one where unchanged.
+        self.published = ()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        i = self.ids.get(symbol)
+        return i is not None and not np.isnan(self.ema[i])
+
+    def id_for(self, symbol):
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            if symbol_id == len(self.ema):
+                self._grow()
+            self.ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+        return symbol_id
+
+    def _grow(self):
+        capacity = 2 * len(self.ema)
+        for name, fill in self.ARRAYS.items():
+            old = getattr(self, name)
+            new = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def get(self, symbol):
+        """Current IndicatorValues of symbol, or None before its first tick"""
+        i = self.ids.get(symbol)
+        if i is None:
+            return None
+        return column_values(self.values_of(np.array([i]))[:, 0])
+
+    def update(self, symbol, price, volume=None, now=None):
+        """Add one tick and return the symbol's new IndicatorValues"""
+        ids = np.array([self.id_for(symbol)], dtype=np.int64)
+        volumes = np.array([1.0 if volume is None else float(volume)])
+        self.step(ids, np.array([float(price)]), volumes, self.day_of(now))
+        return self.get(symbol)
+
+    def update_batch(self, batch, now=None, volumes=None):
+        """Add (symbol, price) ticks in order and return their symbol ids.
+
+        volumes maps symbols to the volume traded with their ticks. A
+        symbol's volume goes to its last tick in the batch; symbols without
+        one count with volume 1.
+        """
+        count = len(batch)
+        id_for = self.id_for
+        ids = np.fromiter((id_for(symbol) for symbol, _ in batch), dtype=np.int64, count=count)
+        prices = np.fromiter((price for _, price in batch), dtype=np.float64, count=count)
+        if volumes:
+            remaining = dict(volumes)
+            weights = [
+                remaining.pop(symbol, 0.0 if symbol in volumes else 1.0)
+                for symbol, _ in reversed(batch)
+            ]
+            volumes = np.array(weights[::-1], dtype=np.float64)
+        else:
+            volumes = np.ones(count)
+        day = self.day_of(now)
+        if count < 2 or len(np.unique(ids)) == count:
+            self.step(ids, prices, volumes, day)
+            return ids
+        # Repeated symbols: apply the ticks in rounds that take at most one
+        # tick per symbol, keeping each symbol's ticks in order.
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        rank = np.empty(count, dtype=np.int64)
+        rank[order] = np.arange(count) - np.repeat(starts, np.diff(np.r_[starts, count]))
+        for r in range(int(rank.max()) + 1):
+            selected = rank == r
+            self.step(ids[selected], prices[selected], volumes[selected], day)
+        return ids
+
+    @staticmethod
+    def day_of(now):
+        year, month, day = time.localtime(time.time() if now is None else now)[:3]
+        return year * 10000 + month * 100 + day
+
+    def step(self, ids, prices, volumes, day):
+        """Apply one tick to each of the distinct symbol ids"""
+        ema = self.ema[ids]
+        self.ema[ids] = np.where(np.isnan(ema), prices, ema + self.alpha * (prices - ema))
+
+        new_day = self.day[ids] != day
+        self.high[ids] = np.where(new_day, prices, np.fmax(self.high[ids], prices))
+        self.low[ids] = np.where(new_day, prices, np.fmin(self.low[ids], prices))
+        self.day[ids] = day
+
+        # VWAP window: replace the oldest (price * volume, volume) pair.
+        # Unused slots are 0, so subtracting them changes nothing.
+        position = self.position[ids]
+        pv = prices * volumes
+        self.sum_pv[ids] += pv - self.pv[ids, position]
+        self.sum_v[ids] += volumes - self.volumes[ids, position]
+        self.pv[ids, position] = pv
+        self.volumes[ids, position] = volumes
+        self.position[ids] = (position + 1) % self.window
+
+        last = self.last[ids]
+        with np.errstate(invalid="ignore"):
+            has_return = (last > 0) & (prices > 0)
+        if has_return.any():
+            self.add_returns(ids[has_return], np.log(prices[has_return] / last[has_return]))
+        self.last[ids] = prices
+
+        ticks = self.ticks[ids] + 1
+        self.ticks[ids] = ticks
+        due = ids[ticks % self.refresh_every == 0]
+        if len(due):
+            self.refresh(due)
+
+    def add_returns(self, ids, values):
+        n = self.n_returns[ids]
+        mean = self.mean[ids]
+        m2 = self.m2[ids]
+        position = self.return_position[ids]
+
+        # Full windows first remove their oldest return from mean and M2.
+        full = n == self.window
+        if full.any():
+            old = self.returns[ids[full], position[full]]
+            old_mean = mean[full]
+            new_mean = old_mean - (old - old_mean) / (self.window - 1)
+            m2[full] -= (old - old_mean) * (old - new_mean)
+            mean[full] = new_mean
+            n[full] -= 1
+
+        self.returns[ids, position] = values
+        self.return_position[ids] = (position + 1) % self.window
+        n += 1
+        delta = values - mean
+        mean += delta / n
+        m2 += delta * (values - mean)
+        self.n_returns[ids] = n
+        self.mean[ids] = mean
+        self.m2[ids] = np.maximum(m2, 0.0)
+
+    def refresh(self, ids):
+        """Recompute the running sums of symbol ids from their ring buffers"""
+        self.sum_pv[ids] = self.pv[ids].sum(axis=1)
+        self.sum_v[ids] = self.volumes[ids].sum(axis=1)
+        n = self.n_returns[ids]
+        # Slot j holds one of the last n returns when it is at most n
+        # places behind the next write position.
+        age = (np.arange(self.window) - self.return_position[ids][:, None]) % self.window
+        valid = age >= self.window - n[:, None]
+        returns = np.where(valid, self.returns[ids], 0.0)
+        mean = returns.sum(axis=1) / np.maximum(n, 1)
+        self.mean[ids] = mean
+        self.m2[ids] = np.where(valid, (returns - mean[:, None]) ** 2, 0.0).sum(axis=1)
+
+    def values_of(self, ids):
+        """Array with the current values of symbol ids, one column per id"""
+        values = np.empty((len(INDICATOR_FIELDS), len(ids)))
+        values[0] = self.ema[ids]
+        sum_v = self.sum_v[ids]
+        n_returns = self.n_returns[ids]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values[1] = np.where(sum_v > 0, self.sum_pv[ids] / sum_v, self.last[ids])
+            values[2] = np.where(
+                n_returns > 1, np.sqrt(self.m2[ids] / (n_returns - 1)) * 100, np.nan
+            )
+        values[3] = self.high[ids]
+        values[4] = self.low[ids]
+        return values
+
+    def table(self, changed=None):
+        """IndicatorTable with the current values of every symbol.
+
+        changed, e.g. the ids update_batch() returned, limits the work to
+        those symbols: only their chunks are copied and recomputed, the rest
+        is shared with the previous table.
+        """
+        n = len(self.symbols)
+        size = self.TABLE_CHUNK
+        chunks = list(self.published)
+        ids = np.arange(n) if changed is None else np.unique(changed)
+        if len(ids):
+            # Copy every touched chunk into one block, new chunks start
+            # empty, and write the changed columns with a single scatter.
+            touched, position = np.unique(ids // size, return_inverse=True)
+            missing = np.full((len(INDICATOR_FIELDS), size), np.nan)
+            block = np.stack([chunks[c] if c < len(chunks) else missing
+                              for c in touched.tolist()])
+            block[position, :, ids % size] = self.values_of(ids).T
+            chunks.extend(missing for _ in range(len(chunks), -(-n // size)))
+            for c, chunk in zip(touched.tolist(), block):
+                chunks[c] = chunk
+        self.published = tuple(chunks)
+        return IndicatorTable(self.ids, self.symbols, self.published, n, size)
@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+class LogRecord:
+    """Structured log entry, formatted only when it is displayed.
+
+    level is INFO, WARNING, ERROR or ALERT, kind names the event type
+    (api, portfolio, alert, producer, engine, message) and the message text
+    is template.format(**values).
+    """
+
+    __slots__ = ("created", "level", "kind", "symbol", "template", "values",
+                 "suppressed", "_text")
+
+    def __init__(self, level, kind, template, symbol=None, **values):
+        self.created = time.time()
+        self.level = level
+        self.kind = kind
+        self.symbol = symbol
+        self.template = template
+        if symbol is not None:
+            values["symbol"] = symbol
+        self.values = values
+        self.suppressed = 0
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            text = self.template.format(**self.values) if self.values else self.template
+            if self.suppressed:
+                text += f" (+{self.suppressed} similar)"
+            self._text = text
+        return self._text
+
+    def __contains__(self, text):
+        return text in str(self)
+
+    def __repr__(self):
+        return f"LogRecord({self.level}, {self.kind}, {str(self)!r})"
+
+    def __reduce__(self):
+        # Pickled as its text, e.g. to cross a process boundary, since
+        # values may hold objects that cannot be pickled.
+        return restore_record, (self.created, self.level, self.kind, self.symbol, str(self))
+
+
+def restore_record(created, level, kind, symbol, text):
+    """Rebuild a pickled LogRecord from its formatted text"""
+    record = LogRecord(level, kind, text)
+    record.created = created
+    record.symbol = symbol
+    record._text = text
+    return record
+
+
+class LogBuffer:
+    """Bounded ring buffer of LogRecords used as TradeEngine.log_queue.
+
+    When full, the oldest record is overwritten and counted in dropped.
+    Records of a sampled kind are let through at most sample_burst times per
+    sample_interval seconds; the rest are only counted, and the next record
+    that passes reports how many similar ones were suppressed. Plain strings
+    are accepted and wrapped into INFO message records.
+
+    Callbacks registered with subscribe() run after every stored record,
+    and close() wakes blocked getters, like ConflatingQueue.close().
+    """
+
+    def __init__(self, capacity=10000, sampled_kinds=("api", "portfolio"),
+                 sample_interval=1.0, sample_burst=20):
+        self.records = deque(maxlen=capacity)
+        self.sampled_kinds = frozenset(sampled_kinds)
+        self.sample_interval = sample_interval
+        self.sample_burst = sample_burst
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.closed = False
+        self.listeners = []
+        self.dropped = 0
+        self.dropped_by_kind = {}
+        self.sampled = 0
+        self.windows = {}
+        self.suppressed = {}
+
+    def put(self, record, block=True, timeout=None):
+        if not isinstance(record, LogRecord):
+            record = LogRecord("INFO", "message", str(record))
+
+        with self.lock:
+            kind = record.kind
+            if kind in self.sampled_kinds and not self._admit(kind):
+                self.suppressed[kind] = self.suppressed.get(kind, 0) + 1
+                self.sampled += 1
+                return
+            record.suppressed = self.suppressed.pop(kind, 0)
+
+            if len(self.records) == self.records.maxlen:
+                oldest = self.records[0].kind
+                self.dropped += 1
+                self.dropped_by_kind[oldest] = self.dropped_by_kind.get(oldest, 0) + 1
+            self.records.append(record)
+            self.not_empty.notify()
+        for listener in self.listeners:
+            listener()
+
+    put_nowait = put
+
+    def _admit(self, kind):
+        now = time.monotonic()
+        started, count = self.windows.get(kind, (0.0, 0))
+        if now - started >= self.sample_interval:
+            started, count = now, 0
+        if count >= self.sample_burst:
+            return False
+        self.windows[kind] = (started, count + 1)
+        return True
+
+    def get(self, block=True, timeout=None):
+        with self.not_empty:
+            if block:
+                self.not_empty.wait_for(lambda: self.records or self.closed, timeout)
+            if not self.records:
+                raise queue.Empty
+            return self.records.popleft()
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def drain(self, max_items=None):
+        """Remove and return up to max_items records in arrival order"""
+        with self.lock:
+            if max_items is None or max_items >= len(self.records):
+                records = list(self.records)
+                self.records.clear()
+            else:
+                records = [self.records.popleft() for _ in range(max_items)]
+            return records
+
+    def subscribe(self, callback):
+        """Call callback() after every stored record; it must not block"""
+        self.listeners.append(callback)
+
+    def close(self):
+        """Wake every blocked get(); later gets no longer wait for records"""
+        with self.lock:
+            self.closed = True
+            self.not_empty.notify_all()
+
+    def qsize(self):
+        return len(self.records)
+
+    def empty(self):
+        return not self.records
@@ -0,0 +1,229 @@
+import bisect
+import math
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from src.stop_event import wake_on_stop
+
+# Latency buckets from 50 microseconds to about 52 seconds, doubling.
+LATENCY_BUCKETS = tuple(0.00005 * 2 ** i for i in range(21))
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Counter:
+    """Monotonic count. With func the value is read from func() when scraped."""
+
+    kind = "counter"
+
+    def __init__(self, func=None):
+        self.func = func
+        self._value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self.func() if self.func is not None else self._value
+
+
+class Gauge(Counter):
+    """Value that can go up and down, set directly or read from func()"""
+
+    kind = "gauge"
+
+    def set(self, value):
+        self._value = value
+
+
+class Histogram:
+    """Fixed-bucket histogram of observed values (usually seconds)"""
+
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate of the q quantile, interpolated within its bucket, or None"""
+        with self.lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                if i == len(self.bounds):
+                    return lower
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def cumulative(self):
+        with self.lock:
+            counts = list(self.counts)
+            total, value_sum = self.count, self.sum
+        buckets = []
+        running = 0
+        for bound, count in zip(self.bounds + (math.inf,), counts):
+            running += count
+            buckets.append((bound, running))
+        return buckets, value_sum, total
+
+
+class Metrics:
+    """Registry of the engine's counters, gauges and histograms.
+
+    Metrics are created on first use and identified by name and labels, so
+    every component asks the registry for the instruments it updates:
+
+        fetch_seconds = metrics.histogram("stock_monitor_fetch_seconds", "...")
+        fetch_seconds.observe(elapsed)
+
+    render() returns all of them in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.families = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name, help_text, func=None, **labels):
+        return self._get(name, help_text, labels, lambda: Counter(func))
+
+    def gauge(self, name, help_text, func=None, **labels):
+        return self._get(name, help_text, labels, lambda: Gauge(func))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, **labels):
+        return self._get(name, help_text, labels, lambda: Histogram(buckets))
+
+    def _get(self, name, help_text, labels, factory):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            family = self.families.get(name)
+            if family is None:
+                family = self.families[name] = (help_text, {})
+            children = family[1]
+            metric = children.get(key)
+            if metric is None:
+                metric = children[key] = factory()
+            return metric
+
+    def get(self, name, **labels):
+        """Registered metric or None"""
+        family = self.families.get(name)
+        if family is None:
+            return None
+        return family[1].get(tuple(sorted(labels.items())))
+
+    def render(self):
+        lines = []
+        with self.lock:
+            families = [(name, help_text, list(children.items()))
+                        for name, (help_text, children) in sorted(self.families.items())]
+        for name, help_text, children in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {children[0][1].kind}")
+            for labels, metric in children:
+                if metric.kind == "histogram":
+                    buckets, value_sum, count = metric.cumulative()
+                    for bound, running in buckets:
+                        le = (("le", "+Inf" if bound == math.inf else repr(bound)),)
+                        lines.append(f"{name}_bucket{format_labels(labels + le)} {running}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {format_value(value_sum)}")
+                    lines.append(f"{name}_count{format_labels(labels)} {count}")
+                    continue
+                try:
+                    value = metric.value
+                except Exception:
+                    continue
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class MetricsServer(threading.Thread):
+    """Serves Metrics.render() at http://host:port/metrics until stop_event is set.
+
+    Requests are handled one at a time, which is plenty for a scraper
+    polling every few seconds. port=0 binds a free port, see .port.
+    """
+
+    def __init__(self, metrics, stop_event, port=9108, host="127.0.0.1"):
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.stop_event = stop_event
+        self.httpd = HTTPServer((host, port), self.make_handler())
+        self.port = self.httpd.server_address[1]
+        self.httpd.timeout = wake_on_stop(stop_event, self.wake)
+
+    def make_handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def wake(self):
+        """Unblock handle_request() with a connection that sends nothing"""
+        try:
+            socket.create_connection(self.httpd.server_address[:2], timeout=1).close()
+        except OSError:
+            pass
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                self.httpd.handle_request()
+        finally:
+            self.httpd.server_close()
@@ -0,0 +1,286 @@
+import datetime
+import heapq
+import math
+import time
+from collections import namedtuple
+
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+# Regular trading session of an exchange in its local time zone.
+Session = namedtuple("Session", "timezone open close weekdays")
+
+US_SESSION = Session("America/New_York", datetime.time(9, 30), datetime.time(16, 0), range(5))
+ALWAYS_OPEN = None
+
+# Yahoo ticker suffix -> session. Tickers without a suffix trade in the US.
+SESSIONS = {
+    "": US_SESSION,
+    ".L": Session("Europe/London", datetime.time(8, 0), datetime.time(16, 30), range(5)),
+    ".DE": Session("Europe/Berlin", datetime.time(9, 0), datetime.time(17, 30), range(5)),
+    ".F": Session("Europe/Berlin", datetime.time(8, 0), datetime.time(22, 0), range(5)),
+    ".PA": Session("Europe/Paris", datetime.time(9, 0), datetime.time(17, 30), range(5)),
+    ".AS": Session("Europe/Amsterdam", datetime.time(9, 0), datetime.time(17, 30), range(5)),
+    ".MI": Session("Europe/Rome", datetime.time(9, 0), datetime.time(17, 30), range(5)),
+    ".SW": Session("Europe/Zurich", datetime.time(9, 0), datetime.time(17, 30), range(5)),
+    ".PR": Session("Europe/Prague", datetime.time(9, 0), datetime.time(16, 20), range(5)),
+    ".TO": Session("America/Toronto", datetime.time(9, 30), datetime.time(16, 0), range(5)),
+    ".T": Session("Asia/Tokyo", datetime.time(9, 0), datetime.time(15, 30), range(5)),
+    ".HK": Session("Asia/Hong_Kong", datetime.time(9, 30), datetime.time(16, 0), range(5)),
+    ".AX": Session("Australia/Sydney", datetime.time(10, 0), datetime.time(16, 0), range(5)),
+}
+
+
+class MarketCalendar:
+    """Decides whether the market of a Yahoo ticker is currently trading.
+
+    The exchange is derived from the ticker suffix ("VOW3.DE", "7203.T").
+    Crypto and currency pairs ("BTC-USD", "EURUSD=X") and indices ("^GSPC")
+    trade around the clock or are quoted continuously and are always open.
+    holidays is a set of datetime.date on which the US session is closed.
+    When the time zone database is unavailable every market counts as open.
+    """
+
+    def __init__(self, sessions=None, holidays=()):
+        self.sessions = SESSIONS if sessions is None else sessions
+        self.holidays = set(holidays)
+        self.zones = {}
+
+    def session(self, symbol):
+        if symbol.startswith("^") or symbol.endswith("=X") or "-" in symbol:
+            return ALWAYS_OPEN
+        dot = symbol.rfind(".")
+        suffix = symbol[dot:] if dot > 0 else ""
+        return self.sessions.get(suffix, ALWAYS_OPEN)
+
+    def zone(self, name):
+        if name not in self.zones:
+            try:
+                self.zones[name] = ZoneInfo(name)
+            except ZoneInfoNotFoundError:
+                self.zones[name] = None
+        return self.zones[name]
+
+    def is_open(self, symbol, wall=None):
+        return self.seconds_until_open(symbol, wall) == 0.0
+
+    def seconds_until_open(self, symbol, wall=None):
+        """0.0 while the session of symbol is trading, else seconds until it opens"""
+        wall = time.time() if wall is None else wall
+        for opens, closes in self.session_times(symbol, wall):
+            if wall < opens:
+                return opens - wall
+            if wall < closes:
+                return 0.0
+        return 0.0
+
+    def next_open(self, symbol, wall=None):
+        """Wall time the next session of symbol opens, None if it trades around the clock"""
+        wall = time.time() if wall is None else wall
+        for opens, _ in self.session_times(symbol, wall):
+            if wall < opens:
+                return opens
+        return None
+
+    def session_times(self, symbol, wall):
+        """(open, close) wall times of the sessions of symbol from the day of wall on"""
+        session = self.session(symbol)
+        if session is ALWAYS_OPEN:
+            return
+        zone = self.zone(session.timezone)
+        if zone is None:
+            return
+
+        today = datetime.datetime.fromtimestamp(wall, zone).date()
+        holidays = self.holidays if session is US_SESSION else ()
+        # At most a week plus a few holidays ahead.
+        for days in range(14):
+            day = today + datetime.timedelta(days=days)
+            if day.weekday() not in session.weekdays or day in holidays:
+                continue
+            yield (datetime.datetime.combine(day, session.open, zone).timestamp(),
+                   datetime.datetime.combine(day, session.close, zone).timestamp())
+
+
+class SymbolSchedule:
+    __slots__ = ("symbol", "due", "interval", "priority", "price", "price_time",
+                 "variance", "failures")
+
+    def __init__(self, symbol, priority):
+        self.symbol = symbol
+        self.due = 0.0
+        self.interval = 0.0
+        self.priority = priority
+        self.price = None
+        self.price_time = None
+        # Exponentially weighted variance of log returns per second.
+        self.variance = None
+        self.failures = 0
+
+
+class PollScheduler:
+    """Gives every symbol its own refresh interval.
+
+    The interval starts at base_interval scaled by the symbol's priority:
+    held positions are polled at the base rate, alert-only symbols
+    alert_factor times and all others watch_factor times less often. It is
+    then adapted to the recent volatility so that a symbol is polled about
+    once per expected target_move relative price change, clamped to
+    [min_interval, max_interval]. Failed or empty fetches back off
+    exponentially up to max_backoff. Outside the trading session of a
+    symbol's market it is not polled again until the session opens, after
+    one initial poll that loads the last close.
+
+    Times passed as now are time.monotonic() values, wall is time.time().
+    """
+
+    HELD, ALERT, WATCH = 0, 1, 2
+
+    def __init__(self, base_interval=2.0, min_interval=1.0, max_interval=60.0,
+                 alert_factor=2.0, watch_factor=4.0, target_move=0.0005,
+                 smoothing=0.2, max_backoff=300.0, coalesce=0.5, calendar=None):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factors = {self.HELD: 1.0, self.ALERT: alert_factor, self.WATCH: watch_factor}
+        self.target_move = target_move
+        self.smoothing = smoothing
+        self.max_backoff = max_backoff
+        self.coalesce = coalesce
+        self.calendar = MarketCalendar() if calendar is None else calendar
+        self.schedules = {}
+        self.heap = []
+        self.symbols = ()
+        # (symbols, held, alerted) of the last sync()
+        self.synced = None
+
+    def __len__(self):
+        return len(self.schedules)
+
+    def __contains__(self, symbol):
+        return symbol in self.schedules
+
+    def sync(self, symbols, portfolio=(), alerts=()):
+        """Track exactly symbols; new ones are due immediately.
+
+        Priorities follow portfolio and alerts, which the config window
+        edits in place, so their keys are compared as well.
+        """
+        synced = (tuple(symbols), frozenset(portfolio), frozenset(alerts))
+        if synced == self.synced:
+            return
+        self.synced = synced
+        symbols = self.symbols = synced[0]
+        wanted = set(symbols)
+        for symbol in list(self.schedules):
+            if symbol not in wanted:
+                del self.schedules[symbol]
+        for symbol in symbols:
+            if symbol in portfolio:
+                priority = self.HELD
+            elif symbol in alerts:
+                priority = self.ALERT
+            else:
+                priority = self.WATCH
+            schedule = self.schedules.get(symbol)
+            if schedule is None:
+                schedule = self.schedules[symbol] = SymbolSchedule(symbol, priority)
+                schedule.interval = self.base_interval * self.factors[priority]
+                heapq.heappush(self.heap, (0.0, symbol))
+            else:
+                schedule.priority = priority
+
+    def due(self, now=None):
+        """Pop and return the symbols that are due, in due order.
+
+        Symbols due within coalesce seconds are included as well so that
+        they share a request with the others. Returned symbols are not due
+        again until they are passed to record().
+        """
+        now = time.monotonic() if now is None else now
+        horizon = now + self.coalesce
+        heap = self.heap
+        symbols = []
+        while heap and heap[0][0] <= horizon:
+            due, symbol = heapq.heappop(heap)
+            schedule = self.schedules.get(symbol)
+            # Entries of removed or rescheduled symbols are skipped lazily.
+            if schedule is not None and schedule.due == due:
+                schedule.due = math.inf
+                symbols.append(symbol)
+        return symbols
+
+    def next_due(self):
+        """Monotonic time of the earliest scheduled poll, or None"""
+        heap = self.heap
+        while heap:
+            due, symbol = heap[0]
+            schedule = self.schedules.get(symbol)
+            if schedule is not None and schedule.due == due:
+                return due
+            heapq.heappop(heap)
+        return None
+
+    def record(self, prices, failed=(), now=None, wall=None, unchanged=()):
+        """Reschedule symbols after a fetch.
+
+        prices maps symbol -> price for every symbol that returned data.
+        failed are the symbols whose fetch raised or returned nothing, and
+        unchanged those that were answered without a new price.
+        """
+        now = time.monotonic() if now is None else now
+        wall = time.time() if wall is None else wall
+        for symbol, price in prices.items():
+            schedule = self.schedules.get(symbol)
+            if schedule is None:
+                continue
+            schedule.failures = 0
+            self.observe(schedule, price, now)
+            self.reschedule(schedule, schedule.interval, now, wall)
+        for symbol in unchanged:
+            schedule = self.schedules.get(symbol)
+            if schedule is None:
+                continue
+            schedule.failures = 0
+            self.reschedule(schedule, schedule.interval, now, wall)
+        for symbol in failed:
+            schedule = self.schedules.get(symbol)
+            if schedule is None:
+                continue
+            schedule.failures += 1
+            delay = min(
+                self.max_backoff,
+                max(schedule.interval, self.base_interval) * 2 ** schedule.failures
+            )
+            self.reschedule(schedule, delay, now, wall)
+
+    def observe(self, schedule, price, now):
+        """Update the volatility estimate and the adaptive interval"""
+        previous, previous_time = schedule.price, schedule.price_time
+        schedule.price, schedule.price_time = price, now
+        base = self.base_interval * self.factors[schedule.priority]
+        if previous is None or previous <= 0 or price <= 0:
+            schedule.interval = base
+            return
+
+        elapsed = max(now - previous_time, 1e-3)
+        sample = math.log(price / previous) ** 2 / elapsed
+        if schedule.variance is None:
+            schedule.variance = sample
+        else:
+            schedule.variance += self.smoothing * (sample - schedule.variance)
+
+        if schedule.variance > 0:
+            # Expected |move| over t seconds is sigma * sqrt(t).
+            interval = self.target_move ** 2 / schedule.variance
+            interval = min(max(interval, base / 4), base * 4)
+        else:
+            interval = base * 4
+        schedule.interval = min(max(interval, self.min_interval), self.max_interval)
+
+    def reschedule(self, schedule, delay, now, wall):
+        # Symbols are polled once on start even when their market is
+        # closed, which loads the last close; after that they wait.
+        delay = max(delay, self.calendar.seconds_until_open(schedule.symbol, wall))
+        schedule.due = now + delay
+        heapq.heappush(self.heap, (schedule.due, schedule.symbol))
@@ -0,0 +1,142 @@
+import csv
+import json
+import os
+
+
+class ImportResult:
+    """Portfolio and alerts read from a file plus a per-row error report.
+
+    errors holds (row, ticker, message) tuples; row is the 1-based line of
+    the CSV file (the header is line 1) or the 1-based position in a JSON list.
+    A file that cannot be read at all is reported as one error on row 1.
+    """
+
+    def __init__(self):
+        self.portfolio = {}
+        self.alerts = {}
+        self.errors = []
+
+    @property
+    def symbols(self):
+        return list(dict.fromkeys([*self.portfolio, *self.alerts]))
+
+    def error_report(self, limit=20):
+        lines = [f"Row {row} ({ticker or '-'}): {message}"
+                 for row, ticker, message in self.errors[:limit]]
+        if len(self.errors) > limit:
+            lines.append(f"... and {len(self.errors) - limit} more")
+        return "\n".join(lines)
+
+
+def read_rows(path):
+    """Yield (row, record) pairs from a CSV or JSON portfolio file.
+
+    CSV files need a header with a ticker column and optional shares and
+    alert columns. JSON files hold a list of objects with the same keys,
+    optionally wrapped as {"positions": [...]}. Raises ValueError for a
+    file that is not valid JSON or holds anything else.
+    """
+    if os.path.splitext(path)[1].lower() == ".json":
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("positions", [])
+        if not isinstance(data, list):
+            raise ValueError("JSON file must hold a list of positions")
+        for row, record in enumerate(data, start=1):
+            yield row, record if isinstance(record, dict) else {}
+    else:
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+            for row, record in enumerate(reader, start=2):
+                yield row, record
+
+
+def parse_row(record):
+    """Return (ticker, shares, alert) from one record or raise ValueError"""
+    ticker = str(record.get("ticker") or "").strip().upper()
+    if not ticker:
+        raise ValueError("missing ticker")
+
+    shares_value = record.get("shares")
+    shares = 0
+    if shares_value not in (None, ""):
+        try:
+            shares = int(shares_value)
+        except (TypeError, ValueError):
+            raise ValueError("number of shares must be an integer") from None
+        if shares < 0:
+            raise ValueError("number of shares must not be negative")
+
+    alert_value = record.get("alert")
+    alert = None
+    if alert_value not in (None, ""):
+        try:
+            alert = float(alert_value)
+        except (TypeError, ValueError):
+            raise ValueError("invalid alert price") from None
+        if alert <= 0:
+            raise ValueError("invalid alert price")
+
+    if not shares and alert is None:
+        raise ValueError("row has neither shares nor an alert")
+    return ticker, shares, alert
+
+
+def load_portfolio(path, validator=None, batch_size=200):
+    """Read a CSV/JSON portfolio file and validate its tickers in batches.
+
+    Rows that cannot be parsed, repeat an earlier ticker or name a ticker
+    that does not exist end up in ImportResult.errors; all other rows are
+    imported. With validator=None tickers are not checked.
+    """
+    result = ImportResult()
+    try:
+        records = list(read_rows(path))
+    except ValueError as e:
+        result.errors.append((1, None, str(e)))
+        return result
+
+    rows = {}
+    for row, record in records:
+        try:
+            ticker, shares, alert = parse_row(record)
+        except ValueError as e:
+            result.errors.append((row, record.get("ticker"), str(e)))
+            continue
+        if ticker in rows:
+            result.errors.append((row, ticker, f"duplicate of row {rows[ticker][0]}"))
+            continue
+        rows[ticker] = (row, shares, alert)
+
+    valid = {ticker: True for ticker in rows}
+    if validator is not None:
+        tickers = list(rows)
+        for i in range(0, len(tickers), batch_size):
+            batch = tickers[i:i + batch_size]
+            try:
+                checked = validator.validate_many(batch)
+            except Exception as e:
+                checked, reason = dict.fromkeys(batch), f"could not validate: {e}"
+            else:
+                reason = "could not validate"
+            # None marks tickers whose lookup did not get through.
+            for ticker in batch:
+                valid[ticker] = checked.get(ticker)
+                if valid[ticker] is None:
+                    result.errors.append((rows[ticker][0], ticker, reason))
+
+    for ticker, (row, shares, alert) in rows.items():
+        if valid[ticker] is None:
+            continue
+        if not valid[ticker]:
+            result.errors.append((row, ticker, "ticker does not exist"))
+            continue
+        if shares:
+            result.portfolio[ticker] = shares
+        if alert is not None:
+            result.alerts[ticker] = alert
+
+    result.errors.sort()
+    return result
@@ -0,0 +1,110 @@
+"""Array form of fetched prices, for sources that parse whole frames.
+
+src.price_sources imports this module only when such a source fetches,
+so engines running on other sources start without loading NumPy.
+"""
+import numpy as np
+
+# Record type of PriceBatch.ticks. volume is NaN when the source has none.
+TICK_DTYPE = np.dtype([
+    ("symbol_id", np.int32),
+    ("price", np.float64),
+    ("bar_time", np.float64),
+    ("volume", np.float64),
+])
+
+
+class PriceBatch:
+    """Prices of one fetch as a compact TICK_DTYPE array of
+    (symbol_id, price, bar_time, volume).
+
+    symbol_id indexes into symbols and bar_time is in epoch seconds.
+    missing_ids are the requested symbols that had no data at all and
+    unchanged_ids those the source knows but that had no new bar.
+    """
+
+    def __init__(self, symbols, ticks, missing_ids=(), unchanged_ids=()):
+        self.symbols = symbols
+        self.ticks = ticks
+        self.missing_ids = missing_ids
+        self.unchanged_ids = unchanged_ids
+
+    def __len__(self):
+        return len(self.ticks)
+
+    @property
+    def missing(self):
+        return [self.symbols[i] for i in self.missing_ids]
+
+    @property
+    def unchanged(self):
+        return [self.symbols[i] for i in self.unchanged_ids]
+
+    def items(self):
+        symbols = self.symbols
+        return [
+            (symbols[symbol_id], price) for symbol_id, price in zip(
+                self.ticks["symbol_id"].tolist(), self.ticks["price"].tolist()
+            )
+        ]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def volumes(self):
+        """symbol -> volume of the ticks that carry one"""
+        ticks = self.ticks
+        known = ~np.isnan(ticks["volume"])
+        symbols = self.symbols
+        return {
+            symbols[symbol_id]: volume for symbol_id, volume in zip(
+                ticks["symbol_id"][known].tolist(), ticks["volume"][known].tolist()
+            )
+        }
+
+
+def epoch_seconds(index):
+    """UTC epoch seconds of a DatetimeIndex, whatever its resolution"""
+    return index.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+
+
+def latest_closes(closes, symbols, volumes=None):
+    """Last valid close and its bar time for every symbol in one pass.
+
+    closes is a frame of close prices indexed by bar time with one column
+    per ticker, volumes an optional frame of bar volumes shaped like it.
+    Returns (ticks, missing_ids) where ticks is a TICK_DTYPE array, with
+    the volume of each close's bar, and missing_ids are positions in
+    symbols without any valid close.
+    """
+    frame = closes.reindex(columns=symbols)
+    values = frame.to_numpy(dtype=np.float64)
+    if not len(values):
+        return np.empty(0, dtype=TICK_DTYPE), np.arange(len(symbols))
+
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=0)
+    # Row of the last valid value per column, which is what
+    # ffill().iloc[-1] would select, without building a filled copy.
+    last_row = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+
+    ids = np.flatnonzero(has_data)
+    rows = last_row[ids]
+    ticks = np.empty(len(ids), dtype=TICK_DTYPE)
+    ticks["symbol_id"] = ids
+    ticks["price"] = values[rows, ids]
+    ticks["bar_time"] = epoch_seconds(frame.index)[rows]
+    if volumes is None:
+        ticks["volume"] = np.nan
+    else:
+        bar_volumes = volumes.reindex(index=frame.index, columns=symbols)
+        ticks["volume"] = bar_volumes.to_numpy(dtype=np.float64)[rows, ids]
+    return ticks, np.flatnonzero(~has_data)
+
+
+def valid_closes(closes):
+    """(bar_time, column, price) of every valid close in a frame of closes"""
+    values = closes.to_numpy(dtype=np.float64)
+    rows, columns = np.nonzero(~np.isnan(values))
+    return zip(epoch_seconds(closes.index)[rows].tolist(), columns.tolist(),
+               values[rows, columns].tolist())
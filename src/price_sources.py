@@ -0,0 +1,375 @@
+import math
+import random
+import threading
+import time
+from urllib.parse import quote
+
+# yfinance (which pulls in pandas) and src.price_batch (NumPy) are imported
+# where they are used, so engines running on other sources start without
+# loading them.
+
+
+class NoDataError(Exception):
+    """A fetch got no price for any requested symbol, e.g. because the
+    network is down. PriceProducer treats it like any failed request."""
+
+
+class PriceSource:
+    """Interface used by PriceProducer to obtain the latest prices.
+
+    fetch() receives the list of symbols and returns a dict of symbol -> price
+    (or a src.price_batch.PriceBatch) for the symbols it has data for. poll_interval is the number of seconds
+    the producer waits between two fetches, and name prefixes its errors
+    in the log. When shard_size is set, the producer splits the symbols into
+    shards of that size and fetches them concurrently, so fetch() must be
+    safe to call from several threads. A source may return a PollScheduler
+    from make_scheduler() to poll each symbol at its own rate instead.
+    """
+
+    name = "Price source"
+    poll_interval = 2.0
+    shard_size = None
+
+    def fetch(self, symbols):
+        raise NotImplementedError
+
+    def make_scheduler(self):
+        return None
+
+
+class YahooPriceSource(PriceSource):
+    """Latest one-minute closes from Yahoo Finance.
+
+    The source keeps the intraday bars it has already received per symbol and
+    only asks for bars starting at the oldest "last bar" of the requested
+    symbols. The last bar is requested again because Yahoo keeps revising the
+    current minute. Symbols more than max_lag seconds behind the newest last
+    bar are requested separately, see resume_groups(). A full day is
+    downloaded only for symbols without bars or when the cache is older than
+    max_gap seconds, e.g. on a new trading day. Known symbols without a new
+    bar are returned as unchanged. Every tick carries the volume traded in
+    its bar since the symbol's previous tick, for the VWAP of
+    src.indicators. With adaptive=True symbols are polled by a PollScheduler
+    around poll_interval, depending on priority, volatility and market hours.
+    """
+
+    name = "yfinance"
+
+    def __init__(self, poll_interval=2.0, shard_size=50, timeout=10,
+                 max_bars=1000, max_gap=86400, max_lag=300, adaptive=True):
+        self.poll_interval = poll_interval
+        self.adaptive = adaptive
+        self.shard_size = shard_size
+        self.timeout = timeout
+        self.max_bars = max_bars
+        self.max_gap = max_gap
+        self.max_lag = max_lag
+        self.bars = {}
+        # symbol -> (bar_time, volume) of the bar its last tick came from
+        self.tick_bars = {}
+        self.bars_lock = threading.Lock()
+
+    def make_scheduler(self):
+        if not self.adaptive:
+            return None
+        from src.poll_scheduler import PollScheduler
+        return PollScheduler(base_interval=self.poll_interval,
+                             min_interval=min(1.0, self.poll_interval))
+
+    def fetch(self, symbols):
+        import pandas as pd
+        import yfinance as yf
+        from src.price_batch import PriceBatch, latest_closes
+
+        frames = []
+        answered = set()
+        for start, group in self.resume_groups(symbols):
+            if start is None:
+                window = {"period": "1d"}
+            else:
+                window = {"start": start}
+            # Shards are already fetched in parallel by the producer, so each
+            # download stays on its own worker thread.
+            data = yf.download(
+                tickers=" ".join(group),
+                interval="1m",
+                progress=False,
+                auto_adjust=False,
+                threads=False,
+                timeout=self.timeout,
+                **window
+            )
+            if data is not None and not data.empty:
+                frames.append(data)
+                answered.update(group)
+
+        # yf.download logs failed requests instead of raising, so a shard
+        # without a single close is reported as a failure here.
+        if not frames:
+            raise NoDataError(f"no data returned for {len(symbols)} symbols")
+        data = frames[0] if len(frames) == 1 else pd.concat(frames, axis=1, sort=True)
+        closes = data["Close"].reindex(columns=symbols)
+        volumes = data["Volume"] if "Volume" in data else None
+        ticks, missing_ids = latest_closes(closes, symbols, volumes)
+
+        with self.bars_lock:
+            # A symbol with cached bars that was in an answered request has
+            # simply not traded since: it is unchanged, not missing. Its last
+            # cached bar is not republished, as it is not a new tick.
+            unchanged, missing = [], []
+            for i in missing_ids.tolist():
+                known = symbols[i] in answered and self.bars.get(symbols[i])
+                (unchanged if known else missing).append(i)
+            if not len(ticks) and not unchanged:
+                raise NoDataError(f"no prices returned for {len(symbols)} symbols")
+            self.merge_bars(closes, symbols)
+            self.traded_volumes(symbols, ticks)
+        return PriceBatch(symbols, ticks, missing, unchanged)
+
+    def resume_groups(self, symbols):
+        """Split symbols into (start, symbols) requests.
+
+        Symbols whose last bar is within max_lag seconds of the newest one
+        resume together. The others, typically illiquid tickers, share a
+        second request starting at the oldest of their last bars, so they do
+        not drag the liquid ones back. Symbols without usable bars get a
+        full-day request, with start None.
+        """
+        now = time.time()
+        fresh, last_bars = [], {}
+        with self.bars_lock:
+            for symbol in symbols:
+                bars = self.bars.get(symbol)
+                last_bar = max(bars) if bars else None
+                if last_bar is None or now - last_bar > self.max_gap:
+                    fresh.append(symbol)
+                else:
+                    last_bars[symbol] = last_bar
+
+        groups = []
+        if last_bars:
+            cutoff = max(last_bars.values()) - self.max_lag
+            current = [s for s in last_bars if last_bars[s] >= cutoff]
+            lagging = [s for s in last_bars if last_bars[s] < cutoff]
+            for group in (current, lagging):
+                if group:
+                    groups.append((int(min(last_bars[s] for s in group)), group))
+        if fresh:
+            groups.append((None, fresh))
+        return groups
+
+    def traded_volumes(self, symbols, ticks):
+        """Reduce the bar volume of each tick to what traded since the symbol's last tick.
+
+        Yahoo keeps revising the volume of the current minute, so a tick
+        from the same bar as the previous one only counts the growth.
+        """
+        volumes = ticks["volume"]
+        for k, (symbol_id, bar_time, volume) in enumerate(zip(
+            ticks["symbol_id"].tolist(), ticks["bar_time"].tolist(), volumes.tolist()
+        )):
+            if volume != volume:
+                continue
+            symbol = symbols[symbol_id]
+            previous = self.tick_bars.get(symbol)
+            self.tick_bars[symbol] = (bar_time, volume)
+            if previous is not None and previous[0] == bar_time:
+                volumes[k] = max(volume - previous[1], 0.0)
+
+    def merge_bars(self, closes, symbols):
+        """Add the downloaded bars, keyed by epoch second, to the per-symbol cache"""
+        from src.price_batch import valid_closes
+        merged = set()
+        for bar_time, column, price in valid_closes(closes):
+            symbol = symbols[column]
+            self.bars.setdefault(symbol, {})[bar_time] = price
+            merged.add(symbol)
+
+        # Late bars can arrive out of order, so the oldest bars are the
+        # smallest timestamps, not the first inserted.
+        for symbol in merged:
+            bars = self.bars[symbol]
+            if len(bars) > self.max_bars:
+                for bar_time in sorted(bars)[:len(bars) - self.max_bars]:
+                    del bars[bar_time]
+
+
+class PriceDict(dict):
+    """symbol -> price returned by an AsyncPriceSource.
+
+    missing are the requested symbols the server has no data for and errors
+    maps the symbols whose request failed to the exception.
+    """
+
+    def __init__(self, prices=(), missing=(), errors=None):
+        super().__init__(prices)
+        self.missing = list(missing)
+        self.errors = errors if errors is not None else {}
+
+    def merge(self, other):
+        self.update(other)
+        self.missing.extend(other.missing)
+        self.errors.update(other.errors)
+
+
+class AsyncPriceSource(PriceSource):
+    """PriceSource whose requests run as coroutines, for AsyncTradeEngine.
+
+    connect() returns the client shared by all requests of one engine and
+    stream() yields a PriceDict whenever some of the requested symbols are
+    in, so early answers are not held back by slow ones. fetch() runs the
+    same requests on a private event loop, which makes the source usable by
+    the threaded TradeEngine as well.
+    """
+
+    concurrency = 64
+
+    def connect(self):
+        raise NotImplementedError
+
+    def stream(self, symbols, client):
+        """Async iterator of PriceDicts that together cover symbols"""
+        raise NotImplementedError
+
+    async def fetch_async(self, symbols, client):
+        result = PriceDict()
+        async for prices in self.stream(symbols, client):
+            result.merge(prices)
+        return result
+
+    def fetch(self, symbols):
+        import asyncio
+
+        async def fetch_once():
+            client = self.connect()
+            try:
+                return await self.fetch_async(symbols, client)
+            finally:
+                await client.close()
+
+        result = asyncio.run(fetch_once())
+        if result.errors and not result and not result.missing:
+            raise next(iter(result.errors.values()))
+        return result
+
+
+def chart_price(data):
+    """Latest price in a Yahoo chart API response, None when it has none"""
+    results = (data.get("chart") or {}).get("result") or []
+    if not results:
+        return None
+    price = (results[0].get("meta") or {}).get("regularMarketPrice")
+    if price is None:
+        quotes = (results[0].get("indicators") or {}).get("quote") or [{}]
+        closes = [close for close in quotes[0].get("close") or () if close is not None]
+        price = closes[-1] if closes else None
+    return None if price is None else float(price)
+
+
+class YahooChartSource(AsyncPriceSource):
+    """Latest prices from the Yahoo Finance chart API, one request per symbol.
+
+    Requests go out concurrently over at most concurrency keep-alive
+    connections, so a cycle takes about as long as its slowest answer
+    instead of one large download. A 404 or an empty chart counts as no
+    data for the symbol. base_url can point at a local server for tests.
+    """
+
+    name = "Yahoo chart"
+
+    def __init__(self, base_url="https://query1.finance.yahoo.com", poll_interval=2.0,
+                 concurrency=64, timeout=10.0, adaptive=True):
+        self.base_url = base_url
+        self.poll_interval = poll_interval
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.adaptive = adaptive
+
+    def make_scheduler(self):
+        if not self.adaptive:
+            return None
+        from src.poll_scheduler import PollScheduler
+        return PollScheduler(base_interval=self.poll_interval,
+                             min_interval=min(1.0, self.poll_interval))
+
+    def connect(self):
+        from src.async_http import AsyncHttpClient
+        return AsyncHttpClient(self.base_url, max_connections=self.concurrency,
+                               timeout=self.timeout)
+
+    async def fetch_symbol(self, client, symbol):
+        from src.async_http import HttpError
+        try:
+            data = await client.get_json(
+                f"/v8/finance/chart/{quote(symbol, safe='')}?range=1d&interval=1m"
+            )
+        except HttpError as e:
+            if e.status == 404:
+                return None
+            raise
+        return chart_price(data)
+
+    async def stream(self, symbols, client):
+        import asyncio
+        pending = {
+            asyncio.ensure_future(self.fetch_symbol(client, symbol)): symbol
+            for symbol in symbols
+        }
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                prices = PriceDict()
+                for task in done:
+                    symbol = pending.pop(task)
+                    try:
+                        price = task.result()
+                    except Exception as e:
+                        prices.errors[symbol] = e
+                        continue
+                    if price is None:
+                        prices.missing.append(symbol)
+                    else:
+                        prices[symbol] = price
+                yield prices
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class SyntheticPriceSource(PriceSource):
+    """Offline, deterministic market feed for load testing.
+
+    Every symbol follows a seeded geometric random walk. Each fetch() moves
+    every requested symbol by one step, and poll_interval is chosen so that
+    the producer emits tick_rate prices per second in total.
+    """
+
+    name = "Synthetic feed"
+
+    def __init__(self, symbols=None, n_symbols=100, tick_rate=10000, seed=0,
+                 start_price=100.0, volatility=0.001):
+        if symbols is None:
+            symbols = [f"SYN{i:05d}" for i in range(n_symbols)]
+        self.symbols = list(symbols)
+        self.tick_rate = tick_rate
+        self.volatility = volatility
+        self.random = random.Random(seed)
+        self.prices = {
+            symbol: start_price * (0.5 + self.random.random())
+            for symbol in self.symbols
+        }
+        self.poll_interval = len(self.symbols) / tick_rate if tick_rate else 0.0
+
+    def fetch(self, symbols):
+        gauss = self.random.gauss
+        volatility = self.volatility
+        prices = self.prices
+        result = {}
+        for symbol in symbols:
+            price = prices.get(symbol)
+            if price is None:
+                continue
+            price *= math.exp(volatility * gauss(0.0, 1.0))
+            prices[symbol] = price
+            result[symbol] = round(price, 4)
+        return result
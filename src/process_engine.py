@@ -0,0 +1,486 @@
+"""TradeEngine in a child process, read by the GUI through shared memory.
+
+The child runs an ordinary TradeEngine and copies every published snapshot
+into a multiprocessing.shared_memory block guarded by a seqlock. Log
+records, alerts included, travel over a pipe. The parent process only
+reads the block, so fetching, parsing and valuation never hold the GIL of
+the process running the Tk main loop.
+"""
+import math
+import multiprocessing
+import threading
+import time
+from collections.abc import Mapping
+from multiprocessing import shared_memory
+from types import MappingProxyType
+import numpy as np
+from src.indicators import INDICATOR_FIELDS, IndicatorTable
+from src.log_buffer import LogBuffer, LogRecord
+from src.metrics import Metrics
+from src.shared_state import StateSnapshot
+from src.stop_event import StopEvent
+
+# Scalar fields at the start of the block, after the sequence number.
+HEADER_FIELDS = ("version", "portfolio_value", "published_at", "received_at",
+                 "queue_depth", "conflated")
+
+
+class StateBlock:
+    """Snapshot arrays in a shared memory block guarded by a seqlock.
+
+    The block holds an int64 sequence number followed by float64 values:
+    the HEADER_FIELDS, then prices, position values and stale flags with
+    one entry per symbol, one value per book and one row per indicator
+    field. Missing prices, position values and indicators are NaN.
+
+    There is a single writer. It makes the sequence odd while it writes and
+    even again when it is done. read() copies all values in one go and
+    retries while the sequence is odd or changed during the copy, so a
+    reader never sees half a snapshot and never waits for the writer.
+    Python offers no memory fences, so this relies on the CPU making the
+    writer's stores visible in program order, as x86-64 does.
+    """
+
+    def __init__(self, n_symbols, n_books=0, name=None):
+        self.n_symbols = n_symbols
+        self.n_books = n_books
+        sizes = [("header", len(HEADER_FIELDS)), ("prices", n_symbols),
+                 ("position_values", n_symbols), ("stale", n_symbols),
+                 ("book_values", n_books),
+                 ("indicators", len(INDICATOR_FIELDS) * n_symbols)]
+        self.slices = {}
+        start = 0
+        for field, size in sizes:
+            self.slices[field] = slice(start, start + size)
+            start += size
+
+        create = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=create,
+                                              size=8 + 8 * start if create else 0)
+        self.name = self.shm.name
+        self.sequence = np.ndarray(1, dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray(start, dtype=np.float64, buffer=self.shm.buf, offset=8)
+        if create:
+            self.sequence[0] = 0
+            self.data[:] = np.nan
+            self.data[self.slices["header"]] = 0.0
+            self.data[self.slices["stale"]] = 0.0
+
+    def field(self, data, name):
+        """View of one field in data, the block's values or a copy of them"""
+        values = data[self.slices[name]]
+        if name == "indicators":
+            return values.reshape(len(INDICATOR_FIELDS), self.n_symbols)
+        return values
+
+    def header(self, name):
+        """Current value of one header field, read without the seqlock"""
+        return float(self.data[HEADER_FIELDS.index(name)])
+
+    def write(self, **fields):
+        self.sequence[0] += 1
+        try:
+            for name, values in fields.items():
+                self.field(self.data, name)[...] = values
+        finally:
+            self.sequence[0] += 1
+
+    def read(self, attempts=100):
+        """Return (sequence, copy of the values) of a complete write.
+
+        Returns None when every attempt overlapped a write, e.g. because
+        the writer died halfway through one.
+        """
+        for _ in range(attempts):
+            before = int(self.sequence[0])
+            if not before & 1:
+                data = self.data.copy()
+                if int(self.sequence[0]) == before:
+                    return before, data
+            time.sleep(0)
+        return None
+
+    def close(self, unlink=False):
+        # Views into the buffer must be gone before it can be released.
+        self.sequence = self.data = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class ArrayPrices(Mapping):
+    """Immutable symbol -> value view over one column per symbol, NaN is missing"""
+
+    def __init__(self, ids, symbols, values):
+        self.ids = ids
+        self.symbols = symbols
+        self.values = values
+
+    def __getitem__(self, symbol):
+        i = self.ids.get(symbol)
+        if i is None or math.isnan(self.values[i]):
+            raise KeyError(symbol)
+        return float(self.values[i])
+
+    def __iter__(self):
+        present = (~np.isnan(self.values)).tolist()
+        return (symbol for symbol, seen in zip(self.symbols, present) if seen)
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.values)))
+
+
+class SnapshotPublisher(threading.Thread):
+    """Child side: copies new snapshots into the block and sends log records.
+
+    It wakes on every publish and log record, but writes at most once per
+    interval seconds; the latest snapshot wins. After each write it sends a
+    ("state", version) message so the parent can redraw without polling.
+    """
+
+    def __init__(self, engine, block, conn, interval=0.02):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.block = block
+        self.conn = conn
+        self.interval = interval
+        shared = engine.shared_state
+        self.symbols = list(shared.symbols)
+        self.ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.shares = np.array([shared.portfolio.get(symbol, 0) for symbol in self.symbols],
+                               dtype=np.float64)
+        self.held = self.shares != 0
+        self.book_names = list(shared.books.books) if shared.books is not None else []
+        self.written_version = -1
+        self.changed = threading.Event()
+        self.done = threading.Event()
+        shared.subscribe(self.changed.set)
+        engine.log_queue.subscribe(self.changed.set)
+
+    def run(self):
+        while not self.done.is_set():
+            self.changed.wait()
+            self.changed.clear()
+            self.publish()
+            self.done.wait(self.interval)
+
+    def finish(self):
+        """Stop after one more publish, which sends the remaining records"""
+        self.done.set()
+        self.changed.set()
+        self.join()
+        self.publish()
+
+    def publish(self):
+        records = self.engine.log_queue.drain()
+        if records:
+            self.conn.send(("logs", records))
+        snapshot = self.engine.shared_state.snapshot
+        if snapshot.version != self.written_version:
+            self.write(snapshot)
+            self.written_version = snapshot.version
+            self.conn.send(("state", snapshot.version))
+
+    def write(self, snapshot):
+        n = len(self.symbols)
+        prices = np.fromiter((snapshot.prices.get(symbol, np.nan) for symbol in self.symbols),
+                             dtype=np.float64, count=n)
+        stale = np.zeros(n)
+        stale[[self.ids[symbol] for symbol in snapshot.stale if symbol in self.ids]] = 1.0
+
+        indicators = np.full((len(INDICATOR_FIELDS), n), np.nan)
+        table = snapshot.indicators
+        if isinstance(table, IndicatorTable):
+            columns = np.fromiter((table.ids.get(symbol, -1) for symbol in self.symbols),
+                                  dtype=np.int64, count=n)
+            known = (columns >= 0) & (columns < table.size)
+            indicators[:, known] = table.take(columns[known])
+
+        price_queue = self.engine.price_queue
+        received_at = snapshot.received_at
+        self.block.write(
+            header=[snapshot.version, snapshot.portfolio_value, snapshot.published_at,
+                    np.nan if received_at is None else received_at,
+                    price_queue.qsize(), price_queue.conflated],
+            prices=prices,
+            position_values=np.where(self.held, prices * self.shares, np.nan),
+            stale=stale,
+            book_values=[snapshot.book_values.get(name, 0.0) for name in self.book_names],
+            indicators=indicators,
+        )
+
+
+def run_engine(conn, portfolio, alerts, symbols, books, engine_kwargs):
+    """Child process entry point: run a TradeEngine until the parent says stop"""
+    from src.trade_engine import TradeEngine
+    try:
+        if books:
+            engine = TradeEngine.from_books(books, symbols, **engine_kwargs)
+        else:
+            engine = TradeEngine(portfolio, alerts, symbols, **engine_kwargs)
+        shared = engine.shared_state
+        book_names = list(shared.books.books) if shared.books is not None else []
+        block = StateBlock(len(shared.symbols), len(book_names))
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}"))
+        return
+
+    publisher = SnapshotPublisher(engine, block, conn)
+    conn.send(("ready", {
+        "block": block.name,
+        "symbols": list(shared.symbols),
+        "portfolio": dict(shared.portfolio),
+        "alerts": dict(shared.alerts),
+        "books": book_names,
+    }))
+    engine.start()
+    publisher.start()
+
+    timeout = 5.0
+    try:
+        while True:
+            command, argument = conn.recv()
+            if command == "stop":
+                timeout = argument
+                break
+    except (EOFError, OSError):
+        # The parent is gone; shut down as if it had asked.
+        pass
+    running = engine.stop(timeout)
+    try:
+        publisher.finish()
+        conn.send(("stopped", running))
+    except (BrokenPipeError, OSError):
+        pass
+    block.close()
+
+
+class RemoteState:
+    """Parent side stand-in for SharedState, read from the child's StateBlock.
+
+    Offers what MonitorWindow uses: symbols, portfolio, alerts, books,
+    subscribe() and snapshot. snapshot copies the block only when its
+    sequence number has moved, so an unchanged state costs one integer
+    read. books is the list of book names, or None without books.
+    """
+
+    def __init__(self, block, info):
+        self.block = block
+        self.symbols = info["symbols"]
+        self.portfolio = info["portfolio"]
+        self.alerts = info["alerts"]
+        self.books = info["books"] or None
+        self.ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.sequence = None
+        self.position_values = MappingProxyType({})
+        self._snapshot = StateSnapshot(
+            0, 0.0, MappingProxyType({}), MappingProxyType(dict(self.portfolio)),
+            MappingProxyType(dict(self.alerts)), tuple(self.symbols), time.time(),
+            frozenset(), None, MappingProxyType({}), MappingProxyType({})
+        )
+
+    @property
+    def snapshot(self):
+        with self.lock:
+            block = self.block
+            if block is not None and int(block.sequence[0]) != self.sequence:
+                # A child killed during a write leaves the sequence odd;
+                # the last snapshot then stays.
+                state = block.read()
+                if state is not None:
+                    self.refresh(*state)
+            return self._snapshot
+
+    def refresh(self, sequence, data):
+        block = self.block
+        header = dict(zip(HEADER_FIELDS, block.field(data, "header").tolist()))
+        received_at = header["received_at"]
+        stale = np.flatnonzero(block.field(data, "stale")).tolist()
+        self.position_values = ArrayPrices(self.ids, self.symbols,
+                                           block.field(data, "position_values"))
+        self._snapshot = self._snapshot._replace(
+            version=int(header["version"]),
+            portfolio_value=header["portfolio_value"],
+            prices=ArrayPrices(self.ids, self.symbols, block.field(data, "prices")),
+            published_at=header["published_at"],
+            stale=frozenset(self.symbols[i] for i in stale),
+            received_at=None if math.isnan(received_at) else received_at,
+            book_values=MappingProxyType(
+                dict(zip(self.books or (), block.field(data, "book_values").tolist()))
+            ),
+            indicators=IndicatorTable.from_values(self.ids, self.symbols,
+                                                  block.field(data, "indicators")),
+        )
+        self.sequence = sequence
+
+    def subscribe(self, callback):
+        """Call callback() whenever the child published a new snapshot"""
+        self.listeners.append(callback)
+
+    def notify(self):
+        for listener in self.listeners:
+            listener()
+
+    def close(self):
+        """Keep the last snapshot and release the block"""
+        self.snapshot
+        with self.lock:
+            block, self.block = self.block, None
+        block.close(unlink=True)
+
+
+class RemoteQueue:
+    """Depth and conflation count of the child's price_queue, for the stats panel"""
+
+    def __init__(self, block):
+        self.block = block
+
+    def qsize(self):
+        return int(self.block.header("queue_depth")) if self.block.data is not None else 0
+
+    @property
+    def conflated(self):
+        return int(self.block.header("conflated")) if self.block.data is not None else 0
+
+
+class PipeReader(threading.Thread):
+    """Parent side: moves log records from the pipe into log_queue and
+    signals new snapshots to the RemoteState listeners"""
+
+    def __init__(self, engine):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.running = None
+
+    def run(self):
+        engine = self.engine
+        try:
+            while True:
+                kind, payload = engine.conn.recv()
+                if kind == "logs":
+                    for record in payload:
+                        engine.log_queue.put(record)
+                elif kind == "state":
+                    engine.shared_state.notify()
+                elif kind == "stopped":
+                    self.running = payload
+                    return
+        except (EOFError, OSError):
+            if not engine.stop_event.is_set():
+                engine.log_queue.put(LogRecord(
+                    "ERROR", "engine", "Engine process exited unexpectedly"
+                ))
+                engine.stop_event.set()
+
+
+class ProcessTradeEngine:
+    """TradeEngine running in a child process.
+
+    Offers the surface MonitorWindow drives: shared_state, log_queue,
+    price_queue, metrics, stop_event, start() and stop(). Arguments are
+    those of TradeEngine and are passed to the child, so a price_source
+    must be picklable; leave it out for the default Yahoo source. The
+    child is started with the "spawn" method, which is safe next to the
+    threads of a Tk application. metrics only holds the parent's own
+    figures; metrics_port serves the child's.
+    """
+
+    def __init__(self, portfolio, alerts, symbols, books=None, start_timeout=30.0,
+                 **engine_kwargs):
+        self.stop_event = StopEvent()
+        self.metrics = Metrics()
+        # Records were already sampled in the child.
+        self.log_queue = LogBuffer(sampled_kinds=())
+        self.stop_event.on_set(self.log_queue.close)
+        self.shared_state = None
+        self.price_queue = None
+        self.start_timeout = start_timeout
+        self.reader = None
+        self.stopped = None
+
+        context = multiprocessing.get_context("spawn")
+        self.conn, self.child_conn = context.Pipe()
+        self.process = context.Process(
+            target=run_engine, name="TradeEngine", daemon=True,
+            args=(self.child_conn, portfolio, alerts, symbols, books, engine_kwargs)
+        )
+
+    @classmethod
+    def from_books(cls, books, symbols=(), **kwargs):
+        """Child engine for several named portfolios, see TradeEngine.from_books"""
+        return cls(None, None, list(symbols), books=books, **kwargs)
+
+    def start(self):
+        """Start the child and wait until its engine runs"""
+        self.process.start()
+        # Only the child writes to its end; closing ours lets recv() see
+        # EOF when the child dies.
+        self.child_conn.close()
+        if not self.conn.poll(self.start_timeout):
+            self.process.kill()
+            raise RuntimeError(f"Engine process did not start within {self.start_timeout:g}s")
+        try:
+            kind, payload = self.conn.recv()
+        except EOFError:
+            raise RuntimeError("Engine process exited during start") from None
+        if kind == "failed":
+            self.process.join()
+            raise RuntimeError(f"Engine process failed to start: {payload}")
+
+        block = StateBlock(len(payload["symbols"]), len(payload["books"]),
+                           name=payload["block"])
+        self.shared_state = RemoteState(block, payload)
+        self.price_queue = RemoteQueue(block)
+        self.log_queue.put(f"Engine running in process {self.process.pid}")
+        self.reader = PipeReader(self)
+        self.reader.start()
+
+    def threads(self):
+        """The parent's started threads"""
+        return [self.reader] if self.reader is not None else []
+
+    def stop(self, timeout=5.0):
+        """Stop the child engine, at most timeout seconds in total.
+
+        Returns the names of the child's threads still running at its
+        deadline, plus "TradeEngine process" when the process itself had
+        to be terminated.
+        """
+        if self.stopped is not None:
+            return self.stopped
+        started = time.monotonic()
+        deadline = started + timeout
+        self.stop_event.set()
+        running = []
+        if self.reader is not None:
+            try:
+                # Leave the child time to report before the overall deadline.
+                self.conn.send(("stop", timeout * 0.8))
+            except OSError:
+                pass
+            self.reader.join(max(0.0, deadline - time.monotonic()))
+            running.extend(self.reader.running or [])
+        if self.process.ident is not None:
+            self.process.join(max(0.0, deadline - time.monotonic()))
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(1.0)
+                running.append("TradeEngine process")
+        if self.shared_state is not None:
+            self.shared_state.close()
+        self.conn.close()
+
+        if running:
+            self.log_queue.put(LogRecord(
+                "WARNING", "message", "Still running after {timeout:g}s: {threads}",
+                timeout=timeout, threads=", ".join(running)
+            ))
+        else:
+            self.log_queue.put(LogRecord(
+                "INFO", "message", "Engine process stopped in {ms:.0f} ms",
+                ms=(time.monotonic() - started) * 1000
+            ))
+        self.stopped = running
+        return running
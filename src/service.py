@@ -0,0 +1,176 @@
+"""Headless service mode: run TradeEngine without a display.
+
+The configuration is a JSON file with the portfolio, alerts and engine
+options, or a CSV/JSON portfolio file as accepted by load_portfolio.
+Log records go to stdout or a log file. tkinter is never imported and
+yfinance/pandas only when the Yahoo price source actually fetches.
+"""
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from src.trade_engine import TradeEngine
+
+
+def load_config(path):
+    """Return (portfolio, alerts, options) from a service configuration file.
+
+    A JSON object with a "portfolio" or "alerts" key is a service config:
+
+        {"portfolio": {"AAPL": 10}, "alerts": {"AAPL": 200},
+         "poll_interval": 2, "checkpoint": "state.json",
+         "tick_history": "ticks/", "columnar": false, "metrics_port": 9108}
+
+    Adding "synthetic": {"n_symbols": 1000, "tick_rate": 5000} replaces the
+    Yahoo feed with the offline synthetic one. Several named portfolios go
+    into "books": {"name": {"portfolio": {...}, "alerts": {...}}} and alert
+    rules such as "TSLA down 3%" into "rules": [...]. "engine": "async" runs
+    the pipeline on one event loop with AsyncTradeEngine, which fetches
+    Yahoo quotes with concurrent requests. Any other file is read
+    as a portfolio file by load_portfolio.
+    """
+    if os.path.splitext(path)[1].lower() == ".json":
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict) and ("portfolio" in data or "alerts" in data
+                                       or "books" in data or "rules" in data):
+            portfolio = {str(k).upper(): int(v) for k, v in data.get("portfolio", {}).items()}
+            alerts = {str(k).upper(): float(v) for k, v in data.get("alerts", {}).items()}
+            options = {k: v for k, v in data.items() if k not in ("portfolio", "alerts")}
+            return portfolio, alerts, options
+
+    from src.portfolio_io import load_portfolio
+    result = load_portfolio(path)
+    for row, ticker, message in result.errors:
+        print(f"Config: row {row} ({ticker or '-'}) skipped: {message}", file=sys.stderr)
+    return result.portfolio, result.alerts, {}
+
+
+def build_engine(portfolio, alerts, options):
+    symbols = set(portfolio) | set(alerts)
+    for book in (options.get("books") or {}).values():
+        symbols.update(book.get("portfolio", {}), book.get("alerts", {}))
+    if options.get("rules"):
+        from src.alert_rules import parse_rule
+        symbols.update(rule.symbol for rule in map(parse_rule, options["rules"]) if rule.symbol)
+    symbols = options.get("symbols") or sorted(symbols)
+    synthetic = options.get("synthetic")
+    if synthetic is not None:
+        from src.price_sources import SyntheticPriceSource
+        source = SyntheticPriceSource(symbols=symbols or None, **synthetic)
+        symbols = source.symbols
+    elif options.get("engine") == "async":
+        from src.price_sources import YahooChartSource
+        source = YahooChartSource(poll_interval=options.get("poll_interval", 2.0))
+    else:
+        from src.price_sources import YahooPriceSource
+        source = YahooPriceSource(poll_interval=options.get("poll_interval", 2.0))
+
+    kwargs = dict(
+        price_source=source,
+        columnar=options.get("columnar", False),
+        tick_history=options.get("tick_history"),
+        checkpoint_path=options.get("checkpoint"),
+        metrics_port=options.get("metrics_port"),
+        rules=options.get("rules"),
+    )
+    engine_class = TradeEngine
+    if options.get("engine") == "async":
+        from src.async_engine import AsyncTradeEngine
+        engine_class = AsyncTradeEngine
+    books = options.get("books")
+    if books:
+        if portfolio or alerts:
+            books = dict(books, default={"portfolio": portfolio, "alerts": alerts})
+        return engine_class.from_books(books, symbols, **kwargs)
+    return engine_class(portfolio, alerts, symbols, **kwargs)
+
+
+class LogWriter(threading.Thread):
+    """Writes engine log records and a periodic status line to a text stream"""
+
+    def __init__(self, engine, stream, status_interval=10.0):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.stream = stream
+        self.status_interval = status_interval
+
+    def run(self):
+        next_status = time.monotonic() + self.status_interval
+        log_queue = self.engine.log_queue
+        while True:
+            stopping = self.engine.stop_event.is_set()
+            self.write(log_queue.drain())
+            if stopping:
+                break
+            if self.status_interval and time.monotonic() >= next_status:
+                snapshot = self.engine.shared_state.snapshot
+                self.stream.write(
+                    f"{time.strftime('%H:%M:%S')} STATUS portfolio value "
+                    f"${snapshot.portfolio_value:,.2f}, {len(snapshot.prices)} prices, "
+                    f"version {snapshot.version}\n"
+                )
+                self.stream.flush()
+                next_status += self.status_interval
+            # Sleep until a record arrives, the next status line is due or
+            # the engine stops and closes the log buffer.
+            timeout = max(0.0, next_status - time.monotonic()) if self.status_interval else None
+            try:
+                self.write([log_queue.get(timeout=timeout)])
+            except queue.Empty:
+                pass
+
+    def write(self, records):
+        if not records:
+            return
+        self.stream.write("".join(
+            f"{time.strftime('%H:%M:%S', time.localtime(record.created))} "
+            f"{record.level} {record}\n"
+            for record in records
+        ))
+        self.stream.flush()
+
+
+def run_service(config_path, log_file=None, status_interval=10.0, started=None,
+                metrics_port=None):
+    """Run the engine until SIGINT/SIGTERM. Returns the process exit code."""
+    started = time.perf_counter() if started is None else started
+    portfolio, alerts, options = load_config(config_path)
+    if metrics_port is not None:
+        options["metrics_port"] = metrics_port
+    if not (portfolio or alerts or options.get("books") or options.get("rules")
+            or "synthetic" in options):
+        print("Config: no portfolio or alerts defined", file=sys.stderr)
+        return 2
+
+    try:
+        engine = build_engine(portfolio, alerts, options)
+    except ValueError as e:
+        print(f"Config: {e}", file=sys.stderr)
+        return 2
+    stream = open(log_file, "a") if log_file else sys.stdout
+    writer = LogWriter(engine, stream, status_interval)
+
+    def stop(signum, frame):
+        engine.stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    engine.start()
+    writer.start()
+    engine.log_queue.put(
+        f"Headless engine started in {(time.perf_counter() - started) * 1000:.0f} ms "
+        f"({len(engine.shared_state.symbols)} symbols)"
+    )
+    engine.run_monitor()
+    writer.join(timeout=2)
+    if not writer.is_alive():
+        # Records logged while the engine was stopping.
+        writer.write(engine.log_queue.drain())
+    if stream is not sys.stdout:
+        stream.close()
+    return 0
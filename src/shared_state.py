@@ -1,10 +1,261 @@
+import math
 import threading
+import time
+from collections import namedtuple
+from collections.abc import Mapping
+from types import MappingProxyType
+
+# Immutable view of SharedState published by writers. Readers such as the
+# GUI take the current snapshot without locking and can compare versions to
+# skip work when nothing changed.
+StateSnapshot = namedtuple(
+    "StateSnapshot",
+    ["version", "portfolio_value", "prices", "portfolio", "alerts", "symbols", "published_at",
+     "stale", "received_at", "book_values", "indicators"],
+)
+
+
+class PriceMap(Mapping):
+    """Immutable symbol -> price mapping that shares storage between versions.
+
+    Symbols are spread over small dict chunks by hash. evolve() copies only
+    the chunks holding changed symbols, so publishing a batch costs the
+    batch size rather than the size of the universe, and every earlier map
+    stays valid for readers still holding it.
+    """
+
+    __slots__ = ("chunks", "size")
+
+    CHUNK_SIZE = 64
+
+    def __init__(self, chunks=({},), size=0):
+        self.chunks = tuple(chunks)
+        self.size = size
+
+    def chunk(self, symbol):
+        return self.chunks[hash(symbol) % len(self.chunks)]
+
+    def __getitem__(self, symbol):
+        return self.chunk(symbol)[symbol]
+
+    def get(self, symbol, default=None):
+        return self.chunk(symbol).get(symbol, default)
+
+    def __contains__(self, symbol):
+        return symbol in self.chunk(symbol)
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield from chunk
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return f"PriceMap({dict(self)!r})"
+
+    def evolve(self, changes):
+        """New PriceMap with changes applied, a price of None removes the symbol"""
+        chunks = list(self.chunks)
+        n = len(chunks)
+        copied = set()
+        size = self.size
+        for symbol, price in changes.items():
+            index = hash(symbol) % n
+            if index not in copied:
+                chunks[index] = dict(chunks[index])
+                copied.add(index)
+            chunk = chunks[index]
+            if price is None:
+                if chunk.pop(symbol, None) is not None:
+                    size -= 1
+            else:
+                size += symbol not in chunk
+                chunk[symbol] = price
+        if size > 2 * self.CHUNK_SIZE * n:
+            # Rehash into more chunks, amortised over the growth.
+            while size > self.CHUNK_SIZE * n:
+                n *= 4
+            grown = [{} for _ in range(n)]
+            for chunk in chunks:
+                for symbol, price in chunk.items():
+                    grown[hash(symbol) % n][symbol] = price
+            chunks = grown
+        return PriceMap(chunks, size)
+
 
 class SharedState:
-    def __init__(self, portfolio, alerts, symbols):
+    def __init__(self, portfolio, alerts, symbols, columnar=False, books=None,
+                 indicators=None, lock=None):
         self.prices = {}
+        self.price_times = {}
         self.portfolio = portfolio
         self.portfolio_value = 0.0
         self.alerts = alerts
         self.symbols = symbols
-        self.lock = threading.Lock()
\ No newline at end of file
+        # Any object with the threading.Lock interface, e.g. an
+        # instrumented lock for benchmarks.
+        self.lock = lock if lock is not None else threading.Lock()
+
+        # Contribution of every held position (price * shares) and their
+        # unrounded sum, maintained incrementally by PortfolioConsumer.
+        self.position_values = {}
+        self.portfolio_total = 0.0
+
+        # Symbols whose price changed since AlertConsumer last looked, and
+        # the condition it waits on for new prices.
+        self.changed_symbols = set()
+        self.price_updated = threading.Condition(self.lock)
+
+        # Symbols whose price changed since the last publish().
+        self.unpublished = set()
+
+        # Callbacks run after every publish(), e.g. to signal the GUI.
+        self.listeners = []
+
+        # Symbols whose price was restored from a checkpoint and has not been
+        # refreshed by a live tick yet.
+        self.stale = set()
+
+        # Optional array-backed store for large universes. prices then
+        # becomes a dict-like view over the store's arrays.
+        self.store = None
+        if columnar:
+            from src.columnar_store import ColumnarStore
+            self.store = ColumnarStore(symbols, portfolio, alerts)
+            self.prices = self.store.price_view()
+
+        # Optional BookSet of named portfolios sharing this state's prices.
+        # portfolio and alerts are then the books' combined holdings.
+        self.books = books
+        self.books_changed = False
+
+        # Optional streaming Indicators fed with every applied batch (True
+        # until PortfolioConsumer creates the default ones), and the
+        # IndicatorTable to publish with the next snapshot.
+        self.indicators = indicators
+        self.indicator_table = None
+
+        # Wall time the oldest price of the last applied batch entered
+        # price_queue, for tick-to-display latency.
+        self.received_at = None
+
+        self.version = 0
+        self.snapshot = StateSnapshot(
+            0, 0.0, PriceMap(), MappingProxyType(dict(portfolio)),
+            MappingProxyType(dict(alerts)), tuple(symbols), time.time(), frozenset(), None,
+            MappingProxyType(books.values() if books is not None else {}),
+            MappingProxyType({})
+        )
+
+    def publish(self):
+        """Publish a new immutable snapshot. Caller must hold the lock."""
+        self.version += 1
+        previous = self.snapshot
+        prices = previous.prices
+        if self.unpublished:
+            # Only the symbols changed since the last publish are copied,
+            # the rest of the map is shared with the previous snapshot.
+            current = self.prices
+            prices = prices.evolve({symbol: current.get(symbol) for symbol in self.unpublished})
+            self.unpublished = set()
+        self.snapshot = previous._replace(
+            version=self.version,
+            portfolio_value=self.portfolio_value,
+            prices=prices,
+            published_at=time.time(),
+            stale=frozenset(self.stale) if self.stale or previous.stale else previous.stale,
+            received_at=self.received_at,
+            book_values=MappingProxyType(self.books.values())
+            if self.books_changed else previous.book_values,
+            indicators=self.indicator_table
+            if self.indicator_table is not None else previous.indicators,
+        )
+        self.books_changed = False
+        self.indicator_table = None
+        for listener in self.listeners:
+            listener()
+
+    def subscribe(self, callback):
+        """Call callback() after every published snapshot.
+
+        It runs with the lock held, so it must be quick and must not block,
+        threading.Event.set for example.
+        """
+        self.listeners.append(callback)
+
+    def restore(self, prices, price_times):
+        """Load prices from a checkpoint and mark them stale. Caller must hold the lock."""
+        for symbol, price in prices.items():
+            self.prices[symbol] = price
+        if self.store is not None:
+            for symbol, updated_at in price_times.items():
+                if symbol in prices and updated_at:
+                    self.store.updated_at[self.store.id_for(symbol)] = updated_at
+        else:
+            self.price_times.update(
+                (symbol, updated_at) for symbol, updated_at in price_times.items()
+                if symbol in prices
+            )
+        self.stale.update(prices)
+        self.unpublished.update(prices)
+        self.revalue_all()
+        if self.books is not None:
+            self.books.revalue_all(self.prices)
+            self.books_changed = True
+        self.publish()
+
+    def checkpoint_state(self):
+        """Plain copy of the state worth persisting. Caller must hold the lock."""
+        if self.store is not None:
+            store = self.store
+            prices = store.price_dict()
+            price_times = {symbol: float(store.updated_at[store.ids[symbol]]) for symbol in prices}
+        else:
+            prices = dict(self.prices)
+            price_times = {symbol: self.price_times.get(symbol, 0.0) for symbol in prices}
+        return {
+            "portfolio": dict(self.portfolio),
+            "alerts": dict(self.alerts),
+            "symbols": list(self.symbols),
+            "prices": prices,
+            "price_times": price_times,
+            "portfolio_value": self.portfolio_value,
+            "books": self.books.to_dict() if self.books is not None else None,
+        }
+
+    def apply_books(self, batch):
+        """Update the books holding the symbols in batch. Caller must hold the lock."""
+        if self.books is not None and self.books.apply(batch, self.prices):
+            self.books_changed = True
+
+    def apply_indicators(self, table):
+        """Publish an IndicatorTable with the next snapshot. Caller must hold the lock."""
+        if table is not None:
+            self.indicator_table = table
+
+    def wake(self):
+        """Wake every thread waiting on price_updated, e.g. to let it see a stop"""
+        with self.price_updated:
+            self.price_updated.notify_all()
+
+    def mark_changed(self, symbols):
+        """Record updated symbols and wake waiting readers. Caller must hold the lock."""
+        symbols = list(symbols)
+        self.changed_symbols.update(symbols)
+        self.unpublished.update(symbols)
+        self.price_updated.notify_all()
+
+    def revalue_all(self):
+        """Recompute every position value from scratch. Caller must hold the lock."""
+        if self.store is not None:
+            self.portfolio_total = self.store.portfolio_value()
+            self.portfolio_value = round(self.portfolio_total, 2)
+            return
+        self.position_values = {
+            stock: self.prices[stock] * shares
+            for stock, shares in self.portfolio.items()
+            if stock in self.prices
+        }
+        self.portfolio_total = math.fsum(self.position_values.values())
+        self.portfolio_value = round(self.portfolio_total, 2)
@@ -0,0 +1,48 @@
+import threading
+
+# Wait timeout for threads that cannot be woken by a plain threading.Event.
+POLL_TIMEOUT = 0.5
+
+
+class StopEvent(threading.Event):
+    """threading.Event that also runs wake-up callbacks when it is set.
+
+    A thread blocked on a queue or condition rather than on the event
+    itself registers a callback with on_set() that wakes it, so set() stops
+    every worker at once and none of them has to poll is_set(). Callbacks
+    run once, in the thread that calls set(), and must not block.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.callbacks = []
+        self.callbacks_lock = threading.Lock()
+
+    def on_set(self, callback):
+        """Run callback() when the event is set, right away if it already is"""
+        with self.callbacks_lock:
+            if not self.is_set():
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def set(self):
+        with self.callbacks_lock:
+            super().set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+def wake_on_stop(stop_event, callback):
+    """Register callback to wake a blocked thread when stop_event is set.
+
+    Returns the timeout the thread's blocking waits should use: None for a
+    StopEvent, which wakes them, and POLL_TIMEOUT for a plain Event, which
+    can only be noticed by polling.
+    """
+    on_set = getattr(stop_event, "on_set", None)
+    if on_set is None:
+        return POLL_TIMEOUT
+    on_set(callback)
+    return None
@@ -0,0 +1,189 @@
+import os
+import queue
+import threading
+import time
+import numpy as np
+from src.stop_event import wake_on_stop
+
+# Fixed-size little-endian record of the binary tick log (20 bytes).
+TICK_RECORD = np.dtype([("timestamp", "<f8"), ("symbol_id", "<i4"), ("price", "<f8")])
+
+TICKS_FILE = "ticks.bin"
+SYMBOLS_FILE = "symbols.txt"
+
+
+class TickWriter(threading.Thread):
+    """Appends every published price to an on-disk tick log.
+
+    append() only hands the batch to this thread, so the producer's
+    price_queue path never waits for disk I/O. Batches are converted to
+    TICK_RECORD arrays and written in large chunks. Symbols get ids in order
+    of first appearance; the id is the line number in symbols.txt.
+    Records keep the timestamp they were appended with, so the log is only
+    sorted by time while the clock does not go back.
+    """
+
+    def __init__(self, directory, stop_event, max_pending=10000, flush_interval=1.0):
+        super().__init__(daemon=True)
+        self.directory = directory
+        self.stop_event = stop_event
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.flush_interval = flush_interval
+        self.dropped_batches = 0
+        self.written = 0
+        # None in pending wakes the writer when stop_event is set.
+        self.wait_timeout = wake_on_stop(stop_event, self.wake)
+
+        os.makedirs(directory, exist_ok=True)
+        self.symbol_ids = {
+            symbol: symbol_id for symbol_id, symbol in enumerate(read_symbols(directory))
+        }
+        self.ticks_file = open(os.path.join(directory, TICKS_FILE), "ab")
+        self.symbols_file = open(os.path.join(directory, SYMBOLS_FILE), "a")
+        # Drop a partial record left behind by a crash so records stay aligned.
+        size = self.ticks_file.tell()
+        if size % TICK_RECORD.itemsize:
+            self.ticks_file.truncate(size - size % TICK_RECORD.itemsize)
+
+    def append(self, prices, timestamp=None):
+        """Queue a dict or PriceBatch of prices for writing"""
+        try:
+            self.pending.put_nowait((time.time() if timestamp is None else timestamp, prices))
+        except queue.Full:
+            self.dropped_batches += 1
+
+    def wake(self):
+        try:
+            self.pending.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def run(self):
+        last_flush = time.monotonic()
+        try:
+            while not (self.stop_event.is_set() and self.pending.empty()):
+                try:
+                    batches = [self.pending.get(timeout=self.wait_timeout)]
+                except queue.Empty:
+                    continue
+                while True:
+                    try:
+                        batches.append(self.pending.get_nowait())
+                    except queue.Empty:
+                        break
+                batches = [batch for batch in batches if batch is not None]
+                if batches:
+                    self.write(batches)
+
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    self.flush()
+                    last_flush = time.monotonic()
+        finally:
+            self.close()
+
+    def write(self, batches):
+        records = np.empty(sum(len(prices) for _, prices in batches), dtype=TICK_RECORD)
+        position = 0
+        for timestamp, prices in batches:
+            items = prices.items()
+            count = len(items)
+            if not count:
+                continue
+            end = position + count
+            records["timestamp"][position:end] = timestamp
+            records["symbol_id"][position:end] = [self.symbol_id(symbol) for symbol, _ in items]
+            records["price"][position:end] = [price for _, price in items]
+            position = end
+
+        # New symbols must be on disk before records that refer to them.
+        self.symbols_file.flush()
+        self.ticks_file.write(records[:position].tobytes())
+        self.written += position
+
+    def symbol_id(self, symbol):
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbol_ids)
+            self.symbol_ids[symbol] = symbol_id
+            self.symbols_file.write(symbol + "\n")
+        return symbol_id
+
+    def flush(self):
+        self.symbols_file.flush()
+        self.ticks_file.flush()
+
+    def close(self):
+        if not self.ticks_file.closed:
+            self.flush()
+            self.ticks_file.close()
+            self.symbols_file.close()
+
+
+class TickStore:
+    """Read-only, memory-mapped view of a tick log written by TickWriter.
+
+    records is a zero-copy NumPy view of the file in the order it was
+    written. Timestamps are sorted except where the writer's clock went
+    back, e.g. after a restart, so the log is read as sorted segments split
+    there and range queries are binary searches in each segment. Call
+    refresh() to see records appended since the store was opened.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.refresh()
+
+    def refresh(self):
+        self.symbols = read_symbols(self.directory)
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        path = os.path.join(self.directory, TICKS_FILE)
+        count = os.path.getsize(path) // TICK_RECORD.itemsize if os.path.exists(path) else 0
+        if count:
+            self.records = np.memmap(path, dtype=TICK_RECORD, mode="r", shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=TICK_RECORD)
+        timestamps = self.records["timestamp"]
+        backwards = np.flatnonzero(timestamps[1:] < timestamps[:-1]) + 1
+        self.segments = np.r_[0, backwards, count].tolist()
+
+    def __len__(self):
+        return len(self.records)
+
+    def range(self, start=None, end=None, symbol=None):
+        """Records with start <= timestamp < end by time, optionally for one symbol.
+
+        Without a symbol and within one sorted segment the result is a
+        slice of the memory map (no copy).
+        """
+        timestamps = self.records["timestamp"]
+        parts = []
+        for first, last in zip(self.segments, self.segments[1:]):
+            segment = timestamps[first:last]
+            low = 0 if start is None else int(np.searchsorted(segment, start, side="left"))
+            high = len(segment) if end is None else int(np.searchsorted(segment, end, side="left"))
+            if low < high:
+                parts.append(self.records[first + low:first + high])
+        if len(parts) > 1:
+            records = np.concatenate(parts)
+            records = records[np.argsort(records["timestamp"], kind="stable")]
+        else:
+            records = parts[0] if parts else self.records[:0]
+        if symbol is not None:
+            symbol_id = self.symbol_ids.get(symbol)
+            if symbol_id is None:
+                return records[:0]
+            records = records[records["symbol_id"] == symbol_id]
+        return records
+
+    def prices(self, symbol, start=None, end=None):
+        """(timestamps, prices) arrays of one symbol"""
+        records = self.range(start, end, symbol)
+        return records["timestamp"], records["price"]
+
+
+def read_symbols(directory):
+    try:
+        with open(os.path.join(directory, SYMBOLS_FILE)) as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
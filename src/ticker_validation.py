@@ -0,0 +1,197 @@
+import ast
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# yfinance (which pulls in pandas) is imported by lookup(), so creating a
+# validator, e.g. with the config window, does not load it.
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".stock_monitor", "tickers.json")
+
+# Always listed ticker added to every lookup. yf.download reports failed
+# requests only in its log, so without bars for it the whole download is
+# taken to have failed rather than every ticker to be unknown.
+REFERENCE_TICKER = "SPY"
+
+
+# Per-ticker errors yf.download logs after the download, e.g.
+# "['NOPE']: YFTzMissingError('possibly delisted; no timezone found')".
+FAILED_DOWNLOAD = re.compile(r"^(\[.*?\]): (.*)$", re.S)
+
+# Errors that mean Yahoo answered and has no such ticker. Any other error,
+# e.g. a reset connection, leaves the ticker unchecked.
+TICKER_MISSING = ("possibly delisted", "no timezone found", "no price data found")
+
+
+class LookupFailed(Exception):
+    """The lookup returned no usable data, so nothing could be validated"""
+
+
+class DownloadErrors(logging.Handler):
+    """Collects the errors yf.download logs for tickers instead of raising"""
+
+    def __init__(self, tickers):
+        super().__init__(logging.ERROR)
+        self.tickers = set(tickers)
+        self.errors = {}
+
+    def emit(self, record):
+        match = FAILED_DOWNLOAD.match(record.getMessage())
+        if match is None:
+            return
+        try:
+            tickers = ast.literal_eval(match.group(1))
+        except (ValueError, SyntaxError):
+            return
+        for ticker in tickers:
+            if ticker in self.tickers:
+                self.errors[ticker] = match.group(2)
+
+# yfinance reports unknown tickers through its logger; keep that out of the
+# console instead of redirecting sys.stderr for the whole process.
+logging.getLogger("yfinance").addHandler(logging.NullHandler())
+
+
+class TickerValidator:
+    """Checks that tickers exist, backed by a persistent on-disk cache.
+
+    Known tickers are trusted for ttl seconds and rejected ones for
+    negative_ttl seconds, so they validate instantly and are not queried
+    again. Only tickers Yahoo answered for without data are rejected;
+    network errors, also those of single tickers in a batch, and downloads
+    that returned nothing are never cached. validate_async() runs the check
+    on a worker thread so the Tk thread never waits for the network.
+    """
+
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, ttl=7 * 86400,
+                 negative_ttl=86400, max_workers=4, lookup_threads=32):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lookup_threads = lookup_threads
+        self.lock = threading.Lock()
+        self.entries = self.load()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers,
+                                       thread_name_prefix="ticker-validation")
+
+    def load(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Write the cache atomically. Caller must hold the lock."""
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.cache_path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.entries, f, separators=(",", ":"))
+        os.replace(temporary, self.cache_path)
+
+    def cached(self, ticker):
+        """True or False from a fresh cache entry, None when unknown or expired"""
+        with self.lock:
+            entry = self.entries.get(ticker)
+        if entry is None:
+            return None
+        ttl = self.ttl if entry["valid"] else self.negative_ttl
+        if time.time() - entry["checked"] > ttl:
+            return None
+        return entry["valid"]
+
+    def validate(self, ticker):
+        return self.validate_many([ticker])[ticker]
+
+    def validate_many(self, tickers):
+        """Return ticker -> True/False, querying only tickers not in the cache.
+
+        Unknown tickers are checked with a single batched download. A ticker
+        whose own request failed maps to None and is not cached. Raises
+        LookupFailed, or the download error, when the lookup did not get
+        through; nothing is cached then.
+        """
+        results = {}
+        unknown = []
+        for ticker in tickers:
+            valid = self.cached(ticker)
+            if valid is None:
+                unknown.append(ticker)
+            else:
+                results[ticker] = valid
+
+        if unknown:
+            found, failed = self.lookup(unknown)
+            now = time.time()
+            with self.lock:
+                for ticker in unknown:
+                    if ticker in failed:
+                        results[ticker] = None
+                        continue
+                    results[ticker] = ticker in found
+                    self.entries[ticker] = {"valid": ticker in found, "checked": now}
+                try:
+                    self.save()
+                except OSError:
+                    pass
+        return results
+
+    def lookup(self, tickers):
+        """(found, failed) sets of tickers: those with recent daily bars on
+        Yahoo Finance and those whose request failed for another reason
+        than an unknown ticker.
+
+        Raises LookupFailed when not even REFERENCE_TICKER has bars, e.g.
+        because the network is down.
+        """
+        import yfinance as yf
+
+        requested = list(dict.fromkeys(list(tickers) + [REFERENCE_TICKER]))
+        errors = DownloadErrors(requested)
+        logger = logging.getLogger("yfinance")
+        logger.addHandler(errors)
+        try:
+            data = yf.download(
+                tickers=" ".join(requested),
+                period="5d",
+                interval="1d",
+                progress=False,
+                auto_adjust=False,
+                threads=min(self.lookup_threads, len(requested))
+            )
+        finally:
+            logger.removeHandler(errors)
+        if data is None or data.empty:
+            raise LookupFailed("no data returned")
+        closes = data["Close"]
+        found = {ticker for ticker in requested
+                 if ticker in closes and closes[ticker].notna().any()}
+        if REFERENCE_TICKER not in found:
+            raise LookupFailed(f"no data for reference ticker {REFERENCE_TICKER}")
+        failed = {ticker for ticker, error in errors.errors.items()
+                  if ticker not in found and not any(text in error for text in TICKER_MISSING)}
+        return found, failed
+
+    def validate_async(self, ticker, callback):
+        """Validate on a worker thread and call callback(ticker, result).
+
+        result is True or False, or None if the ticker could not be checked.
+        The callback runs on the worker thread.
+        """
+        def run():
+            try:
+                result = self.validate(ticker)
+            except Exception:
+                result = None
+            callback(ticker, result)
+
+        return self.pool.submit(run)
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -1,35 +1,216 @@
-import threading
 import time
-import queue
 from src.shared_state import SharedState
+from src.conflating_queue import ConflatingQueue
+from src.metrics import Metrics, MetricsServer
+from src.books import BookSet
+from src.log_buffer import LogBuffer, LogRecord
+from src.stop_event import StopEvent
+from src.checkpoint import Checkpointer, load_checkpoint
 from src.workers import PriceProducer, PortfolioConsumer, AlertConsumer
 
 class TradeEngine:
-    def __init__(self, portfolio, alerts, symbols):
-        self.stop_event = threading.Event()
-        self.shared_state = SharedState(portfolio, alerts, symbols)
-        self.price_queue = queue.Queue()
-        self.log_queue = queue.Queue()
+    def __init__(self, portfolio, alerts, symbols, price_source=None, columnar=False,
+                 tick_history=None, checkpoint_path=None, checkpoint_interval=30.0,
+                 scheduler=None, metrics_port=None, books=None, rules=None, indicators=True,
+                 lock=None, portfolio_consumer_class=PortfolioConsumer,
+                 alert_consumer_class=AlertConsumer):
+        # Setting stop_event wakes every thread blocked on a queue or
+        # condition, see stop().
+        self.stop_event = StopEvent()
+        self.metrics = Metrics()
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+
+        # Alert rules are compiled up front, and symbols they watch are
+        # fetched even when no portfolio or alert mentions them.
+        if rules:
+            from src.alert_rules import RuleEngine
+            rules = RuleEngine(rules, calendar=scheduler.calendar if scheduler is not None else None)
+            known = set(symbols)
+            symbols = list(symbols) + [s for s in rules.symbols if s not in known]
+        # EMA, VWAP, volatility and day range per symbol; pass an
+        # Indicators instance to change its windows, or False to turn it off.
+        # The default ones are created by PortfolioConsumer with the first batch.
+        if indicators is False:
+            indicators = None
+        self.shared_state = SharedState(portfolio, alerts, symbols, columnar=columnar,
+                                        books=books, indicators=indicators, lock=lock)
+        # Last value wins per symbol, so a lagging PortfolioConsumer jumps
+        # to current prices instead of working through a backlog.
+        self.price_queue = ConflatingQueue()
+        self.log_queue = LogBuffer()
+        self.stop_event.on_set(self.log_queue.close)
+
+        # Warm start: prices from the last checkpoint are shown immediately,
+        # marked stale, until the producer delivers fresh ones.
+        self.checkpointer = None
+        if checkpoint_path is not None:
+            self.restore_checkpoint(checkpoint_path)
+            self.checkpointer = Checkpointer(
+                self.shared_state, checkpoint_path, self.log_queue, self.stop_event,
+                interval=checkpoint_interval
+            )
+
+        # Optional append-only tick log in the tick_history directory.
+        self.tick_writer = None
+        if tick_history is not None:
+            from src.tick_store import TickWriter
+            self.tick_writer = TickWriter(tick_history, self.stop_event)
 
         self.producer = PriceProducer(
-            self.shared_state, self.price_queue, self.log_queue, self.stop_event
+            self.shared_state, self.price_queue, self.log_queue, self.stop_event,
+            source=price_source, tick_writer=self.tick_writer, scheduler=scheduler,
+            metrics=self.metrics
         )
-        self.portfolio_consumer = PortfolioConsumer(
-            self.shared_state, self.price_queue, self.log_queue, self.stop_event
+        # The consumer classes can be replaced by subclasses, e.g. ones that
+        # record latencies in benchmarks.
+        self.portfolio_consumer = portfolio_consumer_class(
+            self.shared_state, self.price_queue, self.log_queue, self.stop_event,
+            metrics=self.metrics
         )
-        self.alert_consumer = AlertConsumer(
-            self.shared_state, self.log_queue, self.stop_event
+        self.alert_consumer = alert_consumer_class(
+            self.shared_state, self.log_queue, self.stop_event, metrics=self.metrics,
+            rules=rules
         )
+        self.register_metrics()
+
+    def register_metrics(self):
+        """Gauges and counters read from the engine's queues and state when scraped"""
+        metrics = self.metrics
+        price_queue = self.price_queue
+        log_queue = self.log_queue
+        shared = self.shared_state
+        metrics.gauge("stock_monitor_queue_depth", "Updates waiting in a queue",
+                      func=price_queue.qsize, queue="price")
+        metrics.gauge("stock_monitor_queue_depth", "Updates waiting in a queue",
+                      func=log_queue.qsize, queue="log")
+        metrics.gauge("stock_monitor_price_queue_lag_seconds",
+                      "Age of the oldest price waiting in price_queue", func=price_queue.lag)
+        metrics.counter("stock_monitor_price_queue_conflated_total",
+                        "Prices replaced by a newer price before being applied",
+                        func=lambda: price_queue.conflated)
+        metrics.counter("stock_monitor_queue_dropped_total", "Updates dropped by a full queue",
+                        func=lambda: price_queue.dropped, queue="price")
+        metrics.counter("stock_monitor_queue_dropped_total", "Updates dropped by a full queue",
+                        func=lambda: log_queue.dropped, queue="log")
+        metrics.counter("stock_monitor_log_sampled_total",
+                        "Log records suppressed by rate sampling",
+                        func=lambda: log_queue.sampled)
+        metrics.gauge("stock_monitor_snapshot_version", "Version of the published state",
+                      func=lambda: shared.snapshot.version)
+        metrics.gauge("stock_monitor_portfolio_value", "Current portfolio value",
+                      func=lambda: shared.snapshot.portfolio_value)
+        metrics.gauge("stock_monitor_symbols", "Monitored symbols",
+                      func=lambda: len(shared.snapshot.symbols))
+        if shared.books is not None:
+            for name in shared.books.books:
+                metrics.gauge("stock_monitor_book_value", "Current value of a named portfolio",
+                              func=lambda name=name: shared.snapshot.book_values[name],
+                              book=name)
 
     def start(self):
         self.log_queue.put("Starting all threads...")
+        self.start_services()
         self.producer.start()
         self.portfolio_consumer.start()
         self.alert_consumer.start()
 
+    def start_services(self):
+        """Start the optional helper threads: metrics endpoint, tick log and checkpoints"""
+        if self.metrics_port is not None:
+            try:
+                self.metrics_server = MetricsServer(self.metrics, self.stop_event,
+                                                    port=self.metrics_port)
+            except OSError as e:
+                self.log_queue.put(f"Metrics endpoint ERROR: {e}")
+            else:
+                self.metrics_server.start()
+                self.log_queue.put(
+                    f"Metrics at http://127.0.0.1:{self.metrics_server.port}/metrics"
+                )
+        if self.tick_writer is not None:
+            self.tick_writer.start()
+        if self.checkpointer is not None:
+            self.checkpointer.start()
+
+    def threads(self):
+        """The engine's started threads"""
+        threads = (self.producer, self.portfolio_consumer, self.alert_consumer,
+                   self.tick_writer, self.checkpointer, self.metrics_server)
+        return [thread for thread in threads if thread is not None and thread.ident is not None]
+
+    def stop(self, timeout=5.0):
+        """Stop every thread and wait for them, at most timeout seconds in total.
+
+        Returns the names of the threads still running at the deadline,
+        e.g. a producer stuck in a network request; they are daemon
+        threads and do not keep the process alive.
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        self.stop_event.set()
+        running = []
+        for thread in self.threads():
+            thread.join(max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                running.append(type(thread).__name__)
+        if running:
+            self.log_queue.put(LogRecord(
+                "WARNING", "message", "Still running after {timeout:g}s: {threads}",
+                timeout=timeout, threads=", ".join(running)
+            ))
+        else:
+            self.log_queue.put(LogRecord(
+                "INFO", "message", "All threads stopped in {ms:.0f} ms",
+                ms=(time.monotonic() - started) * 1000
+            ))
+        return running
+
+    @classmethod
+    def from_books(cls, books, symbols=(), **kwargs):
+        """Create an engine for several named portfolios sharing one price feed.
+
+        books maps a name to {"portfolio": {...}, "alerts": {...}}. Every
+        symbol is fetched once however many books hold it; extra symbols
+        are only watched.
+        """
+        book_set = BookSet(books)
+        universe = list(dict.fromkeys(book_set.symbols + list(symbols)))
+        return cls(book_set.portfolio(), book_set.alerts(), universe, books=book_set, **kwargs)
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint_path, **kwargs):
+        """Create an engine with the portfolio and alerts of a saved checkpoint"""
+        state = load_checkpoint(checkpoint_path)
+        if state is None:
+            raise ValueError(f"No usable checkpoint at {checkpoint_path}")
+        if state.get("books"):
+            return cls.from_books(state["books"], state["symbols"],
+                                  checkpoint_path=checkpoint_path, **kwargs)
+        return cls(state["portfolio"], state["alerts"], state["symbols"],
+                   checkpoint_path=checkpoint_path, **kwargs)
+
+    def restore_checkpoint(self, checkpoint_path):
+        state = load_checkpoint(checkpoint_path)
+        if state is None:
+            return
+        symbols = set(self.shared_state.symbols)
+        prices = {symbol: price for symbol, price in state["prices"].items() if symbol in symbols}
+        with self.shared_state.lock:
+            self.shared_state.restore(prices, state["price_times"])
+        age = time.time() - state["saved_at"]
+        self.log_queue.put(
+            f"Restored {len(prices)} prices from checkpoint ({age:.0f}s old), refreshing..."
+        )
+
     def run_monitor(self):
+        """Block until stop_event is set or Ctrl+C is pressed, then stop()"""
         try:
-            while True:
-                time.sleep(3)
+            # The timeout only lets Ctrl+C through on platforms where a
+            # blocking wait cannot be interrupted.
+            while not self.stop_event.wait(3):
+                pass
         except KeyboardInterrupt:
-            self.log_queue.put("Application stopped")
+            pass
+        self.log_queue.put("Application stopped")
+        self.stop()
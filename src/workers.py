@@ -1,88 +1,519 @@
 import threading
 import time
 import queue
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
 from src.shared_state import SharedState
+from src.alerts import AlertIndex
+from src.log_buffer import LogRecord
+from src.metrics import Metrics, SIZE_BUCKETS
+from src.price_sources import YahooPriceSource
+from src.stop_event import wake_on_stop
+
+# Put into a plain work queue to end a PortfolioConsumer blocked on it.
+STOP = object()
 
 
 class PriceProducer(threading.Thread):
-    def __init__(self, shared_state, work_queue, log_queue, stop_event):
+    def __init__(self, shared_state, work_queue, log_queue, stop_event, source=None,
+                 max_workers=8, shard_timeout=30.0, retries=2, retry_delay=0.5,
+                 tick_writer=None, scheduler=None, metrics=None):
         super().__init__(daemon=True)
         self.shared = shared_state
         self.work_queue = work_queue
         self.log_queue = log_queue
         self.stop_event = stop_event
+        self.source = source if source is not None else YahooPriceSource()
+        self.max_workers = max_workers
+        self.shard_timeout = shard_timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.tick_writer = tick_writer
+        # Optional PollScheduler; without one every symbol is fetched each
+        # poll_interval of the source.
+        self.scheduler = scheduler if scheduler is not None else self.source.make_scheduler()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.fetch_seconds = self.metrics.histogram(
+            "stock_monitor_fetch_seconds", "Duration of one price source request")
+        self.fetch_errors = self.metrics.counter(
+            "stock_monitor_fetch_errors_total", "Failed price source requests")
+        self.ticks_fetched = self.metrics.counter(
+            "stock_monitor_ticks_fetched_total", "Prices received from the price source")
+        self.pool = None
+        # Running shard fetches: future -> (shard, monotonic submit time).
+        self.pending = {}
+        # Symbols of running or given up shard fetches; they are skipped
+        # until the request finishes instead of piling up more requests.
+        self.in_flight = set()
 
     def run(self):
-        while not self.stop_event.is_set():
-            try:
-                symbols = self.shared.symbols 
-                if not symbols:
-                    self.log_queue.put("Producer ERROR: No symbols defined.")
-                    time.sleep(5)
+        try:
+            while not self.stop_event.is_set():
+                started = time.monotonic()
+                try:
+                    symbols = self.shared.symbols 
+                    if not symbols:
+                        self.log_queue.put(LogRecord(
+                            "ERROR", "producer", "Producer ERROR: No symbols defined."
+                        ))
+                        self.stop_event.wait(5)
+                        continue
+
+                    if self.scheduler is not None:
+                        self.scheduler.sync(symbols, self.shared.portfolio, self.shared.alerts)
+                        symbols = self.scheduler.due()
+                        if not symbols:
+                            self.wait_for_due()
+                            continue
+
+                    shard_size = self.source.shard_size
+                    if shard_size and len(symbols) > shard_size:
+                        self.fetch_sharded(symbols, shard_size)
+                    else:
+                        try:
+                            self.publish(self.fetch_shard(symbols), symbols)
+                        except Exception:
+                            self.reschedule(failed=symbols)
+                            raise
+
+                except Exception as e:
+                    self.log_queue.put(LogRecord(
+                        "ERROR", "producer", "{source} ERROR: {error}",
+                        source=self.source.name, error=e
+                    ))
+
+                if self.scheduler is not None:
+                    if self.pending:
+                        self.collect(0.0)
                     continue
-                
-                data = yf.download(
-                    tickers=" ".join(symbols),
-                    period="1d",
-                    interval="1m",
-                    progress=False,
-                    auto_adjust=False
-                )
+                remaining = self.source.poll_interval - (time.monotonic() - started)
+                if self.pending:
+                    self.collect(remaining)
+                elif remaining > 0:
+                    self.stop_event.wait(remaining)
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def fetch_sharded(self, symbols, shard_size):
+        """Submit the shards of symbols; collect() publishes them as they complete"""
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="price-shard"
+            )
+
+        if self.in_flight:
+            stuck = [symbol for symbol in symbols if symbol in self.in_flight]
+            if stuck:
+                self.reschedule(failed=stuck)
+                symbols = [symbol for symbol in symbols if symbol not in self.in_flight]
 
-                last_row = data.tail(1)
+        submitted = time.monotonic()
+        for i in range(0, len(symbols), shard_size):
+            shard = tuple(symbols[i:i + shard_size])
+            self.in_flight.update(shard)
+            self.pending[self.pool.submit(self.fetch_shard, list(shard))] = (shard, submitted)
 
-                for symbol in symbols:
-                    price = float(last_row["Close"][symbol].iloc[0])
-                    self.work_queue.put((symbol, price))
-                    self.log_queue.put(f"[API] {symbol} = {price}")
+    def collect(self, timeout):
+        """Publish the shards that complete within timeout seconds.
 
-            except Exception as e:
-                self.log_queue.put(f"yfinance ERROR: {e}")
+        Each shard is published as soon as it completes, so a slow or
+        failing shard only delays its own symbols: shards still running
+        stay pending into the next cycle, and their symbols are skipped
+        until they finish. After shard_timeout seconds a shard is given up.
+        """
+        try:
+            for future in as_completed(list(self.pending), timeout=max(timeout, 0.0)):
+                shard, _ = self.pending.pop(future)
+                self.in_flight.difference_update(shard)
+                try:
+                    self.publish(future.result(), shard)
+                except Exception as e:
+                    self.reschedule(failed=shard)
+                    self.log_queue.put(LogRecord(
+                        "ERROR", "producer", "{source} ERROR ({first}..{last}): {error}",
+                        source=self.source.name, first=shard[0], last=shard[-1], error=e
+                    ))
+                if self.stop_event.is_set():
+                    return
+        except FuturesTimeout:
+            pass
 
-            time.sleep(2)
+        now = time.monotonic()
+        for future, (shard, submitted) in list(self.pending.items()):
+            if now - submitted < self.shard_timeout:
+                continue
+            del self.pending[future]
+            self.reschedule(failed=shard)
+            # The symbols stay in in_flight until the stuck request ends.
+            future.add_done_callback(
+                lambda _, shard=shard: self.in_flight.difference_update(shard)
+            )
+            self.log_queue.put(LogRecord(
+                "ERROR", "producer",
+                "{source} ERROR ({first}..{last}): no response within {timeout}s",
+                source=self.source.name, first=shard[0], last=shard[-1],
+                timeout=self.shard_timeout
+            ))
+
+    def fetch_shard(self, symbols):
+        """Fetch one shard, retrying failed requests with exponential backoff"""
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                prices = self.source.fetch(symbols)
+                self.fetch_seconds.observe(time.perf_counter() - started)
+                return prices
+            except Exception:
+                self.fetch_seconds.observe(time.perf_counter() - started)
+                self.fetch_errors.inc()
+                if attempt == self.retries or self.stop_event.wait(self.retry_delay * 2 ** attempt):
+                    raise
+
+    def wait_for_due(self):
+        """Sleep until the scheduler's next symbol is due, at most one second,
+        publishing shards that complete meanwhile"""
+        next_due = self.scheduler.next_due()
+        delay = 1.0 if next_due is None else next_due - time.monotonic()
+        delay = min(max(delay, 0.01), 1.0)
+        if self.pending:
+            self.collect(delay)
+        else:
+            self.stop_event.wait(delay)
+
+    def reschedule(self, prices=None, failed=(), unchanged=()):
+        if self.scheduler is not None:
+            self.scheduler.record(prices if prices is not None else {}, failed,
+                                  unchanged=unchanged)
+
+    def publish(self, prices, requested=()):
+        if self.scheduler is not None:
+            # Requested symbols without a price count as failed polls, unless
+            # the source reports them as unchanged.
+            unchanged = getattr(prices, "unchanged", ())
+            received = set(symbol for symbol, _ in prices.items())
+            received.update(unchanged)
+            self.reschedule(prices, [s for s in requested if s not in received], unchanged)
+        if self.tick_writer is not None:
+            self.tick_writer.append(prices)
+        self.ticks_fetched.inc(len(prices))
+        volumes = getattr(prices, "volumes", None)
+        if volumes is not None and hasattr(self.work_queue, "take_volumes"):
+            volumes = volumes()
+        else:
+            volumes = {}
+        for symbol, price in prices.items():
+            volume = volumes.get(symbol)
+            if volume is None:
+                self.work_queue.put((symbol, price))
+            else:
+                self.work_queue.put((symbol, price), volume=volume)
+            self.log_queue.put(LogRecord(
+                "INFO", "api", "[API] {symbol} = {price}", symbol=symbol, price=price
+            ))
+        for symbol in getattr(prices, "missing", ()):
+            self.log_queue.put(LogRecord(
+                "WARNING", "producer", "{source} WARNING: no data for {symbol}",
+                symbol=symbol, source=self.source.name
+            ))
 
 
 class PortfolioConsumer(threading.Thread):
-    def __init__(self, shared_state, work_queue, log_queue, stop_event):
+    def __init__(self, shared_state, work_queue, log_queue, stop_event,
+                 max_batch=5000, reconcile_every=1000, metrics=None):
         super().__init__(daemon=True)
         self.shared = shared_state
         self.work_queue = work_queue
         self.log_queue = log_queue
         self.stop_event = stop_event
+        self.max_batch = max_batch
+        self.reconcile_every = reconcile_every
+        self.ticks_since_reconcile = 0
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.lock_wait = self.metrics.histogram(
+            "stock_monitor_lock_wait_seconds", "Time spent waiting for SharedState.lock",
+            stage="portfolio")
+        self.lock_hold = self.metrics.histogram(
+            "stock_monitor_lock_hold_seconds", "Time SharedState.lock is held",
+            stage="portfolio")
+        self.batch_size = self.metrics.histogram(
+            "stock_monitor_batch_size", "Prices applied per portfolio update",
+            buckets=SIZE_BUCKETS)
+        self.ticks_applied = self.metrics.counter(
+            "stock_monitor_ticks_applied_total", "Prices applied to the portfolio")
+        # Blocks on the queue until a price arrives; stopping closes the
+        # queue or puts STOP into it.
+        self.wait_timeout = wake_on_stop(stop_event, self.wake)
+
+    def wake(self):
+        close = getattr(self.work_queue, "close", None)
+        if close is not None:
+            close()
+            return
+        try:
+            self.work_queue.put_nowait(STOP)
+        except queue.Full:
+            pass
 
     def run(self):
         while not self.stop_event.is_set():
-            symbol, price = self.work_queue.get()
-            with self.shared.lock:
-                self.shared.prices[symbol] = price
-                total = 0
-                for stock, shares in self.shared.portfolio.items():
-                    if stock in self.shared.prices:
-                        total += self.shared.prices[stock] * shares
-                self.shared.portfolio_value = round(total, 2)
-
-            self.log_queue.put(
-                f"Portfolio update: {symbol}={price}, total value = {self.shared.portfolio_value}"
-            )
+            try:
+                item = self.work_queue.get(timeout=self.wait_timeout)
+            except queue.Empty:
+                continue
+            if item is STOP:
+                break
+            batch = [item]
+            stopping = False
+            # The first item is the oldest one waiting in the queue.
+            self.shared.received_at = getattr(self.work_queue, "taken_since", None)
+
+            # Drain whatever the producer has queued so that a whole cycle
+            # is applied under a single lock acquisition.
+            drain = getattr(self.work_queue, "drain", None)
+            if drain is not None:
+                batch.extend(drain(self.max_batch - 1))
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.work_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self.process(batch)
+            if stopping:
+                break
+
+    def process(self, batch):
+        """Apply one batch, record its metrics and log the new portfolio value"""
+        take_volumes = getattr(self.work_queue, "take_volumes", None)
+        value = self.apply_batch(batch, take_volumes() if take_volumes is not None else None)
+        self.batch_size.observe(len(batch))
+        self.ticks_applied.inc(len(batch))
+
+        if len(batch) == 1:
+            symbol, price = batch[0]
+            self.log_queue.put(LogRecord(
+                "INFO", "portfolio",
+                "Portfolio update: {symbol}={price}, total value = {value}",
+                symbol=symbol, price=price, value=value
+            ))
+        else:
+            self.log_queue.put(LogRecord(
+                "INFO", "portfolio",
+                "Portfolio update: {count} prices, total value = {value}",
+                count=len(batch), value=value
+            ))
+        for _ in batch:
             self.work_queue.task_done()
 
+    def apply_batch(self, batch, volumes=None):
+        """Apply (symbol, price) updates and return the new portfolio value.
+
+        volumes maps symbols to the volume traded with their updates, for
+        the indicators.
+        """
+        # Only the consumer updates the indicators, so that runs before
+        # taking the lock; the resulting table is immutable.
+        indicators = self.shared.indicators
+        indicator_table = None
+        if indicators is True:
+            # Created with the first batch, so starting the engine does
+            # not import NumPy.
+            from src.indicators import Indicators
+            indicators = self.shared.indicators = Indicators()
+        if indicators is not None and batch:
+            indicator_table = indicators.table(indicators.update_batch(batch, volumes=volumes))
+        started = time.perf_counter()
+        with self.shared.lock:
+            acquired = time.perf_counter()
+            try:
+                if self.shared.store is not None:
+                    return self.apply_columnar(batch, indicator_table)
+                return self.apply_prices(batch, indicator_table)
+            finally:
+                self.lock_hold.observe(time.perf_counter() - acquired)
+                self.lock_wait.observe(acquired - started)
+
+    def apply_prices(self, batch, indicator_table=None):
+        """Dict-based variant of apply_batch. Caller must hold the lock."""
+        prices = self.shared.prices
+        price_times = self.shared.price_times
+        portfolio = self.shared.portfolio
+        position_values = self.shared.position_values
+        total = self.shared.portfolio_total
+        now = time.time()
+
+        for symbol, price in batch:
+            prices[symbol] = price
+            price_times[symbol] = now
+            shares = portfolio.get(symbol)
+            if shares:
+                new_value = price * shares
+                total += new_value - position_values.get(symbol, 0.0)
+                position_values[symbol] = new_value
+        self.shared.mark_changed(symbol for symbol, _ in batch)
+        if self.shared.stale:
+            self.shared.stale.difference_update(symbol for symbol, _ in batch)
+
+        self.ticks_since_reconcile += len(batch)
+        if self.ticks_since_reconcile >= self.reconcile_every:
+            # Periodic full pass keeps accumulated float drift bounded.
+            self.shared.revalue_all()
+            self.ticks_since_reconcile = 0
+        else:
+            self.shared.portfolio_total = total
+            self.shared.portfolio_value = round(total, 2)
+        self.shared.apply_books(batch)
+        self.shared.apply_indicators(indicator_table)
+        self.shared.publish()
+        return self.shared.portfolio_value
+
+    def apply_columnar(self, batch, indicator_table=None):
+        """Columnar variant of apply_batch. Caller must hold the lock."""
+        self.shared.store.update(batch)
+        # A single dot product over the arrays is exact enough that the
+        # store needs no incremental bookkeeping or reconciliation.
+        self.shared.revalue_all()
+        self.shared.apply_books(batch)
+        self.shared.apply_indicators(indicator_table)
+        self.shared.mark_changed(symbol for symbol, _ in batch)
+        if self.shared.stale:
+            self.shared.stale.difference_update(symbol for symbol, _ in batch)
+        self.shared.publish()
+        return self.shared.portfolio_value
+
 
 class AlertConsumer(threading.Thread):
-    def __init__(self, shared_state, log_queue, stop_event):
+    def __init__(self, shared_state, log_queue, stop_event, hysteresis=0.005, metrics=None,
+                 rules=None):
         super().__init__(daemon=True)
         self.shared = shared_state
         self.log_queue = log_queue
         self.stop_event = stop_event
+        self.hysteresis = hysteresis
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.lock_wait = self.metrics.histogram(
+            "stock_monitor_lock_wait_seconds", "Time spent waiting for SharedState.lock",
+            stage="alerts")
+        self.lock_hold = self.metrics.histogram(
+            "stock_monitor_lock_hold_seconds", "Time SharedState.lock is held",
+            stage="alerts")
+        self.alerts_fired = self.metrics.counter(
+            "stock_monitor_alerts_total", "Alerts raised")
+        self.wait_timeout = wake_on_stop(stop_event, self.shared.wake)
+        self.index = AlertIndex(hysteresis)
+        with self.shared.lock:
+            if self.shared.books is not None:
+                # Every book keeps its own limits, a shared limit is indexed once.
+                limits = self.shared.books.alert_limits()
+            else:
+                limits = self.shared.alerts.items()
+            for symbol, limit in limits:
+                self.index.add(symbol, limit)
+
+        # Optional RuleEngine (or list of rules to compile) for rules
+        # beyond "price above limit".
+        self.rules = None
+        if rules:
+            from src.alert_rules import RuleEngine
+            self.rules = rules if isinstance(rules, RuleEngine) else RuleEngine(rules, hysteresis)
 
     def run(self):
+        crossings, rule_hits = self.check_initial()
         while not self.stop_event.is_set():
-            with self.shared.lock:
-                for symbol, limit in self.shared.alerts.items():
-                    if symbol in self.shared.prices:
-                        price = self.shared.prices[symbol]
-                        if price > limit:
-                            self.log_queue.put(
-                                f"ALERT: {symbol} exceeded limit {limit}! Current price ={price}"
-                            )
-            time.sleep(1)
\ No newline at end of file
+            self.emit(crossings, rule_hits)
+            with self.shared.price_updated:
+                while not self.shared.changed_symbols and not self.stop_event.is_set():
+                    self.shared.price_updated.wait(timeout=self.wait_timeout)
+            crossings, rule_hits = self.check_changed()
+
+    def check_initial(self):
+        """Return (crossings, rule_hits) for the prices known before start"""
+        with self.shared.lock:
+            # Stale prices restored from a checkpoint only seed the alert
+            # state, so they do not raise alerts on their own.
+            crossings = [
+                crossing for crossing in self.check(self.shared.prices)
+                if crossing[0] not in self.shared.stale
+            ]
+            fresh = [symbol for symbol in self.shared.prices if symbol not in self.shared.stale]
+            return crossings, self.check_rules(fresh)
+
+    def check_changed(self):
+        """Return (crossings, rule_hits) for the symbols changed since the last check"""
+        started = time.perf_counter()
+        with self.shared.lock:
+            acquired = time.perf_counter()
+            try:
+                crossings = self.check(self.shared.changed_symbols)
+                rule_hits = self.check_rules(self.shared.changed_symbols)
+                self.shared.changed_symbols.clear()
+                return crossings, rule_hits
+            finally:
+                self.lock_hold.observe(time.perf_counter() - acquired)
+                self.lock_wait.observe(acquired - started)
+
+    def emit(self, crossings, rule_hits):
+        for symbol, limit, price in crossings:
+            self.emit_alert(symbol, limit, price)
+        for rule, value in rule_hits:
+            self.emit_rule(rule, value)
+
+    def check_rules(self, symbols):
+        """Return (rule, value) of every rule that just fired. Caller must hold the lock."""
+        if self.rules is None:
+            return []
+        prices = self.shared.prices
+        ids = self.rules.ids
+        items = [(symbol, prices[symbol]) for symbol in symbols
+                 if symbol in ids and symbol in prices]
+        snapshot = self.shared.snapshot
+        values = dict(snapshot.book_values)
+        values[None] = self.shared.portfolio_value
+        return self.rules.evaluate(items, values, snapshot.indicators)
+
+    def check(self, symbols):
+        """Return (symbol, limit, price) of every limit just crossed. Caller must hold the lock."""
+        store = self.shared.store
+        # The store holds one limit per symbol, books may set several.
+        if store is not None and self.shared.books is None:
+            return [
+                (store.symbols[i], float(store.alert_limits[i]), float(store.prices[i]))
+                for i in store.check_alerts(self.hysteresis).tolist()
+            ]
+
+        prices = self.shared.prices
+        crossings = []
+        for symbol in symbols:
+            if symbol in self.index and symbol in prices:
+                price = prices[symbol]
+                for limit in self.index.update(symbol, price):
+                    crossings.append((symbol, limit, price))
+        return crossings
+
+    def emit_rule(self, rule, value):
+        self.alerts_fired.inc()
+        self.log_queue.put(LogRecord(
+            "ALERT", "alert", "ALERT: {rule} triggered (value {value:g})",
+            symbol=rule.symbol, rule=rule, value=value
+        ))
+
+    def emit_alert(self, symbol, limit, price):
+        self.alerts_fired.inc()
+        books = self.shared.books
+        if books is not None:
+            self.log_queue.put(LogRecord(
+                "ALERT", "alert",
+                "ALERT: {symbol} exceeded limit {limit}! Current price ={price} ({books})",
+                symbol=symbol, limit=limit, price=price,
+                books=", ".join(books.owners(symbol, limit))
+            ))
+            return
+        self.log_queue.put(LogRecord(
+            "ALERT", "alert", "ALERT: {symbol} exceeded limit {limit}! Current price ={price}",
+            symbol=symbol, limit=limit, price=price
+        ))
@@ -0,0 +1,59 @@
+import unittest
+from queue import Queue, Empty
+from src.alerts import AlertIndex
+from src.shared_state import SharedState
+from src.workers import AlertConsumer
+import threading
+import time
+
+class TestAlertIndex(unittest.TestCase):
+    def test_alert_fires_once_per_crossing(self):
+        index = AlertIndex(hysteresis=0.01)
+        index.add("AAPL", 100)
+
+        self.assertEqual(index.update("AAPL", 99), [])
+        self.assertEqual(index.update("AAPL", 101), [100])
+        self.assertEqual(index.update("AAPL", 105), [])
+        self.assertEqual(index.update("AAPL", 101), [])
+
+    def test_hysteresis_rearms_below_band(self):
+        index = AlertIndex(hysteresis=0.01)
+        index.add("AAPL", 100)
+        index.update("AAPL", 101)
+
+        self.assertEqual(index.update("AAPL", 99.5), [])
+        self.assertEqual(index.update("AAPL", 101), [])
+        self.assertEqual(index.update("AAPL", 98), [])
+        self.assertEqual(index.update("AAPL", 101), [100])
+
+    def test_multiple_thresholds_cross_in_order(self):
+        index = AlertIndex(hysteresis=0.0)
+        for limit in (120, 100, 110):
+            index.add("AAPL", limit)
+
+        self.assertEqual(index.update("AAPL", 115), [100, 110])
+        self.assertEqual(index.update("AAPL", 125), [120])
+        self.assertEqual(index.update("AAPL", 105), [])
+        self.assertEqual(index.update("AAPL", 125), [110, 120])
+
+    def test_consumer_wakes_on_price_change(self):
+        shared = SharedState(portfolio={}, alerts={"AAPL": 150}, symbols=["AAPL"])
+        log_q = Queue()
+        stop_event = threading.Event()
+
+        worker = AlertConsumer(shared, log_q, stop_event)
+        worker.start()
+
+        with shared.lock:
+            shared.prices["AAPL"] = 160
+            shared.mark_changed(["AAPL"])
+        msg = log_q.get(timeout=0.2)
+
+        with shared.lock:
+            shared.prices["AAPL"] = 161
+            shared.mark_changed(["AAPL"])
+        time.sleep(0.1)
+        stop_event.set()
+
+        self.assertIn("ALERT: AAPL exceeded limit 150", msg)
+        self.assertRaises(Empty, log_q.get_nowait)
@@ -0,0 +1,159 @@
+import unittest
+import datetime
+import random
+import time
+from queue import Queue
+from unittest import mock
+from zoneinfo import ZoneInfo
+from src.alert_rules import (
+    CrossRule, DrawdownRule, MoveRule, PriceRule, RuleEngine, parse_rule
+)
+from src.price_sources import PriceSource
+from src.trade_engine import TradeEngine
+from src.workers import AlertConsumer
+
+
+class NoPrices(PriceSource):
+    def fetch(self, symbols):
+        return {}
+
+
+def new_york(*args):
+    return datetime.datetime(*args, tzinfo=ZoneInfo("America/New_York")).timestamp()
+
+
+def fired_rules(engine, items=(), values=None):
+    return [str(rule) for rule, _ in engine.evaluate(items, values)]
+
+
+class TestRuleParsing(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_rule("aapl > 200"), PriceRule("AAPL", ">", 200))
+        self.assertEqual(parse_rule("BRK-B < 150.5"), PriceRule("BRK-B", "<", 150.5))
+        self.assertEqual(parse_rule("TSLA down 3%"), MoveRule("TSLA", -3))
+        self.assertEqual(parse_rule("MSFT  ma(5) crosses above ma(20)"),
+                         CrossRule("MSFT", 5, 20, "above"))
+        self.assertEqual(parse_rule("drawdown 10% in alice"), DrawdownRule(10, "alice"))
+
+    def test_text_round_trip(self):
+        for text in ("AAPL > 200", "SAP.DE < 99.5", "TSLA up 5%", "TSLA down 2.5%",
+                     "MSFT ma(5) crosses below ma(20)", "drawdown 10%"):
+            self.assertEqual(str(parse_rule(text)), text)
+
+    def test_invalid_rules(self):
+        for text in ("AAPL >", "AAPL = 5", "TSLA up 0%", "X ma(20) crosses above ma(5)",
+                     "drawdown 150%"):
+            with self.assertRaises(ValueError):
+                parse_rule(text)
+
+
+class TestRuleEngine(unittest.TestCase):
+    def test_price_rules_are_edge_triggered(self):
+        engine = RuleEngine(["AAPL > 200", "AAPL < 150"])
+
+        self.assertEqual(fired_rules(engine, [("AAPL", 201.0)]), ["AAPL > 200"])
+        self.assertEqual(fired_rules(engine, [("AAPL", 205.0)]), [])
+        # Still within the hysteresis band, so not re-armed yet.
+        self.assertEqual(fired_rules(engine, [("AAPL", 199.5)]), [])
+        self.assertEqual(fired_rules(engine, [("AAPL", 201.0)]), [])
+        self.assertEqual(fired_rules(engine, [("AAPL", 149.0)]), ["AAPL < 150"])
+        self.assertEqual(fired_rules(engine, [("AAPL", 201.0)]), ["AAPL > 200"])
+
+    def test_move_from_open(self):
+        engine = RuleEngine(["TSLA up 5%", "TSLA down 3%"])
+
+        self.assertEqual(fired_rules(engine, [("TSLA", 100.0)]), [])
+        self.assertEqual(fired_rules(engine, [("TSLA", 103.0)]), [])
+        self.assertEqual(engine.evaluate([("TSLA", 105.0)]), [(MoveRule("TSLA", 5), 5.0)])
+        self.assertEqual(fired_rules(engine, [("TSLA", 96.9)]), ["TSLA down 3%"])
+
+        engine.reset_session()
+        self.assertEqual(fired_rules(engine, [("TSLA", 96.9)]), [])
+
+    def test_moving_average_cross(self):
+        engine = RuleEngine(["MSFT ma(2) crosses above ma(4)", "MSFT ma(2) crosses below ma(4)"])
+
+        # Rising during warm-up: the fast average starts above the slow one,
+        # which is no cross.
+        for price in (100.0, 101.0, 102.0, 103.0):
+            self.assertEqual(fired_rules(engine, [("MSFT", price)]), [])
+        fired = []
+        for price in (95.0, 94.0, 93.0, 110.0, 115.0):
+            fired += fired_rules(engine, [("MSFT", price)])
+
+        self.assertEqual(fired, ["MSFT ma(2) crosses below ma(4)", "MSFT ma(2) crosses above ma(4)"])
+
+    def test_drawdown(self):
+        engine = RuleEngine(["drawdown 10%", "drawdown 5% in bob"])
+
+        self.assertEqual(fired_rules(engine, values={None: 1000.0, "bob": 100.0}), [])
+        self.assertEqual(fired_rules(engine, values={None: 1100.0, "bob": 94.0}),
+                         ["drawdown 5% in bob"])
+        self.assertEqual(fired_rules(engine, values={None: 980.0, "bob": 94.0}),
+                         ["drawdown 10%"])
+
+    def test_fifty_thousand_rules(self):
+        symbols = [f"S{i:04d}" for i in range(5000)]
+        randomizer = random.Random(0)
+        rules = []
+        for symbol in symbols:
+            rules += [f"{symbol} > {randomizer.uniform(100, 120):.2f}",
+                      f"{symbol} < {randomizer.uniform(80, 100):.2f}",
+                      f"{symbol} up 5%", f"{symbol} down 5%",
+                      f"{symbol} ma(5) crosses above ma(20)",
+                      f"{symbol} ma(5) crosses below ma(20)"] + [
+                      f"{symbol} > {100 + k}" for k in range(4)]
+        engine = RuleEngine(rules)
+        self.assertEqual(len(engine), 50000)
+
+        batch = [(symbol, 100.0) for symbol in symbols]
+        engine.evaluate(batch)
+        timings = []
+        for step in range(10):
+            batch = [(symbol, 100.0 + randomizer.gauss(0, 5)) for symbol in symbols]
+            started = time.perf_counter()
+            engine.evaluate(batch)
+            timings.append(time.perf_counter() - started)
+
+        # A few milliseconds in practice; generous for slow machines.
+        self.assertLess(sorted(timings)[len(timings) // 2], 0.05)
+
+
+class TestRulesInEngine(unittest.TestCase):
+    def test_rule_symbols_are_fetched_and_alerted(self):
+        engine = TradeEngine({"AAPL": 1}, {}, ["AAPL"], price_source=NoPrices(),
+                             rules=["TSLA < 200", "drawdown 10%"])
+        self.assertEqual(engine.shared_state.symbols, ["AAPL", "TSLA"])
+
+        log_q = Queue()
+        consumer = AlertConsumer(engine.shared_state, log_q, engine.stop_event,
+                                 rules=engine.alert_consumer.rules)
+        engine.portfolio_consumer.apply_batch([("AAPL", 100.0), ("TSLA", 190.0)])
+        engine.portfolio_consumer.apply_batch([("AAPL", 80.0)])
+        with engine.shared_state.lock:
+            hits = consumer.check_rules(["AAPL", "TSLA"])
+        for rule, value in hits:
+            consumer.emit_rule(rule, value)
+
+        alerts = [str(log_q.get_nowait()) for _ in range(log_q.qsize())]
+        self.assertEqual(alerts, ["ALERT: TSLA < 200 triggered (value 190)"])
+
+    def test_move_rules_restart_at_the_session_open(self):
+        engine = TradeEngine({}, {}, ["TSLA"], price_source=NoPrices(),
+                             rules=["TSLA down 3%"])
+        consumer = engine.alert_consumer
+
+        def tick(price, wall):
+            with mock.patch("time.time", return_value=wall):
+                engine.portfolio_consumer.apply_batch([("TSLA", price)])
+                _, hits = consumer.check_changed()
+            return [str(rule) for rule, _ in hits]
+
+        self.assertEqual(tick(100.0, new_york(2024, 5, 13, 9, 35)), [])
+        self.assertEqual(tick(96.0, new_york(2024, 5, 13, 15, 0)), ["TSLA down 3%"])
+        # Tuesday's moves count from Tuesday's first price, not Monday's.
+        self.assertEqual(tick(95.0, new_york(2024, 5, 14, 9, 31)), [])
+        self.assertEqual(tick(92.0, new_york(2024, 5, 14, 12, 0)), ["TSLA down 3%"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import unittest
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.async_engine import AsyncTradeEngine
+from src.async_http import AsyncHttpClient, HttpError
+from src.price_sources import SyntheticPriceSource, YahooChartSource, chart_price
+
+
+class ChartHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        time.sleep(server.delay)
+        symbol = self.path.split("?")[0].rsplit("/", 1)[-1]
+        if self.path.startswith("/chunked"):
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for part in (b'{"chunked":', b" true}"):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        if symbol not in server.prices:
+            body = b'{"chart": {"result": null, "error": {"code": "Not Found"}}}'
+            self.send_response(404)
+        else:
+            body = json.dumps({"chart": {"result": [{
+                "meta": {"symbol": symbol, "regularMarketPrice": server.prices[symbol]},
+            }], "error": None}}).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionError:
+            # The client gave up on a delayed answer.
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class StubChartServer(ThreadingHTTPServer):
+    """Local stand-in for the Yahoo chart API"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, prices, delay=0.0):
+        super().__init__(("127.0.0.1", 0), ChartHandler)
+        self.prices = prices
+        self.delay = delay
+        self.requests = 0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class TestAsyncHttp(unittest.TestCase):
+    def setUp(self):
+        self.server = StubChartServer({"AAPL": 190.5})
+        self.addCleanup(self.server.stop)
+
+    def test_reuses_connections_and_reads_chunked_bodies(self):
+        async def requests():
+            client = AsyncHttpClient(self.server.url, max_connections=2)
+            try:
+                first = await client.get_json("/v8/finance/chart/AAPL")
+                second = await client.get_json("/chunked")
+                with self.assertRaises(HttpError) as raised:
+                    await client.get_json("/v8/finance/chart/NOPE")
+                return first, second, raised.exception.status, client.opened
+            finally:
+                await client.close()
+
+        first, second, status, opened = asyncio.run(requests())
+
+        self.assertEqual(chart_price(first), 190.5)
+        self.assertEqual(second, {"chunked": True})
+        self.assertEqual(status, 404)
+        self.assertEqual(opened, 1)
+
+
+class TestYahooChartSource(unittest.TestCase):
+    def test_requests_run_concurrently(self):
+        prices = {f"S{i:03d}": 100.0 + i for i in range(40)}
+        server = StubChartServer(prices, delay=0.1)
+        self.addCleanup(server.stop)
+        source = YahooChartSource(base_url=server.url, concurrency=40, adaptive=False)
+
+        started = time.monotonic()
+        result = source.fetch(list(prices) + ["MISSING"])
+
+        # 41 requests of 100 ms each, sequentially more than 4 s.
+        self.assertLess(time.monotonic() - started, 2.0)
+        self.assertEqual(dict(result), prices)
+        self.assertEqual(result.missing, ["MISSING"])
+        self.assertEqual(result.errors, {})
+
+    def test_fetch_raises_when_every_request_fails(self):
+        server = StubChartServer({"AAPL": 1.0}, delay=0.5)
+        self.addCleanup(server.stop)
+        source = YahooChartSource(base_url=server.url, timeout=0.1, adaptive=False)
+
+        with self.assertRaises(TimeoutError):
+            source.fetch(["AAPL"])
+
+    def test_chart_price_falls_back_to_last_close(self):
+        data = {"chart": {"result": [{
+            "meta": {},
+            "indicators": {"quote": [{"close": [10.0, 11.5, None]}]},
+        }]}}
+
+        self.assertEqual(chart_price(data), 11.5)
+        self.assertIsNone(chart_price({"chart": {"result": None}}))
+
+
+class TestAsyncTradeEngine(unittest.TestCase):
+    def wait_for(self, condition, timeout=3.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("condition not met in time")
+            time.sleep(0.02)
+
+    def test_engine_values_portfolio_from_stub_server(self):
+        server = StubChartServer({"AAPL": 200.0, "MSFT": 400.0})
+        self.addCleanup(server.stop)
+        source = YahooChartSource(base_url=server.url, poll_interval=0.05, adaptive=False)
+        engine = AsyncTradeEngine({"AAPL": 2, "MSFT": 1}, {"AAPL": 150.0},
+                                  ["AAPL", "MSFT"], price_source=source)
+        engine.start()
+        self.addCleanup(engine.stop)
+
+        records = []
+        self.wait_for(lambda: engine.shared_state.snapshot.portfolio_value == 800.0)
+        self.wait_for(lambda: records.extend(engine.log_queue.drain()) or any(
+            getattr(record, "kind", None) == "alert" for record in records
+        ))
+        self.assertEqual(dict(engine.shared_state.snapshot.prices),
+                         {"AAPL": 200.0, "MSFT": 400.0})
+
+        started = time.monotonic()
+        self.assertEqual(engine.stop(timeout=2), [])
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertFalse(any(thread.is_alive() for thread in engine.threads()))
+
+    def test_blocking_sources_run_on_a_worker_thread(self):
+        source = SyntheticPriceSource(symbols=["AAA", "BBB"], tick_rate=100)
+        engine = AsyncTradeEngine({"AAA": 1}, {}, source.symbols, price_source=source)
+        engine.start()
+        self.addCleanup(engine.stop)
+
+        self.wait_for(lambda: len(engine.shared_state.snapshot.prices) == 2)
+        self.assertEqual(engine.stop(timeout=2), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+from queue import Queue
+from src.books import BookSet
+from src.checkpoint import Checkpointer
+from src.price_sources import PriceSource
+from src.trade_engine import TradeEngine
+from src.workers import AlertConsumer
+
+BOOKS = {
+    "alice": {"portfolio": {"AAPL": 10, "TSLA": 2}, "alerts": {"TSLA": 250}},
+    "bob": {"portfolio": {"AAPL": 5}, "alerts": {"AAPL": 150, "TSLA": 250}},
+    "carol": {"portfolio": {"MSFT": 1}, "alerts": {"TSLA": 300}},
+}
+
+
+class RecordingSource(PriceSource):
+    poll_interval = 0.02
+
+    def __init__(self):
+        self.requested = []
+
+    def fetch(self, symbols):
+        self.requested.append(list(symbols))
+        return {}
+
+
+class TestBookSet(unittest.TestCase):
+    def test_shared_universe_and_index(self):
+        books = BookSet(BOOKS)
+
+        self.assertEqual(books.symbols, ["AAPL", "TSLA", "MSFT"])
+        self.assertEqual([book.name for book, _ in books.holders["AAPL"]], ["alice", "bob"])
+        self.assertEqual(books.portfolio(), {"AAPL": 15, "TSLA": 2, "MSFT": 1})
+        self.assertEqual(books.alerts(), {"TSLA": 250, "AAPL": 150})
+        self.assertEqual(books.owners("TSLA", 250), ("alice", "bob"))
+
+    def test_tick_updates_only_holders(self):
+        books = BookSet(BOOKS)
+        prices = {"AAPL": 100.0, "TSLA": 200.0, "MSFT": 50.0}
+
+        self.assertEqual(books.apply(list(prices.items()), prices), {"alice", "bob", "carol"})
+        prices["MSFT"] = 60.0
+        self.assertEqual(books.apply([("MSFT", 60.0)], prices), {"carol"})
+        self.assertEqual(books.apply([("NVDA", 1.0)], prices), set())
+
+        self.assertEqual(books.values(), {"alice": 1400.0, "bob": 500.0, "carol": 60.0})
+
+
+class TestMultiplePortfolios(unittest.TestCase):
+    def test_engine_fetches_each_symbol_once(self):
+        source = RecordingSource()
+        engine = TradeEngine.from_books(BOOKS, price_source=source)
+        engine.producer.start()
+        time.sleep(0.1)
+        engine.stop_event.set()
+
+        self.assertEqual(sorted(source.requested[0]), ["AAPL", "MSFT", "TSLA"])
+
+    def test_book_values_in_snapshot(self):
+        engine = TradeEngine.from_books(BOOKS, price_source=RecordingSource())
+        engine.portfolio_consumer.apply_batch([("AAPL", 100.0), ("TSLA", 200.0)])
+        first = engine.shared_state.snapshot
+
+        self.assertEqual(first.portfolio_value, 1900.0)
+        self.assertEqual(dict(first.book_values), {"alice": 1400.0, "bob": 500.0, "carol": 0.0})
+
+        # A tick nobody holds leaves the published book values untouched.
+        engine.portfolio_consumer.apply_batch([("NVDA", 1.0)])
+        self.assertIs(engine.shared_state.snapshot.book_values, first.book_values)
+
+    def test_alerts_name_their_books(self):
+        engine = TradeEngine.from_books(BOOKS, price_source=RecordingSource())
+        log_q = Queue()
+        consumer = AlertConsumer(engine.shared_state, log_q, engine.stop_event)
+        with engine.shared_state.lock:
+            engine.shared_state.prices["TSLA"] = 260.0
+            crossings = consumer.check(["TSLA"])
+        for crossing in crossings:
+            consumer.emit_alert(*crossing)
+
+        alerts = [str(log_q.get_nowait()) for _ in range(log_q.qsize())]
+        self.assertEqual(alerts, ["ALERT: TSLA exceeded limit 250! Current price =260.0 (alice, bob)"])
+
+    def test_books_survive_checkpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.json")
+            engine = TradeEngine.from_books(BOOKS, price_source=RecordingSource())
+            engine.portfolio_consumer.apply_batch([("AAPL", 100.0)])
+            Checkpointer(engine.shared_state, path, engine.log_queue, threading.Event()).save()
+
+            restored = TradeEngine.from_checkpoint(path, price_source=RecordingSource())
+
+        self.assertEqual(restored.shared_state.books.to_dict(), BookSet(BOOKS).to_dict())
+        self.assertEqual(dict(restored.shared_state.snapshot.book_values),
+                         {"alice": 1000.0, "bob": 500.0, "carol": 0.0})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from queue import Queue
+from src.columnar_store import ColumnarStore
+from src.shared_state import SharedState
+from src.workers import PortfolioConsumer, AlertConsumer
+import threading
+import time
+
+class TestColumnarStore(unittest.TestCase):
+    def test_symbols_get_dense_ids_and_arrays_grow(self):
+        store = ColumnarStore(["AAPL", "TSLA"], capacity=2)
+
+        self.assertEqual(store.id_for("TSLA"), 1)
+        self.assertEqual(store.id_for("MSFT"), 2)
+        self.assertGreaterEqual(len(store.prices), 3)
+        self.assertEqual(len(store), 3)
+
+    def test_portfolio_value_is_vectorized_dot_product(self):
+        store = ColumnarStore(["AAPL", "TSLA", "GOOG"], portfolio={"AAPL": 2, "TSLA": 1})
+
+        store.update([("AAPL", 100.0), ("TSLA", 300.0), ("GOOG", 50.0), ("AAPL", 110.0)])
+
+        self.assertEqual(store.portfolio_value(), 2*110 + 300)
+
+    def test_alert_check_is_edge_triggered(self):
+        store = ColumnarStore(alerts={"AAPL": 100.0, "TSLA": 50.0})
+
+        store.update([("AAPL", 101.0)])
+        self.assertEqual(store.check_alerts(0.01).tolist(), [0])
+        store.update([("AAPL", 102.0), ("TSLA", 40.0)])
+        self.assertEqual(store.check_alerts(0.01).tolist(), [])
+        store.update([("AAPL", 98.0)])
+        store.check_alerts(0.01)
+        store.update([("AAPL", 101.0)])
+        self.assertEqual(store.check_alerts(0.01).tolist(), [0])
+
+    def test_price_view_behaves_like_dict(self):
+        shared = SharedState(portfolio={"AAPL": 1}, alerts={}, symbols=["AAPL", "TSLA"],
+                             columnar=True)
+
+        self.assertNotIn("AAPL", shared.prices)
+        shared.prices["AAPL"] = 10.0
+
+        self.assertEqual(shared.prices["AAPL"], 10.0)
+        self.assertEqual(dict(shared.prices), {"AAPL": 10.0})
+        self.assertEqual(shared.prices.get("TSLA", 0.0), 0.0)
+
+    def test_consumers_use_store(self):
+        shared = SharedState(portfolio={"AAPL": 2, "TSLA": 1}, alerts={"TSLA": 250},
+                             symbols=["AAPL", "TSLA"], columnar=True)
+        work_q = Queue()
+        log_q = Queue()
+        stop_event = threading.Event()
+
+        PortfolioConsumer(shared, work_q, log_q, stop_event).start()
+        AlertConsumer(shared, log_q, stop_event).start()
+        work_q.put(("AAPL", 100))
+        work_q.put(("TSLA", 300))
+        time.sleep(0.3)
+        stop_event.set()
+
+        logs = [log_q.get() for _ in range(log_q.qsize())]
+        self.assertEqual(shared.portfolio_value, 2*100 + 300)
+        self.assertTrue(any("ALERT: TSLA exceeded limit 250" in msg for msg in logs))
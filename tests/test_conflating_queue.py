@@ -0,0 +1,80 @@
+import unittest
+import queue
+import threading
+import time
+from src.conflating_queue import ConflatingQueue
+from src.shared_state import SharedState
+from src.workers import PortfolioConsumer
+
+
+class TestConflatingQueue(unittest.TestCase):
+    def test_last_value_wins(self):
+        q = ConflatingQueue()
+        q.put(("AAPL", 100.0))
+        q.put(("TSLA", 200.0))
+        q.put(("AAPL", 101.0))
+        q.put(("AAPL", 102.0))
+
+        self.assertEqual(q.qsize(), 2)
+        self.assertEqual(q.conflated, 2)
+        # AAPL keeps its place in line but carries the latest price.
+        self.assertEqual(q.get_nowait(), ("AAPL", 102.0))
+        self.assertEqual(q.get_nowait(), ("TSLA", 200.0))
+        self.assertRaises(queue.Empty, q.get_nowait)
+
+    def test_volumes_of_conflated_updates_add_up(self):
+        q = ConflatingQueue()
+        q.put(("AAPL", 100.0), volume=300.0)
+        q.put(("TSLA", 200.0))
+        q.put(("AAPL", 101.0), volume=200.0)
+
+        self.assertEqual(q.get_nowait(), ("AAPL", 101.0))
+        q.put(("AAPL", 102.0), volume=50.0)
+
+        self.assertEqual(q.take_volumes(), {"AAPL": 500.0})
+        self.assertEqual(q.take_volumes(), {})
+        self.assertEqual(q.drain(), [("TSLA", 200.0), ("AAPL", 102.0)])
+        self.assertEqual(q.take_volumes(), {"AAPL": 50.0})
+
+    def test_bounded_drops_oldest(self):
+        q = ConflatingQueue(capacity=3)
+        for i in range(5):
+            q.put((f"S{i}", float(i)))
+
+        self.assertEqual(q.dropped, 2)
+        self.assertEqual(q.drain(), [("S2", 2.0), ("S3", 3.0), ("S4", 4.0)])
+        self.assertTrue(q.empty())
+
+    def test_overload_stays_bounded(self):
+        q = ConflatingQueue()
+        for i in range(100000):
+            q.put((f"S{i % 10}", float(i)))
+
+        self.assertEqual(q.qsize(), 10)
+        self.assertEqual(q.stats(), {"put": 100000, "conflated": 99990, "dropped": 0, "pending": 10})
+        self.assertEqual(dict(q.drain())["S9"], 99999.0)
+
+    def test_blocking_get_wakes_on_put(self):
+        q = ConflatingQueue()
+        threading.Timer(0.05, q.put, args=(("AAPL", 1.0),)).start()
+        self.assertEqual(q.get(timeout=2), ("AAPL", 1.0))
+        self.assertRaises(queue.Empty, q.get, timeout=0.01)
+
+    def test_slow_consumer_applies_latest_prices(self):
+        shared = SharedState(portfolio={"AAPL": 2}, alerts={}, symbols=["AAPL"])
+        q = ConflatingQueue()
+        for price in range(1, 1001):
+            q.put(("AAPL", float(price)))
+        stop_event = threading.Event()
+        PortfolioConsumer(shared, q, queue.Queue(), stop_event).start()
+
+        deadline = time.time() + 2
+        while shared.portfolio_value != 2000.0 and time.time() < deadline:
+            time.sleep(0.01)
+        stop_event.set()
+
+        self.assertEqual(shared.portfolio_value, 2000.0)
+        self.assertEqual(shared.version, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from src.service import LogWriter, build_engine, load_config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestHeadless(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write_config(self, data, name="config.json"):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return path
+
+    def test_service_imports_no_gui_or_yfinance(self):
+        code = (
+            "import sys, src.service\n"
+            "src.service.build_engine({'AAA': 1}, {}, {'synthetic': {}})\n"
+            "print(sorted(m for m in ('tkinter', 'yfinance', 'pandas', 'numpy')"
+            " if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
+    def test_load_service_config(self):
+        path = self.write_config({
+            "portfolio": {"aapl": 10}, "alerts": {"TSLA": 250}, "poll_interval": 5
+        })
+        portfolio, alerts, options = load_config(path)
+
+        self.assertEqual(portfolio, {"AAPL": 10})
+        self.assertEqual(alerts, {"TSLA": 250.0})
+        self.assertEqual(options, {"poll_interval": 5})
+
+    def test_load_portfolio_file(self):
+        path = os.path.join(self.directory.name, "positions.csv")
+        with open(path, "w") as f:
+            f.write("ticker,shares,alert\nAAPL,10,200\n")
+        portfolio, alerts, options = load_config(path)
+
+        self.assertEqual(portfolio, {"AAPL": 10})
+        self.assertEqual(alerts, {"AAPL": 200.0})
+        self.assertEqual(options, {})
+
+    def test_log_writer_writes_records_and_status(self):
+        engine = build_engine({"AAA": 2}, {}, {"synthetic": {"tick_rate": 1000}})
+        stream = io.StringIO()
+        writer = LogWriter(engine, stream, status_interval=0.05)
+
+        engine.start()
+        writer.start()
+        threading.Event().wait(0.3)
+        engine.stop_event.set()
+        writer.join(timeout=2)
+
+        output = stream.getvalue()
+        self.assertIn("INFO Starting all threads...", output)
+        self.assertIn("STATUS portfolio value $", output)
+        self.assertIn("[API] AAA =", output)
+
+if __name__ == "__main__":
+    unittest.main()
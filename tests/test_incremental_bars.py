@@ -0,0 +1,106 @@
+import unittest
+from unittest import mock
+import pandas as pd
+from src.price_sources import YahooPriceSource
+
+def minute_bars(symbols, start, closes):
+    index = pd.date_range(start, periods=len(closes), freq="1min", tz="UTC")
+    columns = pd.MultiIndex.from_product([["Close"], symbols])
+    rows = [[close] * len(symbols) for close in closes]
+    return pd.DataFrame(rows, index=index, columns=columns)
+
+
+class TestIncrementalBars(unittest.TestCase):
+    def setUp(self):
+        self.now = pd.Timestamp.now(tz="UTC").floor("min") - pd.Timedelta(minutes=10)
+
+    def test_first_fetch_downloads_full_day(self):
+        source = YahooPriceSource()
+        full_day = minute_bars(["AAPL", "TSLA"], self.now, [1.0, 2.0, 3.0])
+
+        with mock.patch("yfinance.download", return_value=full_day) as download:
+            prices = source.fetch(["AAPL", "TSLA"]).to_dict()
+
+        self.assertEqual(download.call_args.kwargs["period"], "1d")
+        self.assertEqual(prices, {"AAPL": 3.0, "TSLA": 3.0})
+        self.assertEqual(len(source.bars["AAPL"]), 3)
+
+    def test_next_fetch_requests_only_newer_bars(self):
+        source = YahooPriceSource()
+        full_day = minute_bars(["AAPL"], self.now, [1.0, 2.0, 3.0])
+        last_bar = self.now + pd.Timedelta(minutes=2)
+        update = minute_bars(["AAPL"], last_bar, [3.5, 4.0])
+
+        with mock.patch("yfinance.download", side_effect=[full_day, update]) as download:
+            source.fetch(["AAPL"])
+            prices = source.fetch(["AAPL"]).to_dict()
+
+        kwargs = download.call_args.kwargs
+        self.assertNotIn("period", kwargs)
+        self.assertEqual(kwargs["start"], int(last_bar.timestamp()))
+        self.assertEqual(prices, {"AAPL": 4.0})
+        self.assertEqual(list(source.bars["AAPL"].values()), [1.0, 2.0, 3.5, 4.0])
+
+    def test_unknown_symbol_gets_its_own_full_download(self):
+        source = YahooPriceSource()
+        source.bars["AAPL"] = {self.now.timestamp(): 1.0}
+
+        self.assertEqual(source.resume_groups(["AAPL", "MSFT"]),
+                         [(int(self.now.timestamp()), ["AAPL"]), (None, ["MSFT"])])
+
+    def test_lagging_symbol_does_not_drag_the_shard_back(self):
+        source = YahooPriceSource(max_lag=300)
+        illiquid = self.now - pd.Timedelta(hours=3)
+        source.bars["AAPL"] = {self.now.timestamp(): 1.0}
+        source.bars["TSLA"] = {(self.now - pd.Timedelta(minutes=1)).timestamp(): 1.0}
+        source.bars["TINY"] = {illiquid.timestamp(): 1.0}
+
+        self.assertEqual(source.resume_groups(["AAPL", "TINY", "TSLA"]), [
+            (int(self.now.timestamp()) - 60, ["AAPL", "TSLA"]),
+            (int(illiquid.timestamp()), ["TINY"]),
+        ])
+
+    def test_cache_is_bounded(self):
+        source = YahooPriceSource(max_bars=2)
+        full_day = minute_bars(["AAPL"], self.now, [1.0, 2.0, 3.0])
+
+        with mock.patch("yfinance.download", return_value=full_day):
+            source.fetch(["AAPL"])
+
+        self.assertEqual(list(source.bars["AAPL"].values()), [2.0, 3.0])
+
+    def test_symbol_without_new_bars_is_unchanged_not_republished(self):
+        source = YahooPriceSource()
+        full_day = minute_bars(["AAPL", "TSLA"], self.now, [1.0, 2.0])
+        last_bar = self.now + pd.Timedelta(minutes=1)
+        update = minute_bars(["AAPL"], last_bar, [2.5])
+
+        with mock.patch("yfinance.download", side_effect=[full_day, update]):
+            source.fetch(["AAPL", "TSLA"])
+            batch = source.fetch(["AAPL", "TSLA"])
+
+        self.assertEqual(batch.to_dict(), {"AAPL": 2.5})
+        self.assertEqual(batch.unchanged, ["TSLA"])
+        self.assertEqual(batch.missing, [])
+
+    def test_groups_are_fetched_separately_and_merged(self):
+        source = YahooPriceSource()
+        source.bars["AAPL"] = {self.now.timestamp(): 1.0}
+        full_day = minute_bars(["MSFT"], self.now - pd.Timedelta(minutes=5), [7.0, 8.0])
+        update = minute_bars(["AAPL"], self.now, [1.5])
+
+        with mock.patch("yfinance.download", side_effect=[update, full_day]) as download:
+            batch = source.fetch(["AAPL", "MSFT", "NOPE"])
+
+        self.assertEqual([call.kwargs["tickers"] for call in download.call_args_list],
+                         ["AAPL", "MSFT NOPE"])
+        self.assertEqual(batch.to_dict(), {"AAPL": 1.5, "MSFT": 8.0})
+        self.assertEqual(batch.missing, ["NOPE"])
+
+    def test_late_older_bar_does_not_become_latest(self):
+        source = YahooPriceSource()
+        latest = self.now + pd.Timedelta(minutes=5)
+        source.bars["AAPL"] = {latest.timestamp(): 5.0}
+        source.merge_bars(minute_bars(["AAPL"], self.now, [1.0])["Close"], ["AAPL"])
+
+        self.assertEqual(source.resume_groups(["AAPL"]), [(int(latest.timestamp()), ["AAPL"])])
@@ -0,0 +1,60 @@
+import unittest
+from queue import Queue
+from src.shared_state import SharedState
+from src.workers import PortfolioConsumer
+import threading
+import time
+
+class TestIncrementalValuation(unittest.TestCase):
+    def make_consumer(self, portfolio, reconcile_every=1000):
+        shared = SharedState(portfolio=portfolio, alerts={}, symbols=list(portfolio))
+        consumer = PortfolioConsumer(
+            shared, Queue(), Queue(), threading.Event(),
+            reconcile_every=reconcile_every
+        )
+        return shared, consumer
+
+    def test_delta_updates_match_full_revaluation(self):
+        shared, consumer = self.make_consumer({"AAPL": 3, "TSLA": 2, "MSFT": 1})
+
+        consumer.apply_batch([("AAPL", 100.0), ("TSLA", 50.0)])
+        consumer.apply_batch([("AAPL", 110.0), ("MSFT", 10.0), ("AAPL", 105.0)])
+
+        self.assertEqual(shared.portfolio_value, 3*105 + 2*50 + 10)
+        self.assertEqual(shared.position_values["AAPL"], 315.0)
+
+    def test_unheld_symbols_do_not_change_value(self):
+        shared, consumer = self.make_consumer({"AAPL": 1})
+
+        consumer.apply_batch([("AAPL", 10.0), ("GOOG", 999.0)])
+
+        self.assertEqual(shared.prices["GOOG"], 999.0)
+        self.assertEqual(shared.portfolio_value, 10.0)
+        self.assertNotIn("GOOG", shared.position_values)
+
+    def test_periodic_reconciliation_resets_drift(self):
+        shared, consumer = self.make_consumer({"AAPL": 1}, reconcile_every=2)
+
+        consumer.apply_batch([("AAPL", 0.1)])
+        shared.portfolio_total += 5.0
+        consumer.apply_batch([("AAPL", 0.2)])
+
+        self.assertEqual(shared.portfolio_total, 0.2)
+        self.assertEqual(consumer.ticks_since_reconcile, 0)
+
+    def test_queue_is_drained_in_one_batch(self):
+        shared = SharedState(portfolio={"AAPL": 1}, alerts={}, symbols=["AAPL"])
+        work_q = Queue()
+        log_q = Queue()
+        stop_event = threading.Event()
+
+        for price in range(1, 101):
+            work_q.put(("AAPL", float(price)))
+
+        consumer = PortfolioConsumer(shared, work_q, log_q, stop_event)
+        consumer.start()
+        time.sleep(0.3)
+        stop_event.set()
+
+        self.assertEqual(shared.portfolio_value, 100.0)
+        self.assertIn("100 prices", log_q.get(timeout=0.5))
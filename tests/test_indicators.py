@@ -0,0 +1,173 @@
+import unittest
+import math
+import random
+import statistics
+import time
+import numpy as np
+from queue import Queue
+from src.alert_rules import IndicatorRule, RuleEngine, parse_rule
+from src.indicators import Indicators, IndicatorValues
+from src.price_batch import TICK_DTYPE, PriceBatch
+from src.price_sources import PriceSource
+from src.trade_engine import TradeEngine
+from src.workers import AlertConsumer
+
+
+class NoPrices(PriceSource):
+    def fetch(self, symbols):
+        return {}
+
+
+class TestIndicators(unittest.TestCase):
+    def test_matches_exact_recomputation(self):
+        indicators = Indicators(window=10, ema_span=5, refresh_every=7)
+        randomizer = random.Random(1)
+        prices = []
+        volumes = []
+        ema = None
+        price = 100.0
+        for _ in range(100):
+            price *= math.exp(randomizer.gauss(0, 0.01))
+            volume = randomizer.randint(1, 500)
+            prices.append(price)
+            volumes.append(volume)
+            ema = price if ema is None else ema + (price - ema) / 3
+            values = indicators.update("AAPL", price, volume)
+
+            recent = list(zip(prices, volumes))[-10:]
+            vwap = sum(p * v for p, v in recent) / sum(v for _, v in recent)
+            returns = [math.log(b / a) for a, b in zip(prices, prices[1:])][-10:]
+            self.assertAlmostEqual(values.ema, ema, places=9)
+            self.assertAlmostEqual(values.vwap, vwap, places=9)
+            if len(returns) > 1:
+                self.assertAlmostEqual(values.volatility, statistics.stdev(returns) * 100,
+                                       places=9)
+            self.assertEqual(values.high, max(prices))
+            self.assertEqual(values.low, min(prices))
+
+    def test_repeated_symbols_in_batch(self):
+        ticks = [("AAPL", 100.0), ("MSFT", 50.0), ("AAPL", 101.0), ("AAPL", 99.0),
+                 ("MSFT", 51.0)]
+        batched = Indicators(window=3)
+        batched.update_batch(ticks)
+        sequential = Indicators(window=3)
+        for symbol, price in ticks:
+            sequential.update(symbol, price)
+
+        self.assertEqual(dict(batched.table()), dict(sequential.table()))
+        self.assertEqual(batched.get("AAPL").high, 101.0)
+
+    def test_table_recomputes_only_changed_chunks(self):
+        indicators = Indicators()
+        symbols = [f"S{i:04d}" for i in range(1000)]
+        indicators.update_batch([(symbol, 10.0) for symbol in symbols])
+        before = indicators.table()
+
+        after = indicators.table(indicators.update_batch([("S0007", 12.0)]))
+
+        self.assertEqual(before["S0007"].high, 10.0)
+        self.assertEqual(after["S0007"].high, 12.0)
+        self.assertEqual(after["S0999"], before["S0999"])
+        self.assertEqual(len(after), 1000)
+        self.assertEqual(sum(old is not new for old, new in zip(before.chunks, after.chunks)), 1)
+        self.assertEqual(after.take([7, 999])[3].tolist(), [12.0, 10.0])
+
+        # Symbols first seen after a table are missing from it.
+        indicators.update_batch([("NEW", 5.0)])
+        self.assertNotIn("NEW", after)
+        self.assertEqual(indicators.table()["NEW"].low, 5.0)
+
+    def test_day_range_restarts(self):
+        indicators = Indicators()
+        day = time.mktime((2024, 3, 4, 12, 0, 0, 0, 0, -1))
+        indicators.update("AAPL", 100.0, now=day)
+        indicators.update("AAPL", 110.0, now=day + 60)
+        values = indicators.update("AAPL", 105.0, now=day + 86400)
+
+        self.assertEqual((values.high, values.low), (105.0, 105.0))
+
+    def test_memory_is_bounded_by_window(self):
+        indicators = Indicators(window=5)
+        for i in range(1000):
+            indicators.update_batch([("AAPL", 100.0 + i % 7)])
+
+        self.assertEqual(indicators.pv.shape[1], 5)
+        self.assertEqual(indicators.returns.shape[1], 5)
+        self.assertEqual(indicators.n_returns[indicators.ids["AAPL"]], 5)
+
+    def test_first_tick(self):
+        values = Indicators().update("AAPL", 100.0)
+        self.assertEqual(values, IndicatorValues(100.0, 100.0, None, 100.0, 100.0))
+
+
+class TestIndicatorsInEngine(unittest.TestCase):
+    def test_snapshot_carries_indicators(self):
+        engine = TradeEngine({"AAPL": 1}, {}, ["AAPL"], price_source=NoPrices())
+        engine.portfolio_consumer.apply_batch([("AAPL", 100.0)])
+        engine.portfolio_consumer.apply_batch([("AAPL", 102.0)])
+        values = engine.shared_state.snapshot.indicators["AAPL"]
+
+        self.assertEqual(values.vwap, 101.0)
+        self.assertEqual((values.high, values.low), (102.0, 100.0))
+
+    def test_vwap_weights_published_volumes(self):
+        engine = TradeEngine({"AAPL": 1}, {}, ["AAPL"], price_source=NoPrices())
+        ticks = np.array([(0, 100.0, 0.0, 300.0)], dtype=TICK_DTYPE)
+        engine.producer.publish(PriceBatch(["AAPL"], ticks))
+        engine.portfolio_consumer.process(engine.price_queue.drain())
+        ticks = np.array([(0, 110.0, 60.0, 100.0)], dtype=TICK_DTYPE)
+        engine.producer.publish(PriceBatch(["AAPL"], ticks))
+        engine.portfolio_consumer.process(engine.price_queue.drain())
+
+        values = engine.shared_state.snapshot.indicators["AAPL"]
+
+        self.assertAlmostEqual(values.vwap, (100.0 * 300 + 110.0 * 100) / 400)
+
+    def test_indicators_can_be_disabled(self):
+        engine = TradeEngine({"AAPL": 1}, {}, ["AAPL"], price_source=NoPrices(),
+                             indicators=False)
+        engine.portfolio_consumer.apply_batch([("AAPL", 100.0)])
+
+        self.assertEqual(dict(engine.shared_state.snapshot.indicators), {})
+        self.assertIsNone(engine.shared_state.indicators)
+
+
+class TestIndicatorRules(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_rule("aapl > EMA"), IndicatorRule("AAPL", "ema", ">"))
+        self.assertEqual(parse_rule("AAPL volatility > 2%"),
+                         IndicatorRule("AAPL", "volatility", ">", 2))
+        for text in ("AAPL < vwap", "AAPL volatility > 1.5%"):
+            self.assertEqual(str(parse_rule(text)), text)
+        with self.assertRaises(ValueError):
+            parse_rule("AAPL > high")
+
+    def test_price_crosses_ema(self):
+        engine = RuleEngine(["AAPL > ema", "AAPL < ema"])
+        ema = IndicatorValues(100.0, 100.0, None, 100.0, 100.0)
+
+        def fired(price):
+            return [str(rule) for rule, _ in
+                    engine.evaluate([("AAPL", price)], indicators={"AAPL": ema})]
+
+        self.assertEqual(fired(101.0), ["AAPL > ema"])
+        self.assertEqual(fired(102.0), [])
+        self.assertEqual(fired(98.0), ["AAPL < ema"])
+
+    def test_volatility_alert_in_engine(self):
+        engine = TradeEngine({}, {}, [], price_source=NoPrices(),
+                             rules=["AAPL volatility > 2%"])
+        log_q = Queue()
+        consumer = AlertConsumer(engine.shared_state, log_q, engine.stop_event,
+                                 rules=engine.alert_consumer.rules)
+        hits = []
+        for price in (100.0, 100.1, 100.0, 110.0):
+            engine.portfolio_consumer.apply_batch([("AAPL", price)])
+            with engine.shared_state.lock:
+                hits += consumer.check_rules(["AAPL"])
+
+        self.assertEqual([str(rule) for rule, _ in hits], ["AAPL volatility > 2%"])
+        self.assertGreater(hits[0][1], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+from queue import Queue
+import numpy as np
+import pandas as pd
+from src.price_batch import PriceBatch, latest_closes
+from src.price_sources import NoDataError, YahooPriceSource
+from src.shared_state import SharedState
+from src.workers import PriceProducer
+import threading
+
+class TestLatestCloses(unittest.TestCase):
+    def setUp(self):
+        self.index = pd.date_range("2025-11-24 14:30", periods=3, freq="1min", tz="UTC")
+        self.closes = pd.DataFrame(
+            {
+                "AAPL": [1.0, 2.0, 3.0],
+                "TSLA": [4.0, 5.0, np.nan],
+                "MSFT": [np.nan, np.nan, np.nan],
+            },
+            index=self.index,
+        )
+
+    def test_last_valid_close_is_forward_filled(self):
+        ticks, missing_ids = latest_closes(self.closes, ["AAPL", "TSLA", "MSFT"])
+
+        self.assertEqual(ticks["symbol_id"].tolist(), [0, 1])
+        self.assertEqual(ticks["price"].tolist(), [3.0, 5.0])
+        self.assertEqual(ticks["bar_time"][1], self.index[1].timestamp())
+        self.assertEqual(missing_ids.tolist(), [2])
+
+    def test_ticks_carry_the_volume_of_their_bar(self):
+        volumes = self.closes * 100
+
+        ticks, _ = latest_closes(self.closes, ["AAPL", "TSLA", "MSFT"], volumes)
+        without, _ = latest_closes(self.closes, ["AAPL", "TSLA"])
+
+        self.assertEqual(ticks["volume"].tolist(), [300.0, 500.0])
+        self.assertTrue(np.isnan(without["volume"]).all())
+        self.assertEqual(PriceBatch(["AAPL", "TSLA"], ticks).volumes(),
+                         {"AAPL": 300.0, "TSLA": 500.0})
+
+    def test_revised_bar_only_counts_new_volume(self):
+        source = YahooPriceSource()
+        first = pd.concat({"Close": self.closes, "Volume": self.closes * 100}, axis=1)
+        revised = first.copy()
+        revised[("Close", "AAPL")] = [1.0, 2.0, 3.5]
+        revised[("Volume", "AAPL")] = [100.0, 200.0, 450.0]
+
+        with mock.patch("yfinance.download", side_effect=[first, revised]):
+            source.fetch(["AAPL"])
+            batch = source.fetch(["AAPL"])
+
+        self.assertEqual(batch.volumes(), {"AAPL": 150.0})
+
+    def test_symbols_absent_from_frame_are_missing(self):
+        ticks, missing_ids = latest_closes(self.closes, ["GOOG", "AAPL"])
+
+        self.assertEqual(ticks["symbol_id"].tolist(), [1])
+        self.assertEqual(missing_ids.tolist(), [0])
+
+    def test_producer_reports_missing_symbols_individually(self):
+        symbols = ["AAPL", "TSLA", "MSFT"]
+        data = pd.concat({"Close": self.closes}, axis=1)
+        shared = SharedState(portfolio={}, alerts={}, symbols=symbols)
+        work_q = Queue()
+        log_q = Queue()
+        source = YahooPriceSource()
+        prod = PriceProducer(shared, work_q, log_q, threading.Event(), source=source)
+
+        with mock.patch("yfinance.download", return_value=data):
+            batch = prod.fetch_shard(symbols)
+        prod.publish(batch)
+
+        self.assertIsInstance(batch, PriceBatch)
+        self.assertEqual(batch.to_dict(), {"AAPL": 3.0, "TSLA": 5.0})
+        self.assertEqual(work_q.qsize(), 2)
+        logs = [str(log_q.get()) for _ in range(log_q.qsize())]
+        self.assertIn("yfinance WARNING: no data for MSFT", logs)
+
+    def test_failed_download_raises_and_is_retried(self):
+        shared = SharedState(portfolio={}, alerts={}, symbols=["AAPL"])
+        source = YahooPriceSource()
+        prod = PriceProducer(shared, Queue(), Queue(), threading.Event(), source=source,
+                             retry_delay=0.001)
+
+        # yf.download returns an empty frame when the network is down.
+        with mock.patch("yfinance.download", return_value=pd.DataFrame()) as download:
+            with self.assertRaises(NoDataError):
+                prod.fetch_shard(["AAPL"])
+
+        self.assertEqual(download.call_count, prod.retries + 1)
+        self.assertEqual(prod.fetch_errors.value, prod.retries + 1)
@@ -0,0 +1,69 @@
+import unittest
+from queue import Empty
+from src.log_buffer import LogBuffer, LogRecord
+import threading
+import time
+
+class TestLogBuffer(unittest.TestCase):
+    def test_record_is_formatted_lazily(self):
+        record = LogRecord("ALERT", "alert", "ALERT: {symbol} exceeded limit {limit}!",
+                           symbol="AAPL", limit=150)
+
+        self.assertIsNone(record._text)
+        self.assertEqual(str(record), "ALERT: AAPL exceeded limit 150!")
+        self.assertIn("AAPL exceeded", record)
+        self.assertEqual(record.symbol, "AAPL")
+
+    def test_full_buffer_drops_oldest_and_counts(self):
+        buffer = LogBuffer(capacity=3)
+
+        for i in range(5):
+            buffer.put(LogRecord("INFO", "producer", "message {i}", i=i))
+
+        self.assertEqual([str(r) for r in buffer.drain()], ["message 2", "message 3", "message 4"])
+        self.assertEqual(buffer.dropped, 2)
+        self.assertEqual(buffer.dropped_by_kind, {"producer": 2})
+
+    def test_high_volume_kinds_are_sampled(self):
+        buffer = LogBuffer(sample_interval=60, sample_burst=2)
+
+        for i in range(10):
+            buffer.put(LogRecord("INFO", "api", "[API] {symbol} = {price}", symbol="AAPL", price=i))
+        buffer.put(LogRecord("ALERT", "alert", "ALERT: AAPL"))
+
+        self.assertEqual(buffer.qsize(), 3)
+        self.assertEqual(buffer.sampled, 8)
+
+    def test_suppressed_count_is_reported_on_next_record(self):
+        buffer = LogBuffer(sample_interval=0.05, sample_burst=1)
+
+        for i in range(4):
+            buffer.put(LogRecord("INFO", "portfolio", "update {i}", i=i))
+        time.sleep(0.06)
+        buffer.put(LogRecord("INFO", "portfolio", "update {i}", i=4))
+
+        self.assertEqual([str(r) for r in buffer.drain()], ["update 0", "update 4 (+3 similar)"])
+
+    def test_plain_strings_and_queue_interface(self):
+        buffer = LogBuffer()
+        buffer.put("Starting all threads...")
+
+        record = buffer.get(timeout=0.1)
+        self.assertEqual((record.level, record.kind, str(record)),
+                         ("INFO", "message", "Starting all threads..."))
+        self.assertTrue(buffer.empty())
+        self.assertRaises(Empty, buffer.get_nowait)
+
+    def test_blocking_get_wakes_on_put(self):
+        buffer = LogBuffer()
+        threading.Timer(0.05, buffer.put, args=("late",)).start()
+
+        self.assertEqual(str(buffer.get(timeout=1)), "late")
+
+    def test_drain_limits_batch_size(self):
+        buffer = LogBuffer()
+        for i in range(10):
+            buffer.put(f"line {i}")
+
+        self.assertEqual(len(buffer.drain(4)), 4)
+        self.assertEqual(buffer.qsize(), 6)
@@ -0,0 +1,80 @@
+import unittest
+import threading
+import time
+import urllib.error
+import urllib.request
+from src.metrics import Metrics, MetricsServer
+from src.price_sources import SyntheticPriceSource
+from src.trade_engine import TradeEngine
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_quantiles(self):
+        histogram = Metrics().histogram("latency_seconds", "Latency", buckets=(0.1, 0.2, 0.4))
+        for value in (0.05, 0.15, 0.15, 0.3, 1.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.175)
+        self.assertEqual(histogram.quantile(0.99), 0.4)
+        self.assertIsNone(Metrics().histogram("empty", "Empty").quantile(0.5))
+
+    def test_render_prometheus_text(self):
+        metrics = Metrics()
+        metrics.counter("ticks_total", "Ticks").inc(3)
+        metrics.gauge("queue_depth", "Depth", func=lambda: 7, queue="price")
+        histogram = metrics.histogram("fetch_seconds", "Fetch", buckets=(0.5, 1.0))
+        histogram.observe(0.25)
+        histogram.observe(2.0)
+
+        text = metrics.render()
+
+        self.assertIn("# TYPE ticks_total counter\nticks_total 3\n", text)
+        self.assertIn('queue_depth{queue="price"} 7\n', text)
+        self.assertIn('fetch_seconds_bucket{le="0.5"} 1\n', text)
+        self.assertIn('fetch_seconds_bucket{le="1.0"} 1\n', text)
+        self.assertIn('fetch_seconds_bucket{le="+Inf"} 2\n', text)
+        self.assertIn("fetch_seconds_sum 2.25\nfetch_seconds_count 2\n", text)
+
+    def test_same_name_and_labels_share_a_metric(self):
+        metrics = Metrics()
+        self.assertIs(metrics.counter("a_total", "A", kind="x"), metrics.counter("a_total", "A", kind="x"))
+        self.assertIsNot(metrics.counter("a_total", "A", kind="x"), metrics.counter("a_total", "A", kind="y"))
+        self.assertIsNone(metrics.get("b_total"))
+
+    def test_http_endpoint(self):
+        metrics = Metrics()
+        metrics.counter("ticks_total", "Ticks").inc()
+        stop_event = threading.Event()
+        server = MetricsServer(metrics, stop_event, port=0)
+        server.start()
+        self.addCleanup(stop_event.set)
+
+        url = f"http://127.0.0.1:{server.port}"
+        with urllib.request.urlopen(url + "/metrics", timeout=2) as response:
+            self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+            self.assertIn("ticks_total 1", response.read().decode())
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other", timeout=2)
+
+    def test_engine_pipeline_is_instrumented(self):
+        source = SyntheticPriceSource(n_symbols=50, tick_rate=5000)
+        engine = TradeEngine({symbol: 1 for symbol in source.symbols}, {}, source.symbols,
+                             price_source=source)
+        engine.start()
+        time.sleep(0.3)
+        engine.stop_event.set()
+
+        metrics = engine.metrics
+        self.assertGreater(metrics.get("stock_monitor_fetch_seconds").count, 0)
+        self.assertGreater(metrics.get("stock_monitor_ticks_applied_total").value, 0)
+        self.assertGreater(
+            metrics.get("stock_monitor_lock_hold_seconds", stage="portfolio").count, 0
+        )
+        for name in ("stock_monitor_lock_wait_seconds", "stock_monitor_lock_hold_seconds"):
+            self.assertGreater(metrics.get(name, stage="alerts").count, 0)
+        self.assertIsNotNone(engine.shared_state.snapshot.received_at)
+        self.assertIn('stock_monitor_queue_depth{queue="price"}', metrics.render())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import unittest
+import datetime
+import threading
+import time
+from queue import Queue
+from zoneinfo import ZoneInfo
+from src.poll_scheduler import MarketCalendar, PollScheduler
+from src.price_sources import PriceSource
+from src.shared_state import SharedState
+from src.workers import PriceProducer
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def new_york(*args):
+    return datetime.datetime(*args, tzinfo=NEW_YORK).timestamp()
+
+
+# Wednesday 2024-05-15 11:00 in New York, the US market is open.
+OPEN = new_york(2024, 5, 15, 11, 0)
+
+
+class AlwaysOpen(MarketCalendar):
+    def seconds_until_open(self, symbol, wall=None):
+        return 0.0
+
+
+class TestMarketCalendar(unittest.TestCase):
+    def setUp(self):
+        self.calendar = MarketCalendar()
+
+    def test_us_session(self):
+        self.assertTrue(self.calendar.is_open("AAPL", OPEN))
+        self.assertFalse(self.calendar.is_open("AAPL", new_york(2024, 5, 15, 17, 0)))
+
+    def test_closed_until_next_open(self):
+        # Friday after the close reopens on Monday 9:30.
+        friday = new_york(2024, 5, 17, 16, 30)
+        self.assertEqual(self.calendar.seconds_until_open("AAPL", friday),
+                         new_york(2024, 5, 20, 9, 30) - friday)
+
+    def test_holiday(self):
+        calendar = MarketCalendar(holidays={datetime.date(2024, 5, 27)})
+        self.assertEqual(calendar.seconds_until_open("AAPL", new_york(2024, 5, 27, 11, 0)),
+                         new_york(2024, 5, 28, 9, 30) - new_york(2024, 5, 27, 11, 0))
+
+    def test_exchange_suffix_and_round_the_clock_symbols(self):
+        # 11:00 in New York is 17:00 in Frankfurt, 00:00 in Tokyo.
+        self.assertTrue(self.calendar.is_open("SAP.DE", OPEN))
+        self.assertFalse(self.calendar.is_open("7203.T", OPEN))
+        self.assertTrue(self.calendar.is_open("BTC-USD", new_york(2024, 5, 18, 3, 0)))
+        self.assertTrue(self.calendar.is_open("^GSPC", new_york(2024, 5, 18, 3, 0)))
+
+
+class TestPollScheduler(unittest.TestCase):
+    def make(self, **kwargs):
+        kwargs.setdefault("calendar", AlwaysOpen())
+        kwargs.setdefault("coalesce", 0.0)
+        scheduler = PollScheduler(base_interval=2.0, min_interval=0.1, **kwargs)
+        scheduler.sync(["HELD", "ALERT", "WATCH"], portfolio={"HELD": 1}, alerts={"ALERT": 1})
+        return scheduler
+
+    def test_new_symbols_are_due_once(self):
+        scheduler = self.make()
+        self.assertEqual(sorted(scheduler.due(now=0.0)), ["ALERT", "HELD", "WATCH"])
+        self.assertEqual(scheduler.due(now=100.0), [])
+
+    def test_priority_sets_interval(self):
+        scheduler = self.make()
+        scheduler.due(now=0.0)
+        scheduler.record({"HELD": 1.0, "ALERT": 1.0, "WATCH": 1.0}, now=0.0, wall=OPEN)
+
+        self.assertEqual(scheduler.due(now=2.0), ["HELD"])
+        self.assertEqual(scheduler.due(now=4.0), ["ALERT"])
+        self.assertEqual(scheduler.due(now=8.0), ["WATCH"])
+
+    def test_volatile_symbols_are_polled_more_often(self):
+        scheduler = self.make()
+        scheduler.sync(["CALM", "WILD"], portfolio={"CALM": 1, "WILD": 1})
+        scheduler.due(now=0.0)
+        for step in range(1, 6):
+            now = step * 2.0
+            scheduler.record({"CALM": 100.0, "WILD": 100.0 * (1.01 if step % 2 else 1.0)},
+                             now=now, wall=OPEN)
+
+        calm = scheduler.schedules["CALM"].interval
+        wild = scheduler.schedules["WILD"].interval
+        self.assertEqual(calm, 8.0)
+        self.assertEqual(wild, 0.5)
+
+    def test_priority_follows_portfolio_edits(self):
+        scheduler = self.make()
+        portfolio, alerts = {"HELD": 1}, {"ALERT": 1}
+        scheduler.sync(["HELD", "ALERT", "WATCH"], portfolio, alerts)
+
+        # The config window edits the dicts in place; the symbols stay the same.
+        portfolio["WATCH"] = 5
+        del alerts["ALERT"]
+        scheduler.sync(["HELD", "ALERT", "WATCH"], portfolio, alerts)
+
+        self.assertEqual(scheduler.schedules["WATCH"].priority, PollScheduler.HELD)
+        self.assertEqual(scheduler.schedules["ALERT"].priority, PollScheduler.WATCH)
+
+    def test_failures_back_off_exponentially(self):
+        scheduler = self.make(max_backoff=10.0)
+        scheduler.due(now=0.0)
+        delays = []
+        now = 0.0
+        for _ in range(4):
+            scheduler.record({}, failed=["HELD"], now=now, wall=OPEN)
+            delays.append(scheduler.schedules["HELD"].due - now)
+            now = scheduler.schedules["HELD"].due
+            self.assertEqual(scheduler.due(now=now), ["HELD"])
+
+        self.assertEqual(delays, [4.0, 8.0, 10.0, 10.0])
+        scheduler.record({"HELD": 1.0}, now=now, wall=OPEN)
+        self.assertEqual(scheduler.schedules["HELD"].failures, 0)
+
+    def test_unchanged_symbols_are_not_failures(self):
+        scheduler = self.make(max_backoff=10.0)
+        scheduler.due(now=0.0)
+        scheduler.record({}, failed=["HELD"], now=0.0, wall=OPEN)
+        scheduler.due(now=4.0)
+        scheduler.record({}, now=4.0, wall=OPEN, unchanged=["HELD"])
+
+        schedule = scheduler.schedules["HELD"]
+        self.assertEqual(schedule.failures, 0)
+        self.assertEqual(schedule.due - 4.0, schedule.interval)
+
+    def test_closed_market_waits_for_open(self):
+        scheduler = PollScheduler(coalesce=0.0)
+        scheduler.sync(["AAPL"], portfolio={"AAPL": 1})
+        friday = new_york(2024, 5, 17, 16, 30)
+
+        # The initial poll happens regardless, then AAPL sleeps until Monday.
+        self.assertEqual(scheduler.due(now=0.0), ["AAPL"])
+        scheduler.record({"AAPL": 190.0}, now=0.0, wall=friday)
+
+        self.assertEqual(scheduler.next_due(), new_york(2024, 5, 20, 9, 30) - friday)
+
+    def test_removed_symbols_are_dropped(self):
+        scheduler = self.make()
+        scheduler.sync(["HELD"], portfolio={"HELD": 1})
+        self.assertEqual(scheduler.due(now=0.0), ["HELD"])
+
+
+class CountingSource(PriceSource):
+    poll_interval = 0.01
+
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self, symbols):
+        self.calls.append(tuple(symbols))
+        return {symbol: 1.0 for symbol in symbols if symbol != "BAD"}
+
+
+class TestScheduledProducer(unittest.TestCase):
+    def test_producer_polls_by_schedule(self):
+        shared = SharedState(portfolio={"HELD": 1}, alerts={}, symbols=["HELD", "WATCH", "BAD"])
+        source = CountingSource()
+        scheduler = PollScheduler(base_interval=0.05, min_interval=0.05, max_interval=0.05,
+                                  coalesce=0.0, calendar=AlwaysOpen())
+        stop_event = threading.Event()
+        prod = PriceProducer(shared, Queue(), Queue(), stop_event, source=source,
+                             scheduler=scheduler)
+        prod.start()
+        time.sleep(0.5)
+        stop_event.set()
+        prod.join(timeout=2)
+
+        polled = [symbol for call in source.calls for symbol in call]
+        self.assertGreater(polled.count("HELD"), polled.count("BAD"))
+        self.assertGreater(scheduler.schedules["BAD"].failures, 0)
+        # A fixed cadence would have fetched about 50 times.
+        self.assertLess(len(source.calls), 25)
+
+    def test_unchanged_symbols_are_not_failed_polls(self):
+        import numpy as np
+        from src.price_batch import TICK_DTYPE, PriceBatch
+        shared = SharedState(portfolio={}, alerts={}, symbols=["LIVE", "QUIET", "GONE"])
+        scheduler = PollScheduler(coalesce=0.0, calendar=AlwaysOpen())
+        prod = PriceProducer(shared, Queue(), Queue(), threading.Event(),
+                             source=PriceSource(), scheduler=scheduler)
+        scheduler.sync(shared.symbols)
+        requested = scheduler.due()
+        ticks = np.array([(0, 10.0, 0.0, np.nan)], dtype=TICK_DTYPE)
+
+        prod.publish(PriceBatch(shared.symbols, ticks, [2], [1]), requested)
+
+        self.assertEqual(scheduler.schedules["QUIET"].failures, 0)
+        self.assertEqual(scheduler.schedules["GONE"].failures, 1)
+        warnings = [str(prod.log_queue.get_nowait()) for _ in range(prod.log_queue.qsize())]
+        self.assertFalse(any("QUIET" in text for text in warnings))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import json
+import os
+import tempfile
+from src.portfolio_io import load_portfolio
+
+class FakeValidator:
+    def __init__(self, known):
+        self.known = set(known)
+        self.calls = []
+
+    def validate_many(self, tickers):
+        self.calls.append(list(tickers))
+        return {ticker: ticker in self.known for ticker in tickers}
+
+
+class TestPortfolioImport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_csv_rows_with_per_row_errors(self):
+        path = self.write("book.csv", "\n".join([
+            "Ticker,Shares,Alert",
+            "aapl,10,200",
+            "TSLA,5,",
+            "MSFT,abc,",
+            "NOPE,1,",
+            "AAPL,3,",
+            "GOOG,,150",
+        ]))
+
+        result = load_portfolio(path, validator=FakeValidator({"AAPL", "TSLA", "GOOG"}))
+
+        self.assertEqual(result.portfolio, {"AAPL": 10, "TSLA": 5})
+        self.assertEqual(result.alerts, {"AAPL": 200.0, "GOOG": 150.0})
+        self.assertEqual(sorted(result.symbols), ["AAPL", "GOOG", "TSLA"])
+        self.assertEqual(result.errors, [
+            (4, "MSFT", "number of shares must be an integer"),
+            (5, "NOPE", "ticker does not exist"),
+            (6, "AAPL", "duplicate of row 2"),
+        ])
+
+    def test_json_positions_are_validated_in_batches(self):
+        positions = [{"ticker": f"T{i}", "shares": 1} for i in range(1000)]
+        path = self.write("book.json", json.dumps({"positions": positions}))
+        validator = FakeValidator({f"T{i}" for i in range(1000)})
+
+        result = load_portfolio(path, validator=validator, batch_size=250)
+
+        self.assertEqual(len(result.portfolio), 1000)
+        self.assertEqual([len(batch) for batch in validator.calls], [250] * 4)
+        self.assertEqual(result.errors, [])
+
+    def test_validation_failure_is_reported_per_row(self):
+        class BrokenValidator:
+            def validate_many(self, tickers):
+                raise ConnectionError("offline")
+
+        path = self.write("book.json", json.dumps([{"ticker": "AAPL", "shares": 1}]))
+
+        result = load_portfolio(path, validator=BrokenValidator())
+
+        self.assertEqual(result.portfolio, {})
+        self.assertEqual(result.errors, [(1, "AAPL", "could not validate: offline")])
+
+    def test_symbols_keep_file_order(self):
+        path = self.write("book.csv", "ticker,shares,alert\nMSFT,1,\nAAPL,,150\nTSLA,2,300\n")
+
+        result = load_portfolio(path)
+
+        self.assertEqual(result.symbols, ["MSFT", "TSLA", "AAPL"])
+
+    def test_json_that_is_not_a_list_is_an_import_error(self):
+        for content in ("42", '"AAPL"', '{"positions": {"ticker": "AAPL"}}'):
+            path = self.write("book.json", content)
+
+            result = load_portfolio(path)
+
+            self.assertEqual(result.portfolio, {})
+            self.assertEqual(result.errors,
+                             [(1, None, "JSON file must hold a list of positions")])
+
+    def test_unchecked_tickers_are_reported(self):
+        class PartialValidator:
+            def validate_many(self, tickers):
+                return {"AAPL": True, "BAD": None}
+
+        path = self.write("book.json", json.dumps(
+            [{"ticker": "AAPL", "shares": 1}, {"ticker": "BAD", "shares": 2}]
+        ))
+
+        result = load_portfolio(path, validator=PartialValidator())
+
+        self.assertEqual(result.portfolio, {"AAPL": 1})
+        self.assertEqual(result.errors, [(2, "BAD", "could not validate")])
+
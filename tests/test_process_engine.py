@@ -0,0 +1,119 @@
+import unittest
+import pickle
+import threading
+import time
+import numpy as np
+from src.log_buffer import LogRecord
+from src.price_sources import SyntheticPriceSource
+from src.process_engine import ArrayPrices, ProcessTradeEngine, StateBlock
+
+
+class TestStateBlock(unittest.TestCase):
+    def setUp(self):
+        self.block = StateBlock(3, n_books=1)
+        self.addCleanup(self.block.close, unlink=True)
+
+    def test_reader_attached_by_name_sees_writes(self):
+        reader = StateBlock(3, n_books=1, name=self.block.name)
+        self.addCleanup(reader.close)
+        self.block.write(prices=[1.0, np.nan, 3.0], book_values=[42.0])
+
+        sequence, data = reader.read()
+
+        self.assertEqual(sequence, 2)
+        np.testing.assert_array_equal(reader.field(data, "prices"), [1.0, np.nan, 3.0])
+        self.assertEqual(reader.field(data, "book_values").tolist(), [42.0])
+        self.assertEqual(reader.field(data, "indicators").shape, (5, 3))
+
+    def test_read_retries_while_a_write_is_in_progress(self):
+        self.block.sequence[0] += 1
+        self.block.field(self.block.data, "prices")[:] = 7.0
+
+        def finish():
+            time.sleep(0.01)
+            self.block.sequence[0] += 1
+
+        threading.Thread(target=finish).start()
+        state = None
+        while state is None:
+            state = self.block.read()
+        sequence, data = state
+
+        self.assertEqual(sequence, 2)
+        self.assertEqual(self.block.field(data, "prices").tolist(), [7.0, 7.0, 7.0])
+
+    def test_read_never_waits_for_an_unfinished_write(self):
+        self.block.sequence[0] += 1
+
+        started = time.monotonic()
+        self.assertIsNone(self.block.read())
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_array_prices_skips_missing(self):
+        prices = ArrayPrices({"A": 0, "B": 1}, ["A", "B"], np.array([np.nan, 2.5]))
+
+        self.assertEqual(dict(prices), {"B": 2.5})
+        self.assertEqual(prices.get("A", 0.0), 0.0)
+        self.assertEqual(len(prices), 1)
+
+
+class TestLogRecordPickling(unittest.TestCase):
+    def test_record_crosses_as_text(self):
+        record = LogRecord("ALERT", "alert", "ALERT: {symbol} at {value:g} ({source})",
+                           symbol="AAPL", value=201.5, source=threading.Lock())
+
+        copy = pickle.loads(pickle.dumps(record))
+
+        self.assertEqual(str(copy), "ALERT: AAPL at 201.5 (" + str(record.values["source"]) + ")")
+        self.assertEqual((copy.level, copy.kind, copy.symbol, copy.created),
+                         ("ALERT", "alert", "AAPL", record.created))
+
+
+class TestProcessTradeEngine(unittest.TestCase):
+    def wait_for(self, condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("condition not met in time")
+            time.sleep(0.02)
+
+    def test_child_engine_publishes_into_shared_memory(self):
+        source = SyntheticPriceSource(symbols=["AAA", "BBB"], tick_rate=200)
+        engine = ProcessTradeEngine({"AAA": 10}, {"BBB": 1.0}, source.symbols,
+                                    price_source=source)
+        engine.start()
+        self.addCleanup(engine.stop)
+        changed = threading.Event()
+        engine.shared_state.subscribe(changed.set)
+
+        self.wait_for(lambda: len(engine.shared_state.snapshot.prices) == 2)
+        snapshot = engine.shared_state.snapshot
+        self.assertTrue(changed.wait(5))
+        self.assertAlmostEqual(snapshot.portfolio_value, snapshot.prices["AAA"] * 10, places=1)
+        self.assertAlmostEqual(engine.shared_state.position_values["AAA"],
+                               snapshot.prices["AAA"] * 10)
+        self.assertIn("AAA", snapshot.indicators)
+        self.assertEqual(snapshot.symbols, ("AAA", "BBB"))
+
+        records = []
+        self.wait_for(lambda: records.extend(engine.log_queue.drain()) or any(
+            record.kind == "alert" for record in records
+        ))
+
+        self.assertEqual(engine.stop(timeout=5), [])
+        self.assertFalse(engine.process.is_alive())
+        # The last snapshot stays readable after the block is released.
+        final = engine.shared_state.snapshot
+        self.assertGreaterEqual(final.version, snapshot.version)
+        self.assertEqual(len(final.prices), 2)
+        self.assertIn("Engine process stopped", str(engine.log_queue.drain()[-1]))
+
+    def test_start_reports_engine_errors(self):
+        engine = ProcessTradeEngine({"AAA": 1}, {}, ["AAA"], no_such_option=True)
+
+        with self.assertRaises(RuntimeError):
+            engine.start()
+
+
+if __name__ == "__main__":
+    unittest.main()
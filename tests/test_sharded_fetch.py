@@ -0,0 +1,88 @@
+import unittest
+from queue import Queue
+from src.price_sources import PriceSource
+from src.shared_state import SharedState
+from src.workers import PriceProducer
+import threading
+import time
+
+class FlakySource(PriceSource):
+    poll_interval = 0.05
+    shard_size = 2
+
+    def __init__(self, bad=(), slow=(), fail_first=()):
+        self.bad = set(bad)
+        self.slow = set(slow)
+        self.fail_first = set(fail_first)
+        self.calls = []
+
+    def fetch(self, symbols):
+        self.calls.append(tuple(symbols))
+        if self.slow & set(symbols):
+            time.sleep(1.0)
+        if self.bad & set(symbols):
+            raise ValueError("bad ticker")
+        failing = self.fail_first & set(symbols)
+        if failing:
+            self.fail_first -= failing
+            raise ConnectionError("temporary failure")
+        return {symbol: 1.0 for symbol in symbols}
+
+
+class TestShardedFetch(unittest.TestCase):
+    def run_producer(self, source, symbols, duration=0.3, **kwargs):
+        shared = SharedState(portfolio={}, alerts={}, symbols=symbols)
+        work_q = Queue()
+        log_q = Queue()
+        stop_event = threading.Event()
+        prod = PriceProducer(shared, work_q, log_q, stop_event, source=source,
+                             retry_delay=0.01, **kwargs)
+        prod.start()
+        time.sleep(duration)
+        stop_event.set()
+
+        symbols_seen = set()
+        while not work_q.empty():
+            symbols_seen.add(work_q.get()[0])
+        logs = []
+        while not log_q.empty():
+            logs.append(log_q.get())
+        return symbols_seen, logs
+
+    def test_failed_shard_does_not_drop_other_shards(self):
+        source = FlakySource(bad={"C"})
+
+        seen, logs = self.run_producer(source, ["A", "B", "C", "D", "E"])
+
+        self.assertEqual(seen, {"A", "B", "E"})
+        self.assertTrue(any("ERROR (C..D)" in msg for msg in logs))
+
+    def test_transient_failure_is_retried(self):
+        source = FlakySource(fail_first={"A"})
+
+        seen, logs = self.run_producer(source, ["A", "B", "C"], duration=0.1)
+
+        self.assertEqual(seen, {"A", "B", "C"})
+        self.assertFalse(any("ERROR" in msg for msg in logs))
+
+    def test_slow_shard_times_out_and_is_not_resubmitted(self):
+        source = FlakySource(slow={"A"})
+
+        seen, logs = self.run_producer(
+            source, ["A", "B", "C", "D"], duration=0.5, shard_timeout=0.1
+        )
+
+        self.assertEqual(seen, {"C", "D"})
+        self.assertTrue(any("no response within 0.1s" in msg for msg in logs))
+        self.assertEqual(source.calls.count(("A", "B")), 1)
+
+    def test_slow_shard_does_not_hold_back_next_cycle(self):
+        source = FlakySource(slow={"A"})
+
+        seen, logs = self.run_producer(source, ["A", "B", "C", "D"], duration=0.5)
+
+        # C..D is fetched again every cycle while A..B is still running.
+        self.assertEqual(seen, {"C", "D"})
+        self.assertGreaterEqual(source.calls.count(("C", "D")), 3)
+        self.assertEqual(source.calls.count(("A", "B")), 1)
+        self.assertFalse(any("ERROR" in msg for msg in logs))
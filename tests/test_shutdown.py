@@ -0,0 +1,92 @@
+import unittest
+import queue
+import threading
+import time
+from queue import Queue
+from src.conflating_queue import ConflatingQueue
+from src.log_buffer import LogBuffer
+from src.price_sources import SyntheticPriceSource
+from src.shared_state import SharedState
+from src.stop_event import StopEvent, wake_on_stop
+from src.trade_engine import TradeEngine
+from src.workers import STOP, AlertConsumer, PortfolioConsumer
+
+
+class TestStopEvent(unittest.TestCase):
+    def test_callbacks_run_once_on_set(self):
+        stop_event = StopEvent()
+        calls = []
+        self.assertIsNone(wake_on_stop(stop_event, lambda: calls.append("first")))
+        stop_event.set()
+        stop_event.set()
+        stop_event.on_set(lambda: calls.append("late"))
+
+        self.assertEqual(calls, ["first", "late"])
+
+    def test_plain_event_falls_back_to_polling(self):
+        self.assertEqual(wake_on_stop(threading.Event(), lambda: None), 0.5)
+
+    def test_close_wakes_blocked_getters(self):
+        for buffer in (ConflatingQueue(), LogBuffer()):
+            threading.Timer(0.05, buffer.close).start()
+            started = time.monotonic()
+            with self.assertRaises(queue.Empty):
+                buffer.get()
+            self.assertLess(time.monotonic() - started, 1.0)
+
+
+class TestWakeups(unittest.TestCase):
+    def test_consumers_exit_as_soon_as_stopped(self):
+        shared = SharedState({"AAPL": 1}, {"AAPL": 100.0}, ["AAPL"])
+        stop_event = StopEvent()
+        consumers = [
+            PortfolioConsumer(shared, ConflatingQueue(), LogBuffer(), stop_event),
+            AlertConsumer(shared, LogBuffer(), stop_event),
+        ]
+        for consumer in consumers:
+            consumer.start()
+        time.sleep(0.05)
+
+        stop_event.set()
+        for consumer in consumers:
+            consumer.join(timeout=0.2)
+            self.assertFalse(consumer.is_alive())
+
+    def test_stop_sentinel_ends_plain_queue_consumer(self):
+        shared = SharedState({"AAPL": 1}, {}, ["AAPL"])
+        work_q = Queue()
+        consumer = PortfolioConsumer(shared, work_q, Queue(), threading.Event())
+        consumer.start()
+        work_q.put(("AAPL", 10.0))
+        work_q.put(STOP)
+        consumer.join(timeout=1)
+
+        self.assertFalse(consumer.is_alive())
+        self.assertEqual(shared.snapshot.portfolio_value, 10.0)
+
+    def test_publish_signals_subscribers(self):
+        shared = SharedState({"AAPL": 1}, {}, ["AAPL"])
+        changed = threading.Event()
+        shared.subscribe(changed.set)
+        with shared.lock:
+            shared.publish()
+
+        self.assertTrue(changed.is_set())
+
+
+class TestEngineStop(unittest.TestCase):
+    def test_stop_joins_all_threads_within_deadline(self):
+        source = SyntheticPriceSource(symbols=["AAPL", "MSFT"], tick_rate=200)
+        engine = TradeEngine({"AAPL": 1}, {"MSFT": 1e9}, source.symbols, price_source=source,
+                             metrics_port=0)
+        engine.start()
+        time.sleep(0.2)
+
+        started = time.monotonic()
+        self.assertEqual(engine.stop(timeout=2), [])
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertTrue(engine.threads())
+        self.assertFalse(any(thread.is_alive() for thread in engine.threads()))
+
+if __name__ == "__main__":
+    unittest.main()
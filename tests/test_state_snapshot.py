@@ -0,0 +1,87 @@
+import unittest
+from queue import Queue
+from src.shared_state import PriceMap, SharedState
+from src.workers import PortfolioConsumer
+import threading
+
+class TestStateSnapshot(unittest.TestCase):
+    def make_consumer(self, columnar=False):
+        shared = SharedState(portfolio={"AAPL": 2}, alerts={"AAPL": 150},
+                             symbols=["AAPL", "TSLA"], columnar=columnar)
+        consumer = PortfolioConsumer(shared, Queue(), Queue(), threading.Event())
+        return shared, consumer
+
+    def test_each_batch_publishes_new_version(self):
+        shared, consumer = self.make_consumer()
+        initial = shared.snapshot
+
+        consumer.apply_batch([("AAPL", 100.0), ("TSLA", 10.0)])
+        snapshot = shared.snapshot
+
+        self.assertEqual(initial.version, 0)
+        self.assertEqual(snapshot.version, 1)
+        self.assertEqual(snapshot.portfolio_value, 200.0)
+        self.assertEqual(dict(snapshot.prices), {"AAPL": 100.0, "TSLA": 10.0})
+        self.assertEqual(snapshot.symbols, ("AAPL", "TSLA"))
+
+    def test_snapshot_is_not_affected_by_later_writes(self):
+        shared, consumer = self.make_consumer()
+        consumer.apply_batch([("AAPL", 100.0)])
+        snapshot = shared.snapshot
+
+        consumer.apply_batch([("AAPL", 120.0)])
+
+        self.assertEqual(snapshot.prices["AAPL"], 100.0)
+        self.assertEqual(snapshot.portfolio_value, 200.0)
+        self.assertEqual(shared.snapshot.prices["AAPL"], 120.0)
+
+    def test_snapshot_is_read_only(self):
+        shared, consumer = self.make_consumer()
+        consumer.apply_batch([("AAPL", 100.0)])
+
+        with self.assertRaises(TypeError):
+            shared.snapshot.prices["AAPL"] = 1.0
+        with self.assertRaises(AttributeError):
+            shared.snapshot.portfolio_value = 1.0
+
+    def test_columnar_store_publishes_plain_prices(self):
+        shared, consumer = self.make_consumer(columnar=True)
+
+        consumer.apply_batch([("TSLA", 10.0)])
+
+        self.assertEqual(dict(shared.snapshot.prices), {"TSLA": 10.0})
+
+    def test_publish_copies_only_changed_chunks(self):
+        symbols = [f"S{i:04d}" for i in range(1000)]
+        shared = SharedState(portfolio={}, alerts={}, symbols=symbols)
+        consumer = PortfolioConsumer(shared, Queue(), Queue(), threading.Event())
+        consumer.apply_batch([(symbol, 1.0) for symbol in symbols])
+        before = shared.snapshot.prices
+
+        consumer.apply_batch([("S0007", 2.0)])
+        after = shared.snapshot.prices
+
+        self.assertEqual(before["S0007"], 1.0)
+        self.assertEqual(after["S0007"], 2.0)
+        self.assertEqual(len(after), 1000)
+        self.assertEqual(dict(after), {**dict(before), "S0007": 2.0})
+        shared_chunks = sum(old is new for old, new in zip(before.chunks, after.chunks))
+        self.assertEqual(shared_chunks, len(after.chunks) - 1)
+
+
+class TestPriceMap(unittest.TestCase):
+    def test_evolve_adds_updates_and_removes(self):
+        empty = PriceMap()
+        prices = empty.evolve({symbol: float(i) for i, symbol in
+                               enumerate(f"S{i}" for i in range(500))})
+
+        updated = prices.evolve({"S1": 10.0, "S2": None, "NEW": 3.0, "GONE": None})
+
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(len(prices), 500)
+        self.assertEqual((prices["S1"], prices["S2"]), (1.0, 2.0))
+        self.assertEqual(len(updated), 500)
+        self.assertEqual(updated["S1"], 10.0)
+        self.assertNotIn("S2", updated)
+        self.assertEqual(updated.get("NEW"), 3.0)
+        self.assertEqual(set(updated), set(prices) - {"S2"} | {"NEW"})
@@ -0,0 +1,101 @@
+import unittest
+from queue import Queue
+from src.price_sources import SyntheticPriceSource
+from src.shared_state import SharedState
+from src.trade_engine import TradeEngine
+from src.workers import PortfolioConsumer, PriceProducer
+import threading
+import time
+
+class TestSyntheticPriceSource(unittest.TestCase):
+    def test_same_seed_gives_same_prices(self):
+        first = SyntheticPriceSource(n_symbols=50, seed=7)
+        second = SyntheticPriceSource(n_symbols=50, seed=7)
+
+        for _ in range(3):
+            self.assertEqual(first.fetch(first.symbols), second.fetch(second.symbols))
+
+    def test_poll_interval_matches_tick_rate(self):
+        feed = SyntheticPriceSource(n_symbols=2000, tick_rate=20000)
+
+        self.assertEqual(len(feed.symbols), 2000)
+        self.assertAlmostEqual(feed.poll_interval, 0.1)
+
+    def test_unknown_symbols_are_skipped(self):
+        feed = SyntheticPriceSource(symbols=["AAA", "BBB"])
+
+        self.assertEqual(set(feed.fetch(["AAA", "ZZZ"])), {"AAA"})
+
+    def test_fetch_sustains_ten_thousand_ticks(self):
+        feed = SyntheticPriceSource(n_symbols=10000)
+
+        started = time.perf_counter()
+        prices = feed.fetch(feed.symbols)
+
+        self.assertEqual(len(prices), 10000)
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+    def test_producer_pushes_feed_prices(self):
+        feed = SyntheticPriceSource(n_symbols=10, tick_rate=1000)
+        shared = SharedState(portfolio={}, alerts={}, symbols=feed.symbols)
+        work_q = Queue()
+        stop_event = threading.Event()
+
+        prod = PriceProducer(shared, work_q, Queue(), stop_event, source=feed)
+        prod.start()
+        time.sleep(0.2)
+        stop_event.set()
+
+        self.assertGreaterEqual(work_q.qsize(), 100)
+
+    def test_engine_runs_offline(self):
+        feed = SyntheticPriceSource(n_symbols=20, tick_rate=2000)
+        portfolio = {symbol: 1 for symbol in feed.symbols}
+        engine = TradeEngine(portfolio, {}, feed.symbols, price_source=feed)
+
+        engine.start()
+        time.sleep(0.3)
+        engine.stop_event.set()
+
+        with engine.shared_state.lock:
+            self.assertEqual(len(engine.shared_state.prices), 20)
+            self.assertGreater(engine.shared_state.portfolio_value, 0)
+
+    def test_engine_uses_injected_lock_and_consumer(self):
+        class CountingLock:
+            def __init__(self):
+                self.lock = threading.Lock()
+                self.acquisitions = 0
+
+            def acquire(self, blocking=True, timeout=-1):
+                self.acquisitions += 1
+                return self.lock.acquire(blocking, timeout)
+
+            def release(self):
+                self.lock.release()
+
+            __enter__ = acquire
+
+            def __exit__(self, *exc):
+                self.release()
+
+        class RecordingConsumer(PortfolioConsumer):
+            batches = 0
+
+            def apply_batch(self, batch, volumes=None):
+                RecordingConsumer.batches += 1
+                return super().apply_batch(batch, volumes)
+
+        feed = SyntheticPriceSource(n_symbols=20, tick_rate=2000)
+        lock = CountingLock()
+        engine = TradeEngine({}, {}, feed.symbols, price_source=feed, lock=lock,
+                             portfolio_consumer_class=RecordingConsumer)
+
+        engine.start()
+        time.sleep(0.3)
+        engine.stop()
+
+        self.assertIs(engine.shared_state.price_updated._lock, lock)
+        self.assertGreater(RecordingConsumer.batches, 0)
+        self.assertGreater(lock.acquisitions, 0)
+
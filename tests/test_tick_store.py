@@ -0,0 +1,87 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from src.price_sources import SyntheticPriceSource
+from src.tick_store import TickWriter, TickStore, TICK_RECORD, TICKS_FILE
+from src.trade_engine import TradeEngine
+
+class TestTickStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = self.directory.name
+
+    def write_batches(self, batches):
+        stop_event = threading.Event()
+        writer = TickWriter(self.path, stop_event)
+        writer.start()
+        for timestamp, prices in batches:
+            writer.append(prices, timestamp=timestamp)
+        stop_event.set()
+        writer.join(timeout=2)
+        return writer
+
+    def test_records_are_fixed_size_and_memory_mapped(self):
+        self.write_batches([
+            (100.0, {"AAPL": 1.0, "TSLA": 2.0}),
+            (101.0, {"AAPL": 1.5}),
+        ])
+
+        store = TickStore(self.path)
+
+        self.assertEqual(os.path.getsize(os.path.join(self.path, TICKS_FILE)),
+                         3 * TICK_RECORD.itemsize)
+        self.assertIsInstance(store.records, np.memmap)
+        self.assertEqual(store.symbols, ["AAPL", "TSLA"])
+        self.assertEqual(store.records["symbol_id"].tolist(), [0, 1, 0])
+
+    def test_range_queries_use_time_index(self):
+        self.write_batches([(float(t), {"AAPL": float(t), "TSLA": -float(t)}) for t in range(10)])
+        store = TickStore(self.path)
+
+        window = store.range(3.0, 6.0)
+        timestamps, prices = store.prices("AAPL", start=8.0)
+
+        self.assertEqual(window["timestamp"].tolist(), [3.0, 3.0, 4.0, 4.0, 5.0, 5.0])
+        self.assertEqual(prices.tolist(), [8.0, 9.0])
+        self.assertEqual(len(store.range(symbol="MSFT")), 0)
+
+    def test_reopened_log_keeps_symbol_ids_and_order(self):
+        self.write_batches([(10.0, {"AAPL": 1.0})])
+        self.write_batches([(5.0, {"TSLA": 2.0, "AAPL": 3.0})])
+
+        store = TickStore(self.path)
+
+        self.assertEqual(store.symbols, ["AAPL", "TSLA"])
+        self.assertEqual(store.records["symbol_id"].tolist(), [0, 1, 0])
+        self.assertEqual(store.records["timestamp"].tolist(), [10.0, 5.0, 5.0])
+
+    def test_range_queries_span_out_of_order_segments(self):
+        self.write_batches([(float(t), {"AAPL": float(t)}) for t in (1, 4, 7)])
+        self.write_batches([(float(t), {"AAPL": -float(t)}) for t in (2, 5, 8)])
+        store = TickStore(self.path)
+
+        timestamps, prices = store.prices("AAPL", start=2.0, end=8.0)
+
+        self.assertEqual(store.segments, [0, 3, 6])
+        self.assertEqual(timestamps.tolist(), [2.0, 4.0, 5.0, 7.0])
+        self.assertEqual(prices.tolist(), [-2.0, 4.0, -5.0, 7.0])
+        self.assertEqual(len(store.range()), 6)
+        self.assertEqual(len(store.range(9.0)), 0)
+
+    def test_engine_records_ticks(self):
+        feed = SyntheticPriceSource(n_symbols=50, tick_rate=5000)
+        engine = TradeEngine({}, {}, feed.symbols, price_source=feed, tick_history=self.path)
+
+        engine.start()
+        time.sleep(0.3)
+        engine.stop_event.set()
+        engine.tick_writer.join(timeout=2)
+
+        store = TickStore(self.path)
+        self.assertGreaterEqual(len(store), 500)
+        self.assertEqual(len(store.symbols), 50)
+        self.assertTrue(np.all(np.diff(store.records["timestamp"]) >= 0))
@@ -0,0 +1,121 @@
+import unittest
+from unittest import mock
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import pandas as pd
+from src.ticker_validation import REFERENCE_TICKER, LookupFailed, TickerValidator
+
+def daily_closes(valid, invalid=(), reference=True):
+    if reference:
+        valid = list(valid) + [REFERENCE_TICKER]
+    index = pd.date_range("2025-11-20", periods=2, freq="1D")
+    columns = pd.MultiIndex.from_product([["Close"], list(valid) + list(invalid)])
+    rows = [[1.0] * len(valid) + [float("nan")] * len(invalid)] * 2
+    return pd.DataFrame(rows, index=index, columns=columns)
+
+
+class TestTickerValidator(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, "cache", "tickers.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_validator(self, **kwargs):
+        validator = TickerValidator(cache_path=self.cache_path, **kwargs)
+        self.addCleanup(validator.close)
+        return validator
+
+    def test_results_are_cached_on_disk(self):
+        validator = self.make_validator()
+        data = daily_closes(["AAPL"], ["NOPE"])
+
+        with mock.patch("yfinance.download", return_value=data) as download:
+            results = validator.validate_many(["AAPL", "NOPE"])
+        self.assertEqual(results, {"AAPL": True, "NOPE": False})
+        self.assertEqual(download.call_count, 1)
+
+        restarted = self.make_validator()
+        with mock.patch("yfinance.download") as download:
+            self.assertTrue(restarted.validate("AAPL"))
+            self.assertFalse(restarted.validate("NOPE"))
+        download.assert_not_called()
+
+    def test_expired_entries_are_checked_again(self):
+        validator = self.make_validator(negative_ttl=0)
+
+        with mock.patch("yfinance.download",
+                        return_value=daily_closes([], ["NOPE"])):
+            validator.validate("NOPE")
+        validator.entries["NOPE"]["checked"] -= 1
+
+        self.assertIsNone(validator.cached("NOPE"))
+
+    def test_network_errors_are_not_cached(self):
+        validator = self.make_validator()
+        done = threading.Event()
+        results = []
+
+        def callback(ticker, result):
+            results.append((ticker, result))
+            done.set()
+
+        with mock.patch("yfinance.download", side_effect=ConnectionError):
+            validator.validate_async("AAPL", callback)
+            self.assertTrue(done.wait(1))
+
+        self.assertEqual(results, [("AAPL", None)])
+        self.assertIsNone(validator.cached("AAPL"))
+
+    def test_empty_download_is_inconclusive(self):
+        validator = self.make_validator()
+
+        # What yf.download returns when every request failed.
+        with mock.patch("yfinance.download", return_value=pd.DataFrame()):
+            with self.assertRaises(LookupFailed):
+                validator.validate_many(["AAPL", "MSFT"])
+
+        self.assertIsNone(validator.cached("AAPL"))
+        self.assertIsNone(validator.cached("MSFT"))
+        self.assertFalse(os.path.exists(self.cache_path))
+
+    def test_missing_reference_ticker_is_inconclusive(self):
+        validator = self.make_validator()
+        data = daily_closes(["AAPL"], ["NOPE"], reference=False)
+
+        with mock.patch("yfinance.download", return_value=data):
+            with self.assertRaises(LookupFailed):
+                validator.validate_many(["AAPL", "NOPE"])
+
+        self.assertIsNone(validator.cached("NOPE"))
+
+    def test_only_tickers_yahoo_does_not_know_are_rejected(self):
+        validator = self.make_validator()
+
+        def download(**kwargs):
+            # yf.download logs per-ticker failures and returns NaN columns.
+            logger = logging.getLogger("yfinance")
+            logger.error("['BAD']: ConnectionError('Connection reset by peer')")
+            logger.error("['NOPE']: YFTzMissingError('possibly delisted; no timezone found')")
+            return daily_closes(["AAPL"], ["BAD", "NOPE"])
+
+        with mock.patch("yfinance.download", side_effect=download):
+            results = validator.validate_many(["AAPL", "BAD", "NOPE"])
+
+        self.assertEqual(results, {"AAPL": True, "BAD": None, "NOPE": False})
+        self.assertIsNone(validator.cached("BAD"))
+        self.assertFalse(validator.cached("NOPE"))
+
+    def test_yfinance_is_imported_on_first_lookup(self):
+        code = ("import sys, src.ticker_validation\n"
+                "print('yfinance' in sys.modules)")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, "-c", code], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
@@ -0,0 +1,81 @@
+import unittest
+from queue import Queue
+import os
+import tempfile
+import threading
+import time
+from src.checkpoint import Checkpointer, load_checkpoint
+from src.price_sources import PriceSource
+from src.trade_engine import TradeEngine
+from src.workers import AlertConsumer
+
+class NoPrices(PriceSource):
+    def fetch(self, symbols):
+        return {}
+
+
+class TestWarmStart(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "checkpoint.json")
+
+    def save_state(self, prices, columnar=False):
+        engine = TradeEngine({"AAPL": 2, "TSLA": 1}, {"TSLA": 250}, ["AAPL", "TSLA"],
+                             price_source=NoPrices(), columnar=columnar)
+        engine.portfolio_consumer.apply_batch(list(prices.items()))
+        Checkpointer(engine.shared_state, self.path, engine.log_queue, engine.stop_event).save()
+
+    def test_prices_are_restored_as_stale(self):
+        self.save_state({"AAPL": 100.0, "TSLA": 300.0})
+
+        engine = TradeEngine({"AAPL": 2, "TSLA": 1}, {}, ["AAPL", "TSLA"],
+                             price_source=NoPrices(), checkpoint_path=self.path)
+        snapshot = engine.shared_state.snapshot
+
+        self.assertEqual(snapshot.portfolio_value, 500.0)
+        self.assertEqual(dict(snapshot.prices), {"AAPL": 100.0, "TSLA": 300.0})
+        self.assertEqual(snapshot.stale, {"AAPL", "TSLA"})
+        self.assertIn("Restored 2 prices", str(engine.log_queue.get_nowait()))
+
+    def test_fresh_tick_clears_stale_flag(self):
+        self.save_state({"AAPL": 100.0, "TSLA": 300.0})
+        engine = TradeEngine({"AAPL": 2, "TSLA": 1}, {}, ["AAPL", "TSLA"],
+                             price_source=NoPrices(), checkpoint_path=self.path)
+
+        engine.portfolio_consumer.apply_batch([("AAPL", 110.0)])
+
+        self.assertEqual(engine.shared_state.snapshot.stale, {"TSLA"})
+        self.assertEqual(engine.shared_state.portfolio_value, 520.0)
+
+    def test_from_checkpoint_restores_configuration(self):
+        self.save_state({"AAPL": 100.0}, columnar=True)
+
+        engine = TradeEngine.from_checkpoint(self.path, price_source=NoPrices(), columnar=True)
+
+        self.assertEqual(engine.shared_state.portfolio, {"AAPL": 2, "TSLA": 1})
+        self.assertEqual(engine.shared_state.alerts, {"TSLA": 250})
+        self.assertEqual(engine.shared_state.prices["AAPL"], 100.0)
+        self.assertNotIn("TSLA", engine.shared_state.prices)
+
+    def test_stale_prices_do_not_raise_alerts(self):
+        self.save_state({"TSLA": 300.0})
+        engine = TradeEngine.from_checkpoint(self.path, price_source=NoPrices())
+        log_q = Queue()
+        stop_event = threading.Event()
+
+        AlertConsumer(engine.shared_state, log_q, stop_event).start()
+        time.sleep(0.1)
+        stop_event.set()
+
+        self.assertTrue(log_q.empty())
+
+    def test_state_is_saved_on_shutdown(self):
+        engine = TradeEngine({"AAPL": 1}, {}, ["AAPL"], price_source=NoPrices(),
+                             checkpoint_path=self.path, checkpoint_interval=60)
+        engine.start()
+        engine.portfolio_consumer.apply_batch([("AAPL", 42.0)])
+        engine.stop_event.set()
+        engine.checkpointer.join(timeout=1)
+
+        self.assertEqual(load_checkpoint(self.path)["prices"], {"AAPL": 42.0})